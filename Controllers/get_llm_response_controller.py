@@ -3,16 +3,24 @@ import json
 import redis.asyncio as redis
 
 from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from typing import List, Dict, Union
 
 from config import config
+from llm_api.Models.database import get_pool_stats
 from llm_api.Utils.logger import init_logger
 
 # DTO
 from llm_api.Dto.host_instance_db_request_dto import HostInstanceDBRequestDTO
 from llm_api.Dto.service_request_dto import ServiceDataDTO
 
+# Service
+from llm_api.Services.request_queue_service import enqueue_if_absent, get_queue_stats, get_chunk_key, \
+    make_fan_out_key
+from llm_api.Services.result_notifier_service import result_notifier
+from llm_api.Services.result_store_service import list_recent_results, get_result_store_stats
+
 # Logger
 from llm_api.Utils.logger import api_logger
 
@@ -155,79 +163,215 @@ async def process_request(request: RequestModel):
 
 ########################################################################################################
 # Inwoo Test Code
+def parse_request(request: Dict):
+    """
+    (OS, WAS, DB), (Service) 요청을 구분해 DTO와 Redis Key를 생성
+    :return: (request_obj, redis_key) - 유효하지 않은 요청이면 (None, None)
+    """
+    data = request
+    if data.get("tx_codes") and not data.get("tiers"):
+        # Service
+        request_obj = ServiceDataDTO(**request)
+        request_obj.category_inst_type = "service"
+        tmp_tx_code = list(request_obj.tx_codes.keys())[0]
+        # redis_key = f"{request_obj.data.time}_tx_codes_{tmp_tx_code}_{request_obj.data.tx_codes[tmp_tx_code].name}"
+        redis_key = f"{request_obj.time}_tx_codes_{tmp_tx_code}"
+        api_logger.info(f"[Service] Redis Key 생성: {redis_key}")
+    # elif data.get("tiers") and not data.get("tx_codes"):
+    elif data.get("summary") and not data.get("tx_codes"):
+        # OS, Instance, DB
+        request_obj = HostInstanceDBRequestDTO(**request)
+        request_obj.category_inst_type = "host_instance_db"
+        # redis_key = f"{request_obj.data.time}_tiers_{request_obj.data.tiers[0].name}_{request_obj.data.tiers[0].type}_{request_obj.data.tiers[0].instances[0].target_id}"
+        # redis_key = f"{request_obj.time}_tiers_{request_obj.tiers[0].type}_{request_obj.tiers[0].instances[0].target_id}"
+        redis_key = f"{request_obj.summary.time}_tiers_{request_obj.summary.tiers[0].type}_{request_obj.summary.tiers[0].instances[0].target_id}"
+        if request_obj.fan_out:
+            redis_key = make_fan_out_key(request_obj.summary.time, request_obj.summary.model_dump()["tiers"])
+        api_logger.info(f"[Host/Instance/DB] Redis Key 생성: {redis_key}")
+    else:
+        api_logger.error("유효하지 않은 요청 구조입니다.\n요청 데이터를 확인해주세요.")
+        request_obj = None
+        redis_key = None
+    return request_obj, redis_key
+
+
 @llm_router.post("/process_test")
 async def process_request(request: Dict):
-    data = request
-    api_logger.debug(f"요청 수신: {data}")
+    api_logger.debug(f"요청 수신: {request}")
 
-    # (OS, WAS, DB), (Service) 요청 구분
     try:
-        if data.get("tx_codes") and not data.get("tiers"):
-            # Service
-            request_obj = ServiceDataDTO(**request)
-            request_obj.category_inst_type = "service"
-            tmp_tx_code = list(request_obj.tx_codes.keys())[0]
-            # redis_key = f"{request_obj.data.time}_tx_codes_{tmp_tx_code}_{request_obj.data.tx_codes[tmp_tx_code].name}"
-            redis_key = f"{request_obj.time}_tx_codes_{tmp_tx_code}"
-            api_logger.info(f"[Service] Redis Key 생성: {redis_key}")
-        # elif data.get("tiers") and not data.get("tx_codes"):
-        elif data.get("summary") and not data.get("tx_codes"):
-            # OS, Instance, DB
-            request_obj = HostInstanceDBRequestDTO(**request)
-            request_obj.category_inst_type = "host_instance_db"
-            # redis_key = f"{request_obj.data.time}_tiers_{request_obj.data.tiers[0].name}_{request_obj.data.tiers[0].type}_{request_obj.data.tiers[0].instances[0].target_id}"
-            # redis_key = f"{request_obj.time}_tiers_{request_obj.tiers[0].type}_{request_obj.tiers[0].instances[0].target_id}"
-            redis_key = f"{request_obj.summary.time}_tiers_{request_obj.summary.tiers[0].type}_{request_obj.summary.tiers[0].instances[0].target_id}"
-            api_logger.info(f"[Host/Instance/DB] Redis Key 생성: {redis_key}")
-        else:
-            api_logger.error("유효하지 않은 요청 구조입니다.\n요청 데이터를 확인해주세요.")
-            request_obj = None
-            redis_key = None
+        request_obj, redis_key = parse_request(request)
     except Exception as e:
         api_logger.exception(f"요청 데이터 파싱 중 예외 발생: {e}")
         return {"message": "유효하지 않은 요청입니다."}
 
-    # Redis에서 결과 확인
-    result = await redis_client.hget(redis_key, "status")
-    if result == "success":
+    if redis_key is None:
+        return {"message": "유효하지 않은 요청입니다."}
+
+    # 결과 확인 및 Queue 등록 (single-flight)
+    status, response_data = await enqueue_if_absent(redis_client, redis_key, request_obj.dict())
+    if status == "success":
         api_logger.info(f"Redis Key 조회 결과 SUCCESS: {redis_key}")
-        response_data = await redis_client.hget(redis_key, "response")
         return json.loads(response_data)  # 결과 반환
-    api_logger.info(f"Redis Key 조회 결과 None: {redis_key}")
-
-    # Redis에 상태 초기화 (처리 중 상태)
-    api_logger.info(f"요청 처리 시작 -> Redis 상태 초기화: {redis_key}")
-    await redis_client.hset(redis_key, mapping={"status": "running", "response": "null"})
-
-    # 큐에 요청 추가
-    await redis_client.rpush(config.QUEUE_KEY, json.dumps(request_obj.dict()))
-    api_logger.info(f"요청 처리 Queue 추가 -> Queue: {config.QUEUE_KEY}")
+    elif status == "running":
+        api_logger.info(f"이미 처리 중인 요청 -> 기존 작업 대기: {redis_key}")
+    else:
+        api_logger.info(f"요청 처리 Queue 추가 -> Queue: {config.QUEUE_KEY}, Key: {redis_key}")
 
     # 상태 확인 대기
-    result = await wait_for_result(redis_key)
+    result = await wait_for_shared_result(redis_key)
     return result
 
+
+@llm_router.post("/process_stream")
+async def process_stream_request(request: Dict):
+    """/process_test 와 같은 요청을 받아 LLM 생성 chunk를 SSE(text/event-stream)로 전달"""
+    api_logger.debug(f"스트리밍 요청 수신: {request}")
+
+    try:
+        request_obj, redis_key = parse_request(request)
+    except Exception as e:
+        api_logger.exception(f"요청 데이터 파싱 중 예외 발생: {e}")
+        return {"message": "유효하지 않은 요청입니다."}
+
+    if redis_key is None:
+        return {"message": "유효하지 않은 요청입니다."}
+
+    request_obj.stream = True
+    status, _ = await enqueue_if_absent(redis_client, redis_key, request_obj.dict())
+    api_logger.info(f"스트리밍 요청 등록 결과: {redis_key} -> {status}")
+    return StreamingResponse(relay_chunks(redis_key), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@llm_router.get("/stream/{redis_key}")
+async def stream_result(redis_key: str):
+    """이미 등록된 요청의 chunk를 SSE로 전달 (EventSource 용)"""
+    return StreamingResponse(relay_chunks(redis_key), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+def _sse_event(event: str, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _final_event(redis_key: str):
+    status, response_data = await redis_client.hmget(redis_key, ["status", "response"])
+    if status == "success":
+        return _sse_event("result", json.loads(response_data))
+    return _sse_event("error", {"message": "잠시 후에 다시 시도해주세요"})
+
+
+async def relay_chunks(redis_key: str):
+    """
+    Consumer가 chunk stream에 기록하는 chunk를 순서대로 SSE 이벤트로 전달하고,
+    완료 이벤트를 받으면 최종 결과를 result 이벤트로 보낸 뒤 종료한다.
+    """
+    chunk_key = get_chunk_key(redis_key)
+    last_id = "0"
+    deadline = asyncio.get_running_loop().time() + config.TIMEOUT
+
+    # chunk stream이 만료된 뒤 완료된 요청을 조회하는 경우
+    if not await redis_client.exists(chunk_key) and await redis_client.hget(redis_key, "status") == "success":
+        yield await _final_event(redis_key)
+        return
+
+    while asyncio.get_running_loop().time() < deadline:
+        entries = await redis_client.xread({chunk_key: last_id}, count=100, block=config.SSE_BLOCK_MS)
+        if not entries:
+            yield ": keep-alive\n\n"
+            continue
+
+        for _, stream_entries in entries:
+            for message_id, fields in stream_entries:
+                last_id = message_id
+                if fields.get("event") == "done":
+                    yield await _final_event(redis_key)
+                    return
+                yield _sse_event("chunk", fields.get("data", ""))
+
+    api_logger.warning(f"※ 스트리밍 처리 시간 초과: {redis_key}")
+    yield _sse_event("error", {"message": "잠시 후에 다시 시도해주세요"})
+
+
+@llm_router.get("/results/recent")
+async def recent_results(category: str = "host_instance_db", limit: int = 50):
+    """보조 인덱스 기반 최근 결과 key 목록"""
+    return await list_recent_results(redis_client, category, limit)
+
+
+@llm_router.get("/results/stats")
+async def result_store_stats():
+    """결과 저장소 메모리 사용량"""
+    return await get_result_store_stats(redis_client)
+
+
+@llm_router.get("/queue/stats")
+async def queue_stats():
+    """카테고리/우선순위 queue별 적재 건수와 대기 시간"""
+    return await get_queue_stats(redis_client)
+
+
+@llm_router.get("/db/pool/stats")
+async def db_pool_stats():
+    """PostgreSQL connection pool 사용 현황 (사용 중 연결 수, 대기 시간, overflow/timeout 횟수)"""
+    return get_pool_stats()
+
 ########################################################################################################
 
-async def wait_for_result(redis_key: str):
-    """Redis에서 상태를 10초 동안 확인"""
-    api_logger.info(f"요청 후 Redis Key 상태 조회 진행: {redis_key}")
+# 같은 프로세스 안에서 같은 key를 기다리는 요청들이 하나의 대기 작업을 공유하도록 관리
+_pending_waits: Dict[str, asyncio.Task] = {}
 
-    for _ in range(config.TIMEOUT):
+
+async def wait_for_shared_result(redis_key: str):
+    """같은 redis_key에 대한 대기 작업이 있으면 해당 작업에 합류하고, 없으면 새로 생성"""
+    task = _pending_waits.get(redis_key)
+    if task is None:
+        task = asyncio.create_task(wait_for_result(redis_key))
+        _pending_waits[redis_key] = task
+        task.add_done_callback(lambda _: _pending_waits.pop(redis_key, None))
+    else:
+        api_logger.info(f"진행 중인 대기 작업에 합류: {redis_key}")
+    return await asyncio.shield(task)
+
+
+async def _wait_for_status(redis_key: str, future: asyncio.Future):
+    while True:
         status = await redis_client.hget(redis_key, "status")
+        if status in ("success", "failed"):
+            return status
+        if result_notifier.subscribed:
+            return await future
+        # 결과 이벤트 구독이 연결되기 전에는 CHECK_INTERVAL 간격으로 상태를 직접 조회
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), config.CHECK_INTERVAL)
+        except TimeoutError:
+            continue
 
-        if status == "success":
-            api_logger.info(f"※ 요청 처리 완료 success: {redis_key}")
-            response_data = await redis_client.hget(redis_key, "response")
-            return json.loads(response_data)
 
-        elif status == "failed":
-            api_logger.error(f"※ 요청 처리 실패 failed: {redis_key}", exc_info=True)
-            return {"message": "잠시 후에 다시 시도해주세요"}
+async def wait_for_result(redis_key: str):
+    """Consumer의 완료 이벤트를 최대 TIMEOUT 초 동안 대기"""
+    api_logger.info(f"요청 후 Redis Key 완료 이벤트 대기: {redis_key}")
 
-        await asyncio.sleep(CHECK_INTERVAL)
+    future = None
+    try:
+        async with asyncio.timeout(config.TIMEOUT):
+            # 상태 조회 전에 먼저 등록해야 조회와 이벤트 수신 사이의 완료를 놓치지 않는다.
+            future = await result_notifier.register(redis_key)
+            status = await _wait_for_status(redis_key, future)
+    except TimeoutError:
+        api_logger.warning(f"※ 요청 처리 시간 초과: {redis_key}")
+        return {"message": "잠시 후에 다시 시도해주세요"}
+    finally:
+        if future is not None:
+            result_notifier.unregister(redis_key, future)
+
+    if status == "success":
+        api_logger.info(f"※ 요청 처리 완료 success: {redis_key}")
+        response_data = await redis_client.hget(redis_key, "response")
+        return json.loads(response_data)
 
-    api_logger.warning(f"※ 요청 처리 시간 초과: {redis_key}")
+    api_logger.error(f"※ 요청 처리 실패 failed: {redis_key}")
     return {"message": "잠시 후에 다시 시도해주세요"}
 
 
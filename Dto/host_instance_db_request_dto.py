@@ -62,6 +62,8 @@ class HostInstanceDBRequestDTO(BaseModel):
     summary: Summary
     nav: str | None = None
     category_inst_type: str | None = Field(default=None, description="(Service), (Instance, HOST, DB) 구분")
+    stream: bool = Field(default=False, description="토큰 스트리밍 여부")
+    fan_out: bool = Field(default=False, description="summary의 모든 tier/instance를 각각 분석하고 집계 결과를 함께 저장")
 
 # class HostInstanceDBRequestDTO(BaseModel):
 #     inst_type: str | None = Field(default=None, description="Instance Type")
@@ -30,6 +30,7 @@ class ServiceDataDTO(BaseModel):
     tx_codes: dict[str, TxCode] = Field(..., description="트랜잭션 코드 데이터")
     tiers: list = Field(default_factory=list, description="티어 데이터")
     category_inst_type: str | None = Field(default=None, description="(Service), (Instance, HOST, DB) 구분 ")
+    stream: bool = Field(default=False, description="토큰 스트리밍 여부")
 
 class ServiceRequestDTO(BaseModel):
     inst_type: str | None = Field(default=None, description="Inst Type")
@@ -1,15 +1,111 @@
+import threading
+import time
+
+from contextlib import contextmanager, asynccontextmanager
+
 from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 
 # from rejson import Client
 import redis
+import redis.asyncio as aioredis
 
 from config import config
 from llm_api.Utils.logger import db_logger
 
 
+class PoolStats:
+    """
+    Connection pool 사용 통계
+    - 연결을 빌릴 때까지 기다린 시간, pool_size를 넘겨 overflow 연결을 만든 횟수, pool_timeout 초과 횟수를 누적한다.
+    - 현재 빌려간 연결 수 등 순간 값은 snapshot 시점에 pool에서 직접 읽는다.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.overflow_hits = 0
+        self.timeouts = 0
+        self.wait_total_sec = 0.0
+        self.wait_max_sec = 0.0
+
+    def record_wait(self, wait_sec: float):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total_sec += wait_sec
+            self.wait_max_sec = max(self.wait_max_sec, wait_sec)
+
+    def record_overflow(self):
+        with self._lock:
+            self.overflow_hits += 1
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self, pool):
+        with self._lock:
+            return {
+                "pool_size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+                "max_overflow": config.DB_MAX_OVERFLOW,
+                "checkouts": self.checkouts,
+                "overflow_hits": self.overflow_hits,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": round(self.wait_total_sec / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "wait_max_ms": round(self.wait_max_sec * 1000, 3),
+            }
+
+
+class _InstrumentedPoolMixin:
+    """QueuePool 계열에서 연결 대기 시간/overflow/timeout 을 PoolStats에 기록"""
+    stats: PoolStats
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.stats.record_timeout()
+            db_logger.warning(f"[PostgreSQL] {self.stats.name} pool 연결 대기 시간 초과 "
+                              f"(pool_timeout: {config.DB_POOL_TIMEOUT}s, 사용 중: {self.checkedout()})")
+            raise
+        finally:
+            self.stats.record_wait(time.perf_counter() - start)
+
+    def _create_connection(self):
+        # overflow 카운터는 -pool_size 부터 증가하므로 0보다 크면 pool_size를 넘긴 연결
+        if self.overflow() > 0:
+            self.stats.record_overflow()
+        return super()._create_connection()
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    stats = PoolStats("sync")
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    stats = PoolStats("async")
+
+
+def _pool_kwargs():
+    return {
+        "echo": config.DB_ECHO,
+        "pool_size": config.DB_POOL_SIZE,
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "pool_timeout": config.DB_POOL_TIMEOUT,
+        "pool_recycle": config.DB_POOL_RECYCLE_SEC,
+        "pool_pre_ping": config.DB_POOL_PRE_PING,
+    }
+
+
 # PostgreSQL 엔진 설정
-engine = create_engine(config.database_url, echo=True)
+engine = create_engine(config.database_url, poolclass=InstrumentedQueuePool, **_pool_kwargs())
 
 # 세션 설정
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -17,24 +113,79 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # Base 모델 생성
 Base = declarative_base()
 
+# 비동기 엔진은 asyncpg 가 필요하므로 처음 사용할 때 생성
+_async_engine = None
+_AsyncSessionLocal = None
+_async_engine_lock = threading.Lock()
+
+
+def get_async_engine():
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is None:
+        with _async_engine_lock:
+            if _async_engine is None:
+                from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+                db_logger.info("[PostgreSQL] 비동기 엔진 생성 (asyncpg)")
+                _async_engine = create_async_engine(config.async_database_url,
+                                                    poolclass=InstrumentedAsyncQueuePool, **_pool_kwargs())
+                _AsyncSessionLocal = async_sessionmaker(bind=_async_engine, autoflush=False, expire_on_commit=False)
+    return _async_engine
+
+
 ####################### Postgres DB Session 생성 #######################
-def get_db():
-    db_logger.info("[PostgreSQL] DB 세션 생성 시도")
+@contextmanager
+def session_scope():
+    """
+    with 블록 동안 사용할 세션을 제공한다.
+    정상 종료 시 commit, 예외 발생 시 rollback 후 다시 raise 하고, 마지막에 연결을 pool에 반납한다.
+    """
     db = SessionLocal()
     try:
-        return db
+        yield db
+        db.commit()
     except Exception:
-        db_logger.exception("[PostgreSQL] DB 세션 생성 중 오류 발생")
+        db_logger.exception("[PostgreSQL] DB 세션 사용 중 오류 발생, rollback")
         db.rollback()
         raise
     finally:
         db.close()
-        db_logger.info("[PostgreSQL] DB 세션 종료")
+
+
+@asynccontextmanager
+async def async_session_scope():
+    """session_scope 의 비동기 버전 (asyncpg)"""
+    get_async_engine()
+    db = _AsyncSessionLocal()
+    try:
+        yield db
+        await db.commit()
+    except Exception:
+        db_logger.exception("[PostgreSQL] 비동기 DB 세션 사용 중 오류 발생, rollback")
+        await db.rollback()
+        raise
+    finally:
+        await db.close()
+
+
+def get_db():
+    """조회 전용 세션 - session_scope 와 같고 기존 호출부(with get_db() as session) 호환용"""
+    return session_scope()
+
+
+def get_pool_stats():
+    """sync/async connection pool 통계"""
+    stats = {"sync": InstrumentedQueuePool.stats.snapshot(engine.pool)}
+    if _async_engine is not None:
+        stats["async"] = InstrumentedAsyncQueuePool.stats.snapshot(_async_engine.sync_engine.pool)
+    return stats
 
 ####################### Redis Client 생성 함수 #######################
 try:
     db_logger.info("[Redis] Redis 클라이언트 연결 시도")
     rj = redis.Redis(host=config.DATA_REDIS_HOST, port=config.DATA_REDIS_PORT, decode_responses=True)
+    # 비동기 프롬프트 생성(amake_input_prompt)용 - 연결은 처음 사용하는 event loop에 묶인다.
+    rj_async = aioredis.Redis(host=config.DATA_REDIS_HOST, port=config.DATA_REDIS_PORT, decode_responses=True)
     db_logger.info("[Redis] Redis 클라이언트 연결 성공")
 except Exception as e:
     db_logger.exception("[Redis] Redis 클라이언트 연결 실패")
@@ -42,7 +193,7 @@ except Exception as e:
 
 
 if __name__ == '__main__':
-    db1 = get_db()
     from llm_api.Services.get_db_host_instance_db_service import get_metrics
-    result = get_metrics(db1, "2024-12-17 00:00:00.000", "tp01", "tp")
-    print("test")
\ No newline at end of file
+    with session_scope() as db1:
+        result = get_metrics(db1, "2024-12-17 00:00:00.000", "tp01", "tp")
+    print(get_pool_stats())
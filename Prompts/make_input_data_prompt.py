@@ -8,9 +8,40 @@ dbsln_result_service_performance 테이블에서 결과 가져오기
 xaiops_meta_metric 테이블에서 metric_id와 매핑되는 metric_desc
     - metric_id
 """
-
-
-def generate_service_input_prompt(time_of_anomaly: str, target_name: str, instance_type: str, anomalous_metrics: dict):
+from functools import lru_cache
+
+
+def _format_value(value, precision: int | None):
+    if precision is None or not isinstance(value, float):
+        return value
+    return f"{value:.{precision}f}".rstrip("0").rstrip(".")
+
+
+def _render_input_prompt(time_of_anomaly: str, target_name: str, instance_type: str, anomalous_metrics: dict,
+                         precision: int | None = None):
+    if precision is not None:
+        anomalous_metrics = {
+            metric_name: [_format_value(value, precision) for value in values]
+            for metric_name, values in anomalous_metrics.items()
+        }
+    metric_lines = [
+        # f" 4.{idx}. {metric_name}: The percentage contributing to the anomaly is {contribution}%, and the actual value is {actual_value}.\n"
+        f" 4.{idx}. {metric_name}: The predicted allowable range is {lower} to {upper}, "
+        + (f"the average value is {avg}, and " if avg is not None else "and ")
+        + f"the current actual value is {real_value}."
+        for idx, (metric_name, (lower, upper, avg, real_value)) in enumerate(anomalous_metrics.items(), start=1)
+    ]
+    return "\n".join([
+        f"1. Time of anomaly: {time_of_anomaly}",
+        f"2. Target Name: {target_name}",
+        f"3. Instance type of anomaly: {instance_type}",
+        "4. Anomalous metrics:",
+        *metric_lines,
+    ])
+
+
+def generate_service_input_prompt(time_of_anomaly: str, target_name: str, instance_type: str, anomalous_metrics: dict,
+                                  precision: int | None = None):
     """
     OS WAS 입력 프롬프트를 동적으로 생성하며, 각 지표의 정상 범위와 현재 값을 포함.
 
@@ -19,28 +50,14 @@ def generate_service_input_prompt(time_of_anomaly: str, target_name: str, instan
     :param instance_type: 이상이 발생한 인스턴스 유형
     :param anomalous_metrics: 튜플 리스트로, 각 요소는 (지표명, 정상 범위, 현재 값) 형태입니다.
                               정상 범위는 (최소값, 최대값) 형태의 튜플이어야 합니다.
+    :param precision: 실수 값의 소수점 자릿수 (None 이면 그대로 출력)
     :return: 포맷팅된 프롬프트 문자열
     """
-    metrics_str = ""
-    for idx, (metric_name, (lower, upper, avg, real_value)) in enumerate(anomalous_metrics.items(), start=1):
-        # metrics_str += f" 4.{idx}. {metric_name}: The percentage contributing to the anomaly is {contribution}%, and the actual value is {actual_value}.\n"
-        metrics_str += (
-            f" 4.{idx}. {metric_name}: The predicted allowable range is {lower} to {upper}, "
-            f"the average value is {avg}, and the current actual value is {real_value}.\n"
-        )
-
-    prompt = f"""
-
-1. Time of anomaly: {time_of_anomaly}
-2. Target Name: {target_name}
-3. Instance type of anomaly: {instance_type}
-4. Anomalous metrics:
-{metrics_str}""".strip()
+    return _render_input_prompt(time_of_anomaly, target_name, instance_type, anomalous_metrics, precision)
 
-    return prompt
 
-
-def generate_os_was_input_prompt(time_of_anomaly: str, target_id: str, instance_type: str, anomalous_metrics: dict):
+def generate_os_was_input_prompt(time_of_anomaly: str, target_id: str, instance_type: str, anomalous_metrics: dict,
+                                 precision: int | None = None):
     """
     OS WAS 입력 프롬프트를 동적으로 생성합니다.
 
@@ -48,38 +65,21 @@ def generate_os_was_input_prompt(time_of_anomaly: str, target_id: str, instance_
     :param target_id: 이상이 발생한 대상 이름
     :param instance_type: 이상이 발생한 인스턴스 유형
     :param anomalous_metrics: (지표명, 기여도 퍼센트, 실제 값) 형태의 튜플 리스트
+    :param precision: 실수 값의 소수점 자릿수 (None 이면 그대로 출력)
     :return: 포맷팅된 프롬프트 문자열
     """
-    metrics_str = ""
-    for idx, (metric_name, (lower, upper, avg, real_value)) in enumerate(anomalous_metrics.items(), start=1):
-        # metrics_str += f" 4.{idx}. {metric_name}: The percentage contributing to the anomaly is {contribution}%, and the actual value is {actual_value}.\n"
-        metrics_str += (
-            f" 4.{idx}. {metric_name}: The predicted allowable range is {lower} to {upper}, "
-            f"the average value is {avg}, and the current actual value is {real_value}.\n"
-        )
-
+    return _render_input_prompt(time_of_anomaly, target_id, instance_type, anomalous_metrics, precision)
 
-    prompt = f"""
 
-1. Time of anomaly: {time_of_anomaly}
-2. Target Name: {target_id}
-3. Instance type of anomaly: {instance_type}
-4. Anomalous metrics:
-{metrics_str}""".strip()
-
-    return prompt
+@lru_cache(maxsize=1024)
+def _render_metrics_definition(metrics: frozenset):
+    return "".join(f"\t\t- {metric_name}: {metric_definition}\n" for metric_name, metric_definition in sorted(metrics))
 
 
 def generate_metrics_definition_prompt(metrics: dict):
     """
-    Metrics 정의 형식 만들기
+    Metrics 정의 형식 만들기 - 같은 (지표, 정의) 집합은 캐시된 결과를 사용하며 지표명 순으로 출력한다.
     :param metrics: 정의가 필요한 지표들
     :return:
     """
-    metrics_definition_str = ""
-    for metric_name, metric_definition in metrics.items():
-        metrics_definition_str += (
-            f"\t\t- {metric_name}: {metric_definition}\n"
-        )
-
-    return metrics_definition_str
+    return _render_metrics_definition(frozenset(metrics.items()))
@@ -0,0 +1,153 @@
+import bisect
+import hashlib
+import json
+import threading
+import time
+
+from config import config
+
+from llm_api.Services.token_budget_service import token_counter
+from llm_api.Utils.logger import consumer_logger
+
+
+class AnswerCache:
+    """
+    이상 패턴 signature 기반 LLM 답변 캐시
+    signature: inst_type + 정상 범위(lower ~ upper)를 벗어난 지표별 (방향, 이탈 정도 구간) 집합
+    - 완전히 같은 signature의 답변만 그대로 재사용하며, target_id 필드만 현재 요청의 대상으로 바꾼다.
+    - 없으면 같은 inst_type의 signature 중 Jaccard 유사도가 ANSWER_CACHE_SIMILARITY 이상인 가장 가까운 답변을
+      LLM 프롬프트에 참고 답변(hint)으로 넣는다. (다른 대상의 수치와 표현이 섞이지 않도록 답변으로 쓰지 않음)
+    """
+
+    def __init__(self, redis_client):
+        self.redis_client = redis_client
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.hints = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_signature(anomaly_metrics: dict):
+        """
+        :param anomaly_metrics: {metric: [lower, upper, avg, real_value]}
+        :return: 정렬된 signature token 목록 (이탈 지표가 없으면 빈 목록)
+        """
+        tokens = []
+        for metric, (lower, upper, avg, real_value) in anomaly_metrics.items():
+            if lower is None or upper is None or real_value is None:
+                continue
+            width = max(upper - lower, 1e-9)
+            if real_value > upper:
+                direction, deviation = "high", (real_value - upper) / width
+            elif real_value < lower:
+                direction, deviation = "low", (lower - real_value) / width
+            else:
+                continue
+            bucket = bisect.bisect_left(config.ANSWER_CACHE_BUCKETS, deviation)
+            tokens.append(f"{metric}:{direction}:{bucket}")
+        return sorted(tokens)
+
+    @staticmethod
+    def _similarity(tokens_a: set, tokens_b: set):
+        return len(tokens_a & tokens_b) / len(tokens_a | tokens_b)
+
+    @staticmethod
+    def _signature_hash(tokens: list):
+        return hashlib.sha1("|".join(tokens).encode("utf-8")).hexdigest()
+
+    def _keys(self, inst_type: str):
+        prefix = f"{config.ANSWER_CACHE_KEY}:{inst_type}"
+        return f"{prefix}:answer", f"{prefix}:expire", f"{prefix}:signature"
+
+    def _count(self, kind: str):
+        with self._lock:
+            setattr(self, kind, getattr(self, kind) + 1)
+            return self.hits / (self.hits + self.hints + self.misses)
+
+    def lookup(self, input_prompt: dict):
+        """
+        캐시된 답변을 조회한다.
+        :return: (답변, 참고 답변) - 같은 signature의 답변이 있으면 target_id만 바꾼 답변,
+                 없고 유사한 signature의 답변이 있으면 참고 답변 (해당 없는 값은 None)
+        """
+        if not config.ANSWER_CACHE_ENABLED or not input_prompt.get("anomaly_metrics"):
+            return None, None
+
+        tokens = self.make_signature(input_prompt["anomaly_metrics"])
+        if not tokens:
+            return None, None
+
+        inst_type = input_prompt["inst_type"]
+        answer_prefix, expire_key, signature_key = self._keys(inst_type)
+
+        cached = self.redis_client.get(f"{answer_prefix}:{self._signature_hash(tokens)}")
+        if cached is not None:
+            hit_rate = self._count("hits")
+            consumer_logger.info(f"답변 캐시 적중 - inst_type: {inst_type}, 대상: {input_prompt['target_name']}, "
+                                 f"적중률: {hit_rate:.2%}")
+            return {**json.loads(cached)["response"], "target_id": input_prompt["target_name"]}, None
+
+        similar = None
+        if config.ANSWER_CACHE_SIMILARITY < 1.0:
+            candidates = self.redis_client.zrevrangebyscore(
+                expire_key, "+inf", time.time(), start=0, num=config.ANSWER_CACHE_MAX_CANDIDATES
+            )
+            best_hash, similarity = None, 0.0
+            if candidates:
+                token_set = set(tokens)
+                for candidate_hash, candidate_tokens in zip(candidates, self.redis_client.hmget(signature_key, candidates)):
+                    if candidate_tokens is None:
+                        continue
+                    candidate_similarity = self._similarity(token_set, set(json.loads(candidate_tokens)))
+                    if candidate_similarity > similarity:
+                        best_hash, similarity = candidate_hash, candidate_similarity
+            if best_hash is not None and similarity >= config.ANSWER_CACHE_SIMILARITY:
+                similar = self.redis_client.get(f"{answer_prefix}:{best_hash}")
+            if similar is not None:
+                self._count("hints")
+                consumer_logger.info(f"유사 답변 참고 - inst_type: {inst_type}, 대상: {input_prompt['target_name']}, "
+                                     f"유사도: {similarity:.2f}")
+                return None, json.loads(similar)["response"]
+
+        self._count("misses")
+        return None, None
+
+    @staticmethod
+    def add_hint(input_prompt: dict, similar_response: dict):
+        """
+        유사 패턴의 이전 답변을 few-shot 뒤에 참고 답변으로 붙인 프롬프트 입력을 반환한다.
+        ANSWER_CACHE_HINT_MAX_TOKENS 를 넘으면 붙이지 않는다.
+        """
+        hint = ("\n\n※ Previous answer for a similar anomaly pattern on another target. "
+                "Use it only as a reference and answer from the data delivered to you.\n"
+                f"{json.dumps(similar_response, ensure_ascii=False)}\n")
+        if token_counter.count(hint) > config.ANSWER_CACHE_HINT_MAX_TOKENS:
+            return input_prompt
+        return {**input_prompt, "few_shot_learning": input_prompt.get("few_shot_learning", "") + hint}
+
+    def store(self, input_prompt: dict, response: dict):
+        """LLM 답변(요청 정보 추가 전)을 signature로 저장"""
+        if not config.ANSWER_CACHE_ENABLED or not input_prompt.get("anomaly_metrics") or not response:
+            return
+
+        tokens = self.make_signature(input_prompt["anomaly_metrics"])
+        if not tokens:
+            return
+
+        answer_prefix, expire_key, signature_key = self._keys(input_prompt["inst_type"])
+        signature_hash = self._signature_hash(tokens)
+        now = time.time()
+
+        # 만료된 signature 정리
+        expired = self.redis_client.zrangebyscore(expire_key, "-inf", now)
+
+        pipe = self.redis_client.pipeline(transaction=False)
+        if expired:
+            pipe.zrem(expire_key, *expired)
+            pipe.hdel(signature_key, *expired)
+        pipe.set(f"{answer_prefix}:{signature_hash}",
+                 json.dumps({"target_name": input_prompt["target_name"], "response": response}),
+                 ex=config.ANSWER_CACHE_TTL_SEC)
+        pipe.zadd(expire_key, {signature_hash: now + config.ANSWER_CACHE_TTL_SEC})
+        pipe.hset(signature_key, signature_hash, json.dumps(tokens))
+        pipe.execute()
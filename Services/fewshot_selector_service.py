@@ -0,0 +1,116 @@
+import json
+import re
+
+import numpy as np
+
+from config import config
+
+from llm_api.Prompts.fewshot_prompt import few_shot_prompt
+from llm_api.Prompts.metrics_prompt import metrics_definition_prompt
+from llm_api.Services.token_budget_service import token_counter
+
+from llm_api.Utils.logger import llm_logger
+
+METRIC_TOKEN_PATTERN = re.compile(r"[a-z][a-z0-9]*(?:_[a-z0-9]+)+|[a-z]+")
+
+# 프롬프트 생성 시 넘어오는 inst_type (tier type: os/was/db, Service 요청: service)
+PROMPT_INST_TYPES = ("os", "was", "db", "service")
+# 요청 inst_type -> few-shot 예시 / xaiops_meta_metric.target_type (둘 다 OS 를 host 로 표기)
+EXAMPLE_INST_TYPE_ALIASES = {"os": "host"}
+
+
+def normalize_inst_type(inst_type: str):
+    inst_type = (inst_type or "").lower()
+    return EXAMPLE_INST_TYPE_ALIASES.get(inst_type, inst_type)
+
+
+class FewShotSelector:
+    """
+    few-shot 예시를 지표 패턴 벡터로 색인해 두고, 요청의 이상 지표와 가장 비슷한 예시만 골라 프롬프트에 넣는다.
+    - 예시 벡터: situation/issue 에 등장하는 지표 id 의 multi-hot 벡터 (시작 시 한 번 계산, L2 정규화)
+    - 요청 벡터: 이상 지표 id 의 multi-hot 벡터, 정상 범위를 벗어난 지표는 FEWSHOT_OUT_OF_BAND_WEIGHT 가중치
+    - 같은 inst_type(os 는 host 로 정규화) 예시 중 cosine 유사도 상위 FEWSHOT_TOP_K 개를 FEWSHOT_TOKEN_BUDGET 안에서 선택한다.
+    """
+
+    def __init__(self, examples: list):
+        known_metrics = set(metrics_definition_prompt)
+        example_metrics = [self._extract_metrics(example, known_metrics) for example in examples]
+        self.vocabulary = {metric: idx for idx, metric in enumerate(sorted(set().union(*example_metrics)))}
+
+        self.inst_types = np.array([normalize_inst_type(example["inst_type"]) for example in examples])
+        missing = [inst_type for inst_type in PROMPT_INST_TYPES
+                   if normalize_inst_type(inst_type) not in set(self.inst_types.tolist())]
+        if missing:
+            llm_logger.warning(f"few-shot 예시가 없는 inst_type: {missing} (해당 요청은 few-shot 없이 생성)")
+        self.vectors = np.zeros((len(examples), len(self.vocabulary)), dtype=np.float32)
+        for row, metrics in enumerate(example_metrics):
+            self.vectors[row, [self.vocabulary[metric] for metric in metrics]] = 1.0
+        norms = np.linalg.norm(self.vectors, axis=1, keepdims=True)
+        self.vectors /= np.where(norms == 0, 1.0, norms)
+
+        self.rendered = [json.dumps(example, ensure_ascii=False, indent=4) for example in examples]
+        self._token_counts = None
+        llm_logger.info(f"few-shot 예시 색인 완료 - 예시 수: {len(examples)}, 지표 차원: {len(self.vocabulary)}")
+
+    @staticmethod
+    def _extract_metrics(example: dict, known_metrics: set):
+        text = f"{example.get('situation', '')} {example.get('issue', '')}"
+        return {token for token in METRIC_TOKEN_PATTERN.findall(text) if token in known_metrics}
+
+    @property
+    def token_counts(self):
+        # 토크나이저 로딩이 import 시점에 일어나지 않도록 처음 선택할 때 센다.
+        if self._token_counts is None:
+            self._token_counts = np.array([token_counter.count(text) for text in self.rendered])
+        return self._token_counts
+
+    def _make_query(self, anomaly_metrics: dict):
+        query = np.zeros(len(self.vocabulary), dtype=np.float32)
+        for metric, (lower, upper, avg, real_value) in anomaly_metrics.items():
+            idx = self.vocabulary.get(metric)
+            if idx is None:
+                continue
+            out_of_band = None not in (lower, upper, real_value) and not lower <= real_value <= upper
+            query[idx] = config.FEWSHOT_OUT_OF_BAND_WEIGHT if out_of_band else 1.0
+        norm = np.linalg.norm(query)
+        return query / norm if norm else None
+
+    def select(self, inst_type: str, anomaly_metrics: dict, token_budget: int | None = None):
+        """
+        :return: 선택된 예시의 인덱스 목록 (유사도 높은 순)
+        """
+        if not config.FEWSHOT_ENABLED or not anomaly_metrics:
+            return []
+        token_budget = config.FEWSHOT_TOKEN_BUDGET if token_budget is None else token_budget
+        query = self._make_query(anomaly_metrics)
+        if query is None:
+            return []
+
+        similarities = self.vectors @ query
+        similarities[self.inst_types != normalize_inst_type(inst_type)] = -1.0
+
+        selected, used_tokens = [], 0
+        token_counts = self.token_counts
+        for idx in np.argsort(-similarities, kind="stable"):
+            if len(selected) >= config.FEWSHOT_TOP_K or similarities[idx] < config.FEWSHOT_MIN_SIMILARITY:
+                break
+            if used_tokens + token_counts[idx] > token_budget:
+                continue
+            selected.append(int(idx))
+            used_tokens += int(token_counts[idx])
+
+        llm_logger.debug(f"few-shot 예시 선택 - inst_type: {inst_type}, 선택: {selected}, "
+                         f"유사도: {[round(float(similarities[idx]), 3) for idx in selected]}, 토큰: {used_tokens}")
+        return selected
+
+    def render(self, selected: list):
+        if not selected:
+            return ""
+        examples = "\n\n".join(f"Example {order}\n{self.rendered[idx]}" for order, idx in enumerate(selected, start=1))
+        return f"\n\n※ Please refer to the following when answering.\n{examples}\n"
+
+    def select_and_render(self, inst_type: str, anomaly_metrics: dict, token_budget: int | None = None):
+        return self.render(self.select(inst_type, anomaly_metrics, token_budget))
+
+
+few_shot_selector = FewShotSelector(few_shot_prompt)
@@ -1,9 +1,16 @@
+from collections import namedtuple
+
+import numpy as np
+
+from sqlalchemy import select, bindparam, tuple_
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
 
 from llm_api.Models.ai_result_gdn_performance_model import AiResultGdnPerformance
 from llm_api.Models.dbsln_result_performance_model import DbslnResultPerformanceModel
 
+from llm_api.Utils.data_utils import to_datetime
 from llm_api.Utils.logger import db_logger
 
 
@@ -15,16 +22,25 @@ def get_metrics_host_instance_db2(db:Session, time: str, target_id: str, inst_ty
         AiResultGdnPerformance.inst_type == inst_type
     ).all()
 
+# 요청마다 새로 구성하지 않고 재사용하는 statement - SQLAlchemy compiled cache를 그대로 사용한다.
+_gdn_metrics_stmt = (
+    select(
+        AiResultGdnPerformance.metric,
+        AiResultGdnPerformance.real_value,
+        AiResultGdnPerformance.anomaly_contribution
+    ).where(
+        AiResultGdnPerformance.time == bindparam("time"),
+        AiResultGdnPerformance.target_id == bindparam("target_id"),
+        AiResultGdnPerformance.inst_type == bindparam("inst_type")
+    )
+)
+
+
 def get_metrics_host_instance_db(db: Session, time: str, target_id: str, inst_type: str):
     db_logger.info(f"[Host, Instance, DB] GDN 성능 지표 조회 시작 - 시간: {time}, 대상 ID: {target_id}, 인스턴스 유형: {inst_type}")
     try:
-        result = db.query(
-            AiResultGdnPerformance.metric,
-            AiResultGdnPerformance.real_value
-        ).filter(
-            AiResultGdnPerformance.time == time,
-            AiResultGdnPerformance.target_id == target_id,
-            AiResultGdnPerformance.inst_type == inst_type
+        result = db.execute(
+            _gdn_metrics_stmt, {"time": time, "target_id": target_id, "inst_type": inst_type}
         ).all()
 
         db_logger.debug(f"[Host, Instance, DB] GDN 성능 지표 조회 결과: {result}")
@@ -32,4 +48,91 @@ def get_metrics_host_instance_db(db: Session, time: str, target_id: str, inst_ty
 
     except SQLAlchemyError:
         db_logger.exception("[Host, Instance, DB] GDN 성능 지표 조회 중 오류 발생")
-        return []
\ No newline at end of file
+        return []
+
+
+class GdnMetricColumns(namedtuple("GdnMetricColumns", ["metric", "real_value", "model_value", "anomaly_contribution"])):
+    """한 대상의 GDN 성능 지표를 열 단위로 담은 값 (metric: list, 나머지: float 배열, NULL은 NaN)"""
+
+    def rows(self):
+        """(metric, real_value, anomaly_contribution) 행 목록 - NaN 은 None 으로 되돌린다."""
+        return [
+            (metric, None if np.isnan(real_value) else real_value,
+             None if np.isnan(anomaly_contribution) else anomaly_contribution)
+            for metric, real_value, anomaly_contribution in zip(
+                self.metric, self.real_value.tolist(), self.anomaly_contribution.tolist())
+        ]
+
+
+# (time, target_id, inst_type) 가 PK(time, target_id, inst_type, metric)의 앞부분이므로
+# 대상 목록 전체가 PK 인덱스 range scan 한 번으로 처리된다.
+# (real_value 등까지 index-only 로 읽으려면 PK 인덱스에 INCLUDE 컬럼 추가 필요)
+_gdn_bulk_stmt = (
+    select(
+        AiResultGdnPerformance.target_id,
+        AiResultGdnPerformance.inst_type,
+        AiResultGdnPerformance.metric,
+        AiResultGdnPerformance.real_value,
+        AiResultGdnPerformance.model_value,
+        AiResultGdnPerformance.anomaly_contribution,
+    )
+    .where(
+        AiResultGdnPerformance.time == bindparam("time"),
+        tuple_(AiResultGdnPerformance.target_id, AiResultGdnPerformance.inst_type).in_(
+            bindparam("targets", expanding=True)),
+    )
+    .order_by(AiResultGdnPerformance.target_id, AiResultGdnPerformance.inst_type, AiResultGdnPerformance.metric)
+)
+
+
+def get_metrics_host_instance_db_bulk(db: Session, time: str, targets: list):
+    """
+    같은 시점의 여러 대상 GDN 성능 지표를 한 번의 쿼리로 가져와 대상별 열 배열로 나눈다.
+    :param targets: [(target_id, inst_type)]
+    :return: {(target_id, inst_type): GdnMetricColumns} - 결과가 없는 대상은 빈 배열
+    """
+    db_logger.info(f"[Host, Instance, DB] GDN 성능 지표 일괄 조회 시작 - 시간: {time}, 대상 수: {len(targets)}")
+    targets = list(dict.fromkeys(targets))
+    empty = GdnMetricColumns([], np.empty(0), np.empty(0), np.empty(0))
+    result = {target: empty for target in targets}
+    if not targets:
+        return result
+    try:
+        rows = db.execute(_gdn_bulk_stmt, {"time": time, "targets": targets}).all()
+        if not rows:
+            return result
+
+        target_ids, inst_types, metrics, real_values, model_values, contributions = zip(*rows)
+        real_values = np.array(real_values, dtype=np.float64)
+        model_values = np.array(model_values, dtype=np.float64)
+        contributions = np.array(contributions, dtype=np.float64)
+
+        # order_by 로 대상별로 연속되어 있으므로 경계 위치로 잘라낸다.
+        boundaries = [idx for idx in range(1, len(rows))
+                      if (target_ids[idx], inst_types[idx]) != (target_ids[idx - 1], inst_types[idx - 1])]
+        for start, end in zip([0] + boundaries, boundaries + [len(rows)]):
+            result[(target_ids[start], inst_types[start])] = GdnMetricColumns(
+                list(metrics[start:end]), real_values[start:end], model_values[start:end], contributions[start:end])
+
+        db_logger.debug(f"[Host, Instance, DB] GDN 성능 지표 일괄 조회 결과 - 행 수: {len(rows)}")
+        return result
+
+    except SQLAlchemyError:
+        db_logger.exception("[Host, Instance, DB] GDN 성능 지표 일괄 조회 중 오류 발생")
+        return result
+
+
+async def aget_metrics_host_instance_db(db: AsyncSession, time: str, target_id: str, inst_type: str):
+    """get_metrics_host_instance_db 의 비동기 버전"""
+    db_logger.info(f"[Host, Instance, DB] GDN 성능 지표 비동기 조회 시작 - 시간: {time}, 대상 ID: {target_id}, 인스턴스 유형: {inst_type}")
+    try:
+        result = (await db.execute(
+            _gdn_metrics_stmt, {"time": to_datetime(time), "target_id": target_id, "inst_type": inst_type}
+        )).all()
+
+        db_logger.debug(f"[Host, Instance, DB] GDN 성능 지표 조회 결과: {result}")
+        return result
+
+    except SQLAlchemyError:
+        db_logger.exception("[Host, Instance, DB] GDN 성능 지표 비동기 조회 중 오류 발생")
+        return []
@@ -1,9 +1,12 @@
+from sqlalchemy import select, bindparam, and_
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
 
 from llm_api.Models.dbsln_result_service_performance_model import DBSLNResultServicePerformance
 from llm_api.Models.xaiops_meta_metric_model import XaiopsMetaMetric
 
+from llm_api.Utils.data_utils import to_datetime
 from llm_api.Utils.logger import db_logger
 
 
@@ -54,4 +57,74 @@ def get_metrics_names_service(db:Session, metrics: list):
 
     except SQLAlchemyError:
         db_logger.exception("[Service] 메트릭 설명 조회 중 오류 발생")
-        return {}
\ No newline at end of file
+        return {}
+
+
+SERVICE_TARGET_TYPE = "service"
+
+# 요청마다 새로 구성하지 않고 재사용하는 statement - SQLAlchemy compiled cache를 그대로 사용한다.
+_metrics_with_desc_stmt = (
+    select(
+        DBSLNResultServicePerformance.target_id,
+        DBSLNResultServicePerformance.metric,
+        DBSLNResultServicePerformance.real_value,
+        DBSLNResultServicePerformance.dbsln_lower,
+        DBSLNResultServicePerformance.dbsln_upper,
+        XaiopsMetaMetric.metric_desc,
+    )
+    .outerjoin(XaiopsMetaMetric, and_(
+        XaiopsMetaMetric.metric_id == DBSLNResultServicePerformance.metric,
+        XaiopsMetaMetric.target_type == SERVICE_TARGET_TYPE,
+    ))
+    .where(
+        DBSLNResultServicePerformance.time == bindparam("time"),
+        DBSLNResultServicePerformance.target_id.in_(bindparam("tx_codes", expanding=True)),
+    )
+)
+
+
+def _group_metrics_with_desc(rows, tx_codes: list):
+    # service target_type 안에서도 제품 유형(inst_product_type)별로 같은 metric_id가 있을 수 있으므로 지표당 한 건만 사용
+    result = {tx_code: [] for tx_code in tx_codes}
+    seen = set()
+    for target_id, metric, real_value, dbsln_lower, dbsln_upper, metric_desc in rows:
+        if (target_id, metric) in seen:
+            continue
+        seen.add((target_id, metric))
+        result.setdefault(target_id, []).append((metric, real_value, dbsln_lower, dbsln_upper, metric_desc))
+    return result
+
+
+def get_metrics_with_desc_service(db: Session, time: str, tx_codes: list):
+    """
+    dbsln_result_service_performance 와 xaiops_meta_metric 을 조인해 지표, 실제값, 기준선, 설명을 한 번에 가져온다.
+    :param db:
+    :param time: 이상 발생 시점
+    :param tx_codes: tx_code 목록
+    :return: {tx_code: [(metric, real_value, dbsln_lower, dbsln_upper, metric_desc)]}
+    """
+    db_logger.info(f"[Service] 성능 지표/설명 조회 시작 - 시간: {time}, 대상 ID: {tx_codes}")
+    try:
+        rows = db.execute(_metrics_with_desc_stmt, {"time": time, "tx_codes": list(tx_codes)}).all()
+        result = _group_metrics_with_desc(rows, tx_codes)
+        db_logger.debug(f"[Service] 성능 지표/설명 조회 결과: {result}")
+        return result
+
+    except SQLAlchemyError:
+        db_logger.exception("[Service] 성능 지표/설명 조회 중 오류 발생")
+        return {}
+
+
+async def aget_metrics_with_desc_service(db: AsyncSession, time: str, tx_codes: list):
+    """get_metrics_with_desc_service 의 비동기 버전"""
+    db_logger.info(f"[Service] 성능 지표/설명 비동기 조회 시작 - 시간: {time}, 대상 ID: {tx_codes}")
+    try:
+        rows = (await db.execute(_metrics_with_desc_stmt,
+                                 {"time": to_datetime(time), "tx_codes": list(tx_codes)})).all()
+        result = _group_metrics_with_desc(rows, tx_codes)
+        db_logger.debug(f"[Service] 성능 지표/설명 조회 결과: {result}")
+        return result
+
+    except SQLAlchemyError:
+        db_logger.exception("[Service] 성능 지표/설명 비동기 조회 중 오류 발생")
+        return {}
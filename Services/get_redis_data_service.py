@@ -1,32 +1,254 @@
+import threading
+import time as time_module
+
+from collections import OrderedDict
+
+import numpy as np
+
 from redis.commands.json.path import Path
 
 from datetime import datetime
 
-from llm_api.Models.database import rj
+from config import config
+from llm_api.Models.database import rj, rj_async
 from llm_api.Utils.logger import db_logger
 
-
-def _cal_day(date_str: str):
-    dt = datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S")
-    return dt.weekday()
+MINUTES_PER_DAY = 1440
+BASELINE_KEY_PREFIX = "exem_aiops_anls_service/"
 
 
-def _cal_minute(date_str: str):
+def _cal_day_minute(date_str: str):
+    """시간 문자열을 한 번만 파싱해 (요일, 분) 반환"""
     dt = datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S")
-    return dt.hour * 60 + dt.minute
-
+    return dt.weekday(), dt.hour * 60 + dt.minute
 
-def get_redis_metric_datas(time: str, metric: str, inst_type: str, target_or_txcode: str):
-    day_num = _cal_day(time)
-    minute = _cal_minute(time)
 
+def _get_day_num(day_num: int, inst_type: str):
+    # Service는 평일(0), 주말(5) 기준선만 존재
     if inst_type == "service":
         if 0 <= day_num <= 4:
             day_num = 0
         elif 5 <= day_num <= 6:
             day_num = 5
+    return day_num
+
+
+def _make_key_name(inst_type: str, target_or_txcode: str, metric: str, day_num: int):
+    return f"{BASELINE_KEY_PREFIX}{inst_type}/all/dbsln/dbsln_{inst_type}_all_{target_or_txcode}_{metric}_day{day_num}"
+
+
+class BaselineCache:
+    """
+    DBSLN 기준선 하루치 문서를 (분, [lower, upper, avg, std]) NumPy 배열로 보관하는 in-process LRU 캐시
+    - 기준선은 모델 재학습 시에만 바뀌므로 (대상, 지표, 요일) 단위로 한 번만 읽고 분 단위 조회는 배열 인덱싱으로 처리한다.
+    - 메모리 사용량이 BASELINE_CACHE_MAX_MB를 넘으면 가장 오래 사용하지 않은 문서부터 제거한다.
+    - keyspace notification 으로 key가 다시 쓰이면 무효화하고, 알림을 놓친 경우를 대비해 TTL도 둔다.
+    - 문서가 없거나 읽을 수 없는 key도 배열 없이(None) BASELINE_CACHE_MISSING_TTL_SEC 동안 보관해 매번 다시 조회하지 않는다.
+    """
+
+    def __init__(self, max_bytes: int, ttl_sec: int):
+        self.max_bytes = max_bytes
+        self.ttl_sec = ttl_sec
+        self._entries: OrderedDict[str, tuple[np.ndarray | None, float]] = OrderedDict()  # key: (배열, 만료 시각)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._listener = None
+        self._listener_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def to_array(document):
+        """기준선 문서({minute: [lower, upper, avg, std]} 또는 분 순서 리스트)를 (1440, 4) 배열로 변환"""
+        array = np.full((MINUTES_PER_DAY, 4), np.nan, dtype=np.float64)
+        items = document.items() if isinstance(document, dict) else enumerate(document)
+        for minute, value in items:
+            if value is not None:
+                array[int(minute)] = value
+        return array
+
+    def get(self, key_name: str):
+        """
+        :return: (캐시 적중 여부, 배열) - 문서가 없는 key로 캐시된 경우 (True, None)
+        """
+        with self._lock:
+            entry = self._entries.get(key_name)
+            if entry is not None and time_module.monotonic() < entry[1]:
+                self._entries.move_to_end(key_name)
+                self.hits += 1
+                return True, entry[0]
+            if entry is not None:
+                self._remove(key_name)
+            self.misses += 1
+            return False, None
+
+    def put(self, key_name: str, array: np.ndarray | None, ttl_sec: int | None = None):
+        """array 가 None 이면 문서가 없는 key로 보관한다."""
+        with self._lock:
+            if key_name in self._entries:
+                self._remove(key_name)
+            self._entries[key_name] = (array, time_module.monotonic() + (self.ttl_sec if ttl_sec is None else ttl_sec))
+            self._bytes += array.nbytes if array is not None else 0
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, key_name: str):
+        with self._lock:
+            if key_name in self._entries:
+                self._remove(key_name)
+                self.invalidations += 1
+
+    def _remove(self, key_name: str):
+        array, _ = self._entries.pop(key_name)
+        self._bytes -= array.nbytes if array is not None else 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def start_invalidation_listener(self):
+        """기준선 key에 대한 keyspace notification을 구독해 변경/삭제된 key를 무효화"""
+        if self._listener is not None or not config.BASELINE_CACHE_KEYSPACE_EVENTS:
+            return
+        with self._listener_lock:
+            if self._listener is None:
+                self._subscribe_keyspace_events()
+
+    def _subscribe_keyspace_events(self):
+        db_index = rj.connection_pool.connection_kwargs.get("db", 0)
+        pattern = f"__keyspace@{db_index}__:{BASELINE_KEY_PREFIX}*"
+        channel_prefix_len = len(f"__keyspace@{db_index}__:")
+
+        def _handler(message):
+            self.invalidate(message["channel"][channel_prefix_len:])
+
+        try:
+            pubsub = rj.pubsub(ignore_subscribe_messages=True)
+            pubsub.psubscribe(**{pattern: _handler})
+            self._listener = pubsub.run_in_thread(sleep_time=1, daemon=True)
+            db_logger.info(f"[Redis] 기준선 캐시 무효화 구독 시작 - pattern: {pattern} "
+                           f"(Redis notify-keyspace-events 설정 필요)")
+        except Exception:
+            db_logger.exception("[Redis] 기준선 캐시 무효화 구독 실패, TTL 기반으로만 갱신")
+
+
+baseline_cache = BaselineCache(config.BASELINE_CACHE_MAX_MB * 1024 * 1024, config.BASELINE_CACHE_TTL_SEC)
+
+
+def _split_cached_arrays(key_names: list):
+    """캐시에 있는 기준선 배열과 Redis에서 읽어야 하는 key 목록을 나눈다. (문서가 없는 것으로 캐시된 key는 둘 다 제외)"""
+    arrays = {}
+    missing_keys = []
+    for key_name in key_names:
+        hit, array = baseline_cache.get(key_name)
+        if not hit:
+            missing_keys.append(key_name)
+        elif array is not None:
+            arrays[key_name] = array
+    return arrays, missing_keys
+
+
+def _cache_documents(arrays: dict, missing_keys: list, documents: list, requested: int):
+    """
+    JSON.MGET 으로 읽은 기준선 문서를 배열로 바꿔 캐시에 적재한다.
+    문서가 없거나 형식이 잘못된 key는 결과에서 빼고 BASELINE_CACHE_MISSING_TTL_SEC 동안 없는 것으로 캐시한다.
+    """
+    for key_name, document in zip(missing_keys, documents):
+        array = None
+        if document is not None:
+            try:
+                array = baseline_cache.to_array(document)
+            except Exception as e:
+                db_logger.warning(f"[Redis] 기준선 문서 형식 오류 - key: {key_name}, {e}")
+        if array is None:
+            baseline_cache.put(key_name, None, config.BASELINE_CACHE_MISSING_TTL_SEC)
+            continue
+        baseline_cache.put(key_name, array)
+        arrays[key_name] = array
+
+    total = baseline_cache.hits + baseline_cache.misses
+    if total and total % config.BASELINE_CACHE_STATS_INTERVAL < requested:
+        db_logger.info(f"[Redis] 기준선 캐시 통계: {baseline_cache.stats()}")
+    return arrays
+
 
-    key_name = f"exem_aiops_anls_service/{inst_type}/all/dbsln/dbsln_{inst_type}_all_{target_or_txcode}_{metric}_day{day_num}"
+def _load_baseline_arrays(key_names: list):
+    """
+    캐시에 없는 기준선 문서를 JSON.MGET 한 번으로 읽어 캐시에 적재한다.
+    :return: {key_name: 배열} - 문서가 없는 key는 제외
+    """
+    arrays, missing_keys = _split_cached_arrays(key_names)
+    documents = rj.json().mget(missing_keys, Path.root_path()) if missing_keys else []
+    return _cache_documents(arrays, missing_keys, documents, len(key_names))
+
+
+async def _aload_baseline_arrays(key_names: list):
+    """_load_baseline_arrays 의 비동기 버전"""
+    arrays, missing_keys = _split_cached_arrays(key_names)
+    documents = await rj_async.json().mget(missing_keys, Path.root_path()) if missing_keys else []
+    return _cache_documents(arrays, missing_keys, documents, len(key_names))
+
+
+def _pick_minute_values(key_names: list, arrays: dict, minute: int):
+    values = []
+    for key_name in key_names:
+        row = arrays[key_name][minute] if key_name in arrays else None
+        values.append(None if row is None or np.isnan(row).any() else row.tolist())
+    return values
+
+
+def _prepare_bulk_keys(time: str, metrics: list, inst_type: str, target_or_txcode: str):
+    day_num, minute = _cal_day_minute(time)
+    day_num = _get_day_num(day_num, inst_type)
+    key_names = [_make_key_name(inst_type, target_or_txcode, metric, day_num) for metric in metrics]
+
+    db_logger.info(
+        f"[Redis] 기준선 일괄 조회 시작 - 시간: {time} (분: {minute}), 지표 수: {len(metrics)}, "
+        f"인스턴스 유형: {inst_type}, 대상: {target_or_txcode}"
+    )
+    return key_names, minute
+
+
+def _is_baseline_value(value):
+    """[lower, upper, avg, std] 형식인지 확인"""
+    return isinstance(value, (list, tuple)) and len(value) == 4 and \
+        all(isinstance(item, (int, float)) and not isinstance(item, bool) for item in value)
+
+
+def _collect_bulk_results(metrics: list, values: list, target_or_txcode: str):
+    results, missing = {}, []
+    for metric, value in zip(metrics, values):
+        if value is None:
+            missing.append(metric)
+        elif not _is_baseline_value(value):
+            db_logger.warning(f"[Redis] 기준선 값 형식 오류 - 대상: {target_or_txcode}, 지표: {metric}, 값: {value}")
+            missing.append(metric)
+        else:
+            results[metric] = value
+
+    if missing:
+        db_logger.warning(f"[Redis] 기준선이 없는 지표 - 대상: {target_or_txcode}, 지표: {missing}")
+    db_logger.debug(f"[Redis] 일괄 조회 결과: {results}")
+    return results, missing
+
+
+def get_redis_metric_datas(time: str, metric: str, inst_type: str, target_or_txcode: str):
+    day_num, minute = _cal_day_minute(time)
+    day_num = _get_day_num(day_num, inst_type)
+
+    key_name = _make_key_name(inst_type, target_or_txcode, metric, day_num)
 
     db_logger.info(
         f"[Redis] 데이터 조회 시작 - key: {key_name}, 시간: {time} (분: {minute}), "
@@ -41,3 +263,48 @@ def get_redis_metric_datas(time: str, metric: str, inst_type: str, target_or_txc
     except Exception:
         db_logger.exception(f"[Redis] 메트릭 기준선 조회 중 오류 발생 - key: {key_name}")
         return None
+
+
+def get_redis_metric_datas_bulk(time: str, metrics: list, inst_type: str, target_or_txcode: str):
+    """
+    한 대상의 여러 지표 기준선을 JSON.MGET 한 번으로 조회한다.
+    :param time: 이상 발생 시점
+    :param metrics: 지표 목록
+    :param inst_type: 인스턴스 유형
+    :param target_or_txcode: 대상 이름 또는 tx_code
+    :return: ({metric: [lower, upper, avg, std]}, 기준선이 없는 지표 목록)
+    """
+    if not metrics:
+        return {}, []
+
+    key_names, minute = _prepare_bulk_keys(time, metrics, inst_type, target_or_txcode)
+    try:
+        if config.BASELINE_CACHE_ENABLED:
+            baseline_cache.start_invalidation_listener()
+            values = _pick_minute_values(key_names, _load_baseline_arrays(key_names), minute)
+        else:
+            values = rj.json().mget(key_names, Path(f".{minute}"))
+    except Exception:
+        db_logger.exception(f"[Redis] 메트릭 기준선 일괄 조회 중 오류 발생 - 대상: {target_or_txcode}")
+        return {}, list(metrics)
+
+    return _collect_bulk_results(metrics, values, target_or_txcode)
+
+
+async def aget_redis_metric_datas_bulk(time: str, metrics: list, inst_type: str, target_or_txcode: str):
+    """get_redis_metric_datas_bulk 의 비동기 버전 (기준선 캐시는 sync 버전과 공유)"""
+    if not metrics:
+        return {}, []
+
+    key_names, minute = _prepare_bulk_keys(time, metrics, inst_type, target_or_txcode)
+    try:
+        if config.BASELINE_CACHE_ENABLED:
+            baseline_cache.start_invalidation_listener()
+            values = _pick_minute_values(key_names, await _aload_baseline_arrays(key_names), minute)
+        else:
+            values = await rj_async.json().mget(key_names, Path(f".{minute}"))
+    except Exception:
+        db_logger.exception(f"[Redis] 메트릭 기준선 비동기 일괄 조회 중 오류 발생 - 대상: {target_or_txcode}")
+        return {}, list(metrics)
+
+    return _collect_bulk_results(metrics, values, target_or_txcode)
@@ -0,0 +1,177 @@
+import threading
+import time
+
+from contextlib import contextmanager
+
+from config import config
+
+from llm_api.Services.llm_transport_service import llm_transport, LLMTransport
+
+from llm_api.Utils.logger import llm_logger
+
+
+class EndpointState:
+    """Ollama endpoint 하나의 부하/상태 정보"""
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.in_flight = 0
+        self.tokens_per_sec = None  # 관측된 생성 속도 (EWMA), 관측 전에는 LLM_DEFAULT_TOKENS_PER_SEC 사용
+        self.healthy = True
+        self.consecutive_failures = 0
+        self.last_selected = 0.0
+        self.request_count = 0
+        self.failure_count = 0
+
+    @property
+    def weight(self):
+        return self.tokens_per_sec or config.LLM_DEFAULT_TOKENS_PER_SEC
+
+    @property
+    def score(self):
+        # 요청 하나를 더 보냈을 때 예상되는 상대 부하 - 작을수록 우선
+        return (self.in_flight + 1) / self.weight
+
+    def to_dict(self):
+        return {
+            "endpoint": self.endpoint,
+            "healthy": self.healthy,
+            "in_flight": self.in_flight,
+            "tokens_per_sec": round(self.tokens_per_sec, 2) if self.tokens_per_sec else None,
+            "request_count": self.request_count,
+            "failure_count": self.failure_count,
+        }
+
+
+class LLMLoadBalancer:
+    """
+    여러 Ollama endpoint 중 처리 중인 요청이 가장 적은 곳(least outstanding requests)으로 생성을 보낸다.
+    - 선택 기준: (in_flight + 1) / 관측 tokens/sec - 빠른 노드일수록 더 많은 동시 요청을 받는다.
+    - 요청 실패가 LLM_HEALTH_FAIL_THRESHOLD 번 연속되거나 health check 에 실패하면 endpoint 를 제외한다.
+    - 백그라운드 스레드가 LLM_HEALTH_CHECK_INTERVAL_SEC 마다 /api/tags 로 모델 존재 여부를 확인하고,
+      성공하면 제외했던 endpoint 를 다시 포함한다.
+    """
+
+    def __init__(self, transport: LLMTransport, model_name: str):
+        self.transport = transport
+        self.model_name = model_name
+        self._states = {endpoint: EndpointState(endpoint) for endpoint in transport.endpoints}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    @property
+    def endpoints(self):
+        return list(self._states)
+
+    def acquire(self):
+        """점수가 가장 낮은 endpoint 를 골라 in_flight 를 올린다. 정상 endpoint 가 없으면 전체에서 고른다."""
+        with self._lock:
+            candidates = [state for state in self._states.values() if state.healthy]
+            if not candidates:
+                llm_logger.warning("사용 가능한 Ollama endpoint 가 없어 전체 endpoint 중에서 선택합니다.")
+                candidates = list(self._states.values())
+            state = min(candidates, key=lambda candidate: (candidate.score, candidate.last_selected))
+            state.in_flight += 1
+            state.request_count += 1
+            state.last_selected = time.monotonic()
+            return state.endpoint
+
+    def release(self, endpoint: str, elapsed: float, eval_tokens: int | None = None, success: bool = True):
+        """
+        :param elapsed: 생성 소요 시간(초) - eval_tokens 와 함께 tokens/sec 계산에 사용
+        :param eval_tokens: 생성된 토큰 수 (알 수 없으면 None, 속도 갱신 생략)
+        """
+        with self._lock:
+            state = self._states[endpoint]
+            state.in_flight = max(state.in_flight - 1, 0)
+            if not success:
+                state.failure_count += 1
+                state.consecutive_failures += 1
+                if state.healthy and state.consecutive_failures >= config.LLM_HEALTH_FAIL_THRESHOLD:
+                    state.healthy = False
+                    llm_logger.warning(f"Ollama endpoint 제외 - {endpoint}, 연속 실패: {state.consecutive_failures}")
+                return
+            state.consecutive_failures = 0
+            if eval_tokens and elapsed > 0:
+                tokens_per_sec = eval_tokens / elapsed
+                alpha = config.LLM_TPS_EWMA_ALPHA
+                state.tokens_per_sec = tokens_per_sec if state.tokens_per_sec is None \
+                    else alpha * tokens_per_sec + (1 - alpha) * state.tokens_per_sec
+
+    @contextmanager
+    def lease(self):
+        """
+        with llm_balancer.lease() as lease: 로 endpoint 를 빌린다.
+        블록 안에서 lease["eval_tokens"], lease["eval_sec"] 를 채우면 속도 계산에 사용하고,
+        채우지 않으면 블록 전체 소요 시간만 기록한다. 예외가 나면 실패로 기록한다.
+        """
+        lease = {"endpoint": self.acquire(), "eval_tokens": None, "eval_sec": None}
+        start_time = time.monotonic()
+        try:
+            yield lease
+        except Exception:
+            self.release(lease["endpoint"], time.monotonic() - start_time, success=False)
+            raise
+        except BaseException:
+            # 취소(timeout)나 스트리밍 중단은 endpoint 실패로 보지 않고 in_flight 만 되돌린다.
+            self.release(lease["endpoint"], time.monotonic() - start_time)
+            raise
+        self.release(lease["endpoint"], lease["eval_sec"] or time.monotonic() - start_time, lease["eval_tokens"])
+
+    def check_endpoint(self, endpoint: str):
+        """/api/tags 응답에 대상 모델이 있으면 True"""
+        try:
+            response = self.transport.client(endpoint).get("/api/tags", timeout=config.LLM_HEALTH_TIMEOUT_SEC)
+            response.raise_for_status()
+            models = {model.get("name") for model in response.json().get("models", [])}
+            # tag 없이 지정한 모델은 Ollama 에서 :latest 로 표시된다.
+            return self.model_name in models or f"{self.model_name}:latest" in models
+        except Exception as e:
+            llm_logger.debug(f"Ollama health check 실패 - {endpoint}: {e}")
+            return False
+
+    def check_all(self):
+        for endpoint in self.endpoints:
+            available = self.check_endpoint(endpoint)
+            with self._lock:
+                state = self._states[endpoint]
+                if available:
+                    if not state.healthy:
+                        llm_logger.info(f"Ollama endpoint 복구 - {endpoint}")
+                    # 연속 실패만 제외 기준이 되도록 성공할 때마다 초기화
+                    state.healthy, state.consecutive_failures = True, 0
+                else:
+                    state.consecutive_failures += 1
+                    if state.healthy and state.consecutive_failures >= config.LLM_HEALTH_FAIL_THRESHOLD:
+                        state.healthy = False
+                        llm_logger.warning(f"Ollama endpoint 제외 - {endpoint}, "
+                                           f"health check 연속 실패: {state.consecutive_failures}")
+
+    def stats(self):
+        with self._lock:
+            return [state.to_dict() for state in self._states.values()]
+
+    def start(self):
+        """health check 스레드를 시작한다. (endpoint 가 하나뿐이면 실행하지 않음)"""
+        with self._lock:
+            if self._thread is not None or len(self._states) < 2:
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._health_loop, name="llm-health-check", daemon=True)
+            self._thread.start()
+        llm_logger.info(f"Ollama health check 시작 - endpoints: {self.endpoints}")
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _health_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                self.check_all()
+            except Exception:
+                llm_logger.exception("Ollama health check 중 오류 발생")
+            self._stop_event.wait(config.LLM_HEALTH_CHECK_INTERVAL_SEC)
+
+
+llm_balancer = LLMLoadBalancer(llm_transport, config.model_name)
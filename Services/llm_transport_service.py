@@ -0,0 +1,105 @@
+import threading
+
+import httpx
+
+from config import config
+
+from llm_api.Utils.logger import llm_logger
+
+
+def normalize_base_url(base_url: str):
+    """scheme 이 없는 Ollama 주소(예: 10.10.34.20:11434)에 http:// 를 붙인다."""
+    base_url = base_url.rstrip("/")
+    return base_url if "://" in base_url else f"http://{base_url}"
+
+
+class LLMTransport:
+    """
+    Ollama endpoint 별로 keep-alive connection pool(httpx transport)을 하나씩 두고 모든 LLM 호출이 공유한다.
+    - sync 는 HTTPTransport, async 는 AsyncHTTPTransport 를 사용하며 endpoint 당 한 번만 만든다.
+    - 연결/읽기 timeout 과 pool 크기, keep-alive 유지 시간은 LLM_* 설정을 따른다.
+    - AsyncHTTPTransport 의 연결은 처음 사용한 event loop 에 묶이므로 async 호출은 한 loop 에서 한다.
+    """
+
+    def __init__(self, base_urls: list):
+        self.endpoints = [normalize_base_url(base_url) for base_url in base_urls]
+        self._transports: dict[str, httpx.HTTPTransport] = {}
+        self._async_transports: dict[str, httpx.AsyncHTTPTransport] = {}
+        self._clients: dict[str, httpx.Client] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _limits():
+        return httpx.Limits(max_connections=config.LLM_POOL_MAX_CONNECTIONS,
+                            max_keepalive_connections=config.LLM_POOL_MAX_KEEPALIVE,
+                            keepalive_expiry=config.LLM_KEEPALIVE_EXPIRY_SEC)
+
+    @staticmethod
+    def timeout():
+        return httpx.Timeout(config.LLM_READ_TIMEOUT_SEC, connect=config.LLM_CONNECT_TIMEOUT_SEC)
+
+    def transport(self, base_url: str):
+        base_url = normalize_base_url(base_url)
+        if base_url not in self._transports:
+            with self._lock:
+                if base_url not in self._transports:
+                    llm_logger.info(f"LLM transport 생성 - endpoint: {base_url}")
+                    self._transports[base_url] = httpx.HTTPTransport(limits=self._limits(), retries=1)
+        return self._transports[base_url]
+
+    def async_transport(self, base_url: str):
+        base_url = normalize_base_url(base_url)
+        if base_url not in self._async_transports:
+            with self._lock:
+                if base_url not in self._async_transports:
+                    self._async_transports[base_url] = httpx.AsyncHTTPTransport(limits=self._limits(), retries=1)
+        return self._async_transports[base_url]
+
+    def client(self, base_url: str):
+        """endpoint 별 공유 httpx.Client (직접 /api/* 를 호출하는 곳에서 사용)"""
+        base_url = normalize_base_url(base_url)
+        if base_url not in self._clients:
+            transport = self.transport(base_url)
+            with self._lock:
+                if base_url not in self._clients:
+                    self._clients[base_url] = httpx.Client(base_url=base_url, transport=transport,
+                                                           timeout=self.timeout())
+        return self._clients[base_url]
+
+    def ollama_kwargs(self, base_url: str):
+        """OllamaLLM 에 넘길 인자 - 내부 ollama Client 들이 공유 transport 를 사용하게 한다."""
+        return {
+            "base_url": normalize_base_url(base_url),
+            "sync_client_kwargs": {"transport": self.transport(base_url), "timeout": self.timeout()},
+            "async_client_kwargs": {"transport": self.async_transport(base_url), "timeout": self.timeout()},
+        }
+
+    def generate(self, payload: dict, base_url: str | None = None):
+        """/api/generate 를 호출해 응답 JSON 을 반환 (기본 endpoint: 첫 번째)"""
+        response = self.client(base_url or self.endpoints[0]).post("/api/generate", json=payload)
+        response.raise_for_status()
+        return response.json()
+
+    def close(self):
+        with self._lock:
+            for client in self._clients.values():
+                client.close()
+            for transport in self._transports.values():
+                transport.close()
+            self._clients.clear()
+            self._transports.clear()
+
+    async def aclose(self):
+        """async transport 들을 닫는다. (생성한 event loop 가 아니면 연결 정리 중 오류가 날 수 있어 로그만 남김)"""
+        with self._lock:
+            async_transports = list(self._async_transports.items())
+            self._async_transports.clear()
+        for base_url, transport in async_transports:
+            try:
+                await transport.aclose()
+            except Exception:
+                llm_logger.exception(f"LLM async transport 종료 중 오류 발생 - endpoint: {base_url}")
+
+
+llm_transport = LLMTransport(config.llm_base_urls or [config.llm_base_url])
+rag_llm_transport = LLMTransport([config.RAG_LLM_BASE_URL])
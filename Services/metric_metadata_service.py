@@ -0,0 +1,144 @@
+import select
+import threading
+import time
+
+from collections import namedtuple
+from types import MappingProxyType
+
+from sqlalchemy import select as sql_select
+
+from config import config
+
+from llm_api.Models.database import engine, session_scope
+from llm_api.Models.xaiops_meta_metric_model import XaiopsMetaMetric
+from llm_api.Prompts.metrics_prompt import metrics_definition_prompt
+
+from llm_api.Utils.logger import db_logger
+
+MetricMeta = namedtuple("MetricMeta", ["metric_id", "target_type", "desc", "unit", "definition"])
+
+
+class MetricMetadataRegistry:
+    """
+    xaiops_meta_metric 을 시작 시 한 번 읽어 (target_type, metric_id) 로 조회하는 읽기 전용 인덱스
+    - 조회는 메모리 인덱스만 사용하고 DB에 접근하지 않는다. 갱신 시에는 새 인덱스를 만든 뒤 참조만 교체한다.
+    - 조회 순서: (target_type, metric_id) -> metrics_definition_prompt -> metric_id
+      (같은 metric_id 라도 target_type 마다 의미가 달라 다른 target_type 의 메타데이터는 사용하지 않는다.)
+    - METRIC_META_CHANNEL 로 NOTIFY 가 오거나 METRIC_META_REFRESH_SEC 가 지나면 백그라운드에서 다시 읽는다.
+      (변경 알림은 xaiops_meta_metric 에 NOTIFY 를 보내는 trigger가 있어야 동작하며, 없으면 TTL로만 갱신된다.)
+    """
+
+    def __init__(self):
+        self._index = MappingProxyType({})
+        self._loaded_at = None
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _make_definition(desc: str, unit: str):
+        return f"{desc} ({unit})" if unit else desc
+
+    def load(self):
+        """xaiops_meta_metric 전체를 읽어 인덱스를 교체한다. 실패 시 기존 인덱스를 유지한다."""
+        try:
+            with session_scope() as session:
+                rows = session.execute(sql_select(
+                    XaiopsMetaMetric.target_type,
+                    XaiopsMetaMetric.metric_id,
+                    XaiopsMetaMetric.metric_desc,
+                    XaiopsMetaMetric.metric_unit,
+                )).all()
+        except Exception:
+            db_logger.exception("[Metric Meta] 지표 메타데이터 로딩 실패, 기존 인덱스 유지")
+            return False
+
+        index = {}
+        for target_type, metric_id, desc, unit in rows:
+            index[(target_type, metric_id)] = MetricMeta(metric_id, target_type, desc, unit,
+                                                         self._make_definition(desc, unit))
+
+        self._index = MappingProxyType(index)
+        self._loaded_at = time.time()
+        db_logger.info(f"[Metric Meta] 지표 메타데이터 로딩 완료 - {len(index)}건")
+        return True
+
+    def lookup(self, target_type: str, metric_id: str):
+        """
+        :param target_type: xaiops_meta_metric.target_type (요청 inst_type 은 normalize_inst_type 으로 변환해 넘긴다)
+        :return: MetricMeta - 메타데이터가 없는 지표는 정적 정의 또는 metric_id 로 채운다.
+        """
+        meta = self._index.get((target_type, metric_id))
+        if meta is not None:
+            return meta
+        definition = metrics_definition_prompt.get(metric_id, metric_id)
+        return MetricMeta(metric_id, target_type, metric_id, "", definition)
+
+    def get_definition(self, target_type: str, metric_id: str):
+        return self.lookup(target_type, metric_id).definition
+
+    def get_desc(self, target_type: str, metric_id: str):
+        return self.lookup(target_type, metric_id).desc
+
+    def stats(self):
+        return {"entries": len(self._index), "loaded_at": self._loaded_at}
+
+    def start(self):
+        """최초 로딩 후 갱신 스레드를 시작한다."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self.load()
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._refresh_loop, name="metric-meta-refresh", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _refresh_loop(self):
+        while not self._stop_event.is_set():
+            raw_connection = None
+            try:
+                raw_connection = self._listen()
+                self._wait_and_refresh(raw_connection)
+            except Exception:
+                db_logger.exception("[Metric Meta] 변경 알림 구독 중 오류 발생, TTL 기반으로 갱신")
+                if self._stop_event.wait(config.METRIC_META_REFRESH_SEC):
+                    break
+                self.load()
+            finally:
+                if raw_connection is not None:
+                    raw_connection.close()
+
+    @staticmethod
+    def _listen():
+        # LISTEN 연결은 계속 점유되므로 pool에서 분리해 사용
+        raw_connection = engine.raw_connection()
+        raw_connection.detach()
+        dbapi_connection = raw_connection.dbapi_connection
+        dbapi_connection.autocommit = True
+        with dbapi_connection.cursor() as cursor:
+            cursor.execute(f"LISTEN {config.METRIC_META_CHANNEL}")
+        db_logger.info(f"[Metric Meta] 변경 알림 구독 시작 - channel: {config.METRIC_META_CHANNEL}")
+        return raw_connection
+
+    def _wait_and_refresh(self, raw_connection):
+        dbapi_connection = raw_connection.dbapi_connection
+        next_refresh = time.monotonic() + config.METRIC_META_REFRESH_SEC
+        while not self._stop_event.is_set():
+            # 종료 요청을 확인할 수 있도록 최대 1초 단위로 대기
+            timeout = min(max(next_refresh - time.monotonic(), 0), 1)
+            readable, _, _ = select.select([dbapi_connection], [], [], timeout)
+            changed = False
+            if readable:
+                dbapi_connection.poll()
+                changed = bool(dbapi_connection.notifies)
+                dbapi_connection.notifies.clear()
+            if changed or time.monotonic() >= next_refresh:
+                db_logger.info(f"[Metric Meta] 지표 메타데이터 갱신 - {'변경 알림' if changed else 'TTL 만료'}")
+                self.load()
+                next_refresh = time.monotonic() + config.METRIC_META_REFRESH_SEC
+
+
+metric_metadata_registry = MetricMetadataRegistry()
@@ -1,9 +1,15 @@
 import asyncio
+import threading
 import time
+import weakref
 
+from langchain_core.runnables import RunnableLambda
 from langchain_ollama import OllamaLLM
 from config import config
 
+from llm_api.Services.llm_balancer_service import llm_balancer
+from llm_api.Services.llm_transport_service import llm_transport
+from llm_api.Services.model_warmup_service import model_warmup
 from llm_api.Services.prompt_loader_service import PromptLoaderService
 
 from llm_api.Utils.logger import llm_logger
@@ -30,20 +36,70 @@ class LLMModel:
         """
         llm_logger.info("LLM 모델 초기화 시작...")
         # self.system_prompt = "마크다운으로 가시성 좋게 간략히 설명해주세요."
-        self.llm = OllamaLLM(
-            model=config.model_name,
-            temperature=config.temperature,
-            base_url=config.llm_base_url,
-            format= "json"
-        )
+        # endpoint 별 LLM - Ollama 호출은 공유 transport(keep-alive connection pool)를 사용
+        self.llms = {
+            endpoint: OllamaLLM(
+                model=config.model_name,
+                temperature=config.temperature,
+                num_ctx=config.LLM_NUM_CTX,
+                keep_alive=config.LLM_KEEP_ALIVE,
+                format= "json",
+                **llm_transport.ollama_kwargs(endpoint)
+            )
+            for endpoint in llm_balancer.endpoints
+        }
+        # 요청마다 llm_balancer 가 고른 endpoint 로 생성
+        self.llm = RunnableLambda(self._invoke_llm, afunc=self._ainvoke_llm, name="BalancedOllamaLLM")
         prompt_loader = PromptLoaderService()
-        self.prompt = prompt_loader.load_base_prompt()
+        # 템플릿은 여기서 한 번만 컴파일하고 요청마다 변수 부분만 렌더링
+        self.renderer = prompt_loader.load_prompt_renderer()
+        self.prompt = RunnableLambda(self.renderer.render, name="PromptRenderer")
         self.parser = prompt_loader.parser
+        # agenerate_response 동시 실행 제한 - event loop 별 semaphore (asyncio.Semaphore 는 loop 에 묶임)
+        self._async_semaphores = weakref.WeakKeyDictionary()
+        self._semaphore_lock = threading.Lock()
         self._make_chain()
         llm_logger.info("LLM 모델 초기화 완료.")
 
     def _make_chain(self):
         self.chain = self.prompt | self.llm | self.parser
+        # 토큰 스트리밍용 - parser를 거치지 않은 텍스트 chunk를 그대로 전달 (스트림 전체가 한 endpoint 를 사용)
+        self.text_chains = {endpoint: self.prompt | llm for endpoint, llm in self.llms.items()}
+
+    @staticmethod
+    def _record_eval(lease: dict, result):
+        """
+        Ollama 응답의 eval_count / eval_duration 을 endpoint 생성 속도 계산에 넘기고,
+        load_duration 으로 cold / warm 응답 시간을 기록한다.
+        """
+        generation_info = result.generations[0][0].generation_info or {}
+        if generation_info.get("eval_count") and generation_info.get("eval_duration"):
+            lease["eval_tokens"] = generation_info["eval_count"]
+            lease["eval_sec"] = generation_info["eval_duration"] / 1e9
+        if generation_info.get("total_duration"):
+            load_sec = generation_info.get("load_duration", 0) / 1e9
+            if model_warmup.observe(lease["endpoint"], generation_info["total_duration"] / 1e9, load_sec):
+                llm_logger.warning(f"LLM 모델 eviction 감지 - {lease['endpoint']}, 로딩 시간: {load_sec:.2f} seconds.")
+
+    def _invoke_llm(self, prompt: str):
+        with llm_balancer.lease() as lease:
+            result = self.llms[lease["endpoint"]].generate([prompt])
+            self._record_eval(lease, result)
+        return result.generations[0][0].text
+
+    async def _ainvoke_llm(self, prompt: str):
+        with llm_balancer.lease() as lease:
+            result = await self.llms[lease["endpoint"]].agenerate([prompt])
+            self._record_eval(lease, result)
+        return result.generations[0][0].text
+
+    @staticmethod
+    def _make_chain_input(input_prompts: dict):
+        return {
+            "input_data": input_prompts.get("input_data", ""),
+            "metrics_definition": input_prompts.get("metrics_definition", ""),
+            "few_shot_learning": input_prompts.get("few_shot_learning", ""),
+        }
 
     def generate_response(self, input_prompts: dict):
         """
@@ -55,11 +111,7 @@ class LLMModel:
         start_time = time.time()
         response = None
         try:
-            response = self.chain.invoke({
-                "input_data": input_prompts.get("input_data", ""),
-                "metrics_definition": input_prompts.get("metrics_definition", ""),
-                "few_shot_learning": input_prompts.get("few_shot_learning", ""),
-            })
+            response = self.chain.invoke(self._make_chain_input(input_prompts))
 
             end_time = time.time()
             elapsed_time = end_time - start_time
@@ -71,6 +123,84 @@ class LLMModel:
 
         return response
 
+    def _get_async_semaphore(self):
+        """실행 중인 event loop별로 LLM_MAX_CONCURRENCY 크기의 semaphore를 하나만 만들어 사용"""
+        loop = asyncio.get_running_loop()
+        with self._semaphore_lock:
+            semaphore = self._async_semaphores.get(loop)
+            if semaphore is None:
+                semaphore = asyncio.Semaphore(config.LLM_MAX_CONCURRENCY)
+                self._async_semaphores[loop] = semaphore
+        return semaphore
+
+    async def agenerate_response(self, input_prompts: dict, timeout: float | None = None):
+        """
+        chain의 비동기 경로(ainvoke)로 LLM 응답을 생성한다.
+        동시 생성 수는 LLM_MAX_CONCURRENCY로 제한하고, timeout(기본 LLM_TIMEOUT_SEC) 초과 시
+        작업을 취소해 진행 중인 Ollama HTTP 요청도 함께 끊는다.
+        """
+        timeout = config.LLM_TIMEOUT_SEC if timeout is None else timeout
+        llm_logger.info("LLM 비동기 응답 생성 시작")
+        llm_logger.debug(f"Input Prompt: {input_prompts}")
+
+        response = None
+        async with self._get_async_semaphore():
+            start_time = time.time()
+            try:
+                response = await asyncio.wait_for(
+                    self.chain.ainvoke(self._make_chain_input(input_prompts)), timeout=timeout
+                )
+                llm_logger.info(f"LLM 비동기 응답 생성 완료 - 소요 시간: {time.time() - start_time:.2f} seconds.")
+                llm_logger.debug(f"LLM 응답 결과: {response}")
+            except asyncio.TimeoutError:
+                llm_logger.error(f"LLM 비동기 응답 생성 시간 초과 - 제한 시간: {timeout} seconds.")
+            except Exception:
+                llm_logger.exception("LLM 비동기 응답 생성 중 오류 발생")
+
+        return response
+
+    def stream_response(self, input_prompts: dict):
+        """
+        LLM 응답을 텍스트 chunk 단위로 생성한다.
+        생성이 끝난 전체 텍스트는 parse_response 로 JSON 응답으로 변환한다.
+        """
+        llm_logger.info("LLM 스트리밍 응답 생성 시작")
+        llm_logger.debug(f"Input Prompt: {input_prompts}")
+
+        start_time = time.time()
+        first_chunk_time = None
+        with llm_balancer.lease() as lease:
+            for chunk in self.text_chains[lease["endpoint"]].stream(self._make_chain_input(input_prompts)):
+                if first_chunk_time is None:
+                    first_chunk_time = time.time()
+                    llm_logger.info(f"LLM 첫 chunk 수신 - 소요 시간: {first_chunk_time - start_time:.2f} seconds.")
+                yield chunk
+
+        llm_logger.info(f"LLM 스트리밍 응답 생성 완료 - 소요 시간: {time.time() - start_time:.2f} seconds.")
+
+    def parse_response(self, text: str):
+        return self.parser.parse(text)
+
+    def generate_responses(self, input_prompts_list: list):
+        """
+        여러 입력을 chain의 batch 경로로 한 번에 생성한다.
+        동시 호출 수는 LLM_BATCH_MAX_CONCURRENCY로 제한하며, 실패한 입력은 해당 위치에 Exception 객체가 담긴다.
+        """
+        llm_logger.info(f"LLM 배치 응답 생성 시작 - 요청 수: {len(input_prompts_list)}")
+
+        start_time = time.time()
+        responses = self.chain.batch(
+            [self._make_chain_input(input_prompts) for input_prompts in input_prompts_list],
+            config={"max_concurrency": config.LLM_BATCH_MAX_CONCURRENCY},
+            return_exceptions=True
+        )
+        elapsed_time = time.time() - start_time
+
+        failed_count = sum(isinstance(response, Exception) for response in responses)
+        llm_logger.info(f"LLM 배치 응답 생성 완료 - 요청 수: {len(responses)}, 실패: {failed_count}, "
+                        f"소요 시간: {elapsed_time:.2f} seconds.")
+        return responses
+
 
 # 싱글톤 인스턴스 생성
 llm_model = LLMModel()
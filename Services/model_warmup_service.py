@@ -0,0 +1,159 @@
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from config import config
+
+from llm_api.Services.llm_transport_service import llm_transport, LLMTransport
+
+from llm_api.Utils.logger import llm_logger
+
+
+class LatencyStats:
+    """endpoint 하나의 cold(모델 로딩 포함) / warm 응답 시간 누적"""
+
+    def __init__(self):
+        self.ready = False
+        self.last_warm_at = None
+        self.cold_count = 0
+        self.cold_total_sec = 0.0
+        self.cold_load_total_sec = 0.0
+        self.warm_count = 0
+        self.warm_total_sec = 0.0
+
+    def to_dict(self):
+        return {
+            "ready": self.ready,
+            "last_warm_at": self.last_warm_at,
+            "cold_count": self.cold_count,
+            "cold_avg_sec": round(self.cold_total_sec / self.cold_count, 3) if self.cold_count else None,
+            "cold_avg_load_sec": round(self.cold_load_total_sec / self.cold_count, 3) if self.cold_count else None,
+            "warm_count": self.warm_count,
+            "warm_avg_sec": round(self.warm_total_sec / self.warm_count, 3) if self.warm_count else None,
+        }
+
+
+class ModelWarmupManager:
+    """
+    Ollama 모델을 미리 메모리에 올려 두고(warm-up), 상주 여부를 관리한다.
+    - warm-up: num_predict=1 인 최소 생성을 LLM_KEEP_ALIVE 와 함께 보내 모델을 로딩시킨다.
+      (num_ctx 가 다르면 Ollama 가 모델을 다시 로딩하므로 실제 요청과 같은 LLM_NUM_CTX 를 사용)
+    - 응답의 load_duration 이 LLM_COLD_LOAD_THRESHOLD_SEC 를 넘으면 모델을 새로 로딩한 것(cold)으로 본다.
+      실제 생성 응답도 observe() 로 같은 기준을 적용해, 운영 중 eviction 이 감지되면 로그를 남긴다.
+    - 백그라운드 스레드가 LLM_REWARM_INTERVAL_SEC 마다 다시 warm-up 해 keep-alive 만료 전에 상주 시간을 연장한다.
+    """
+
+    def __init__(self, transport: LLMTransport, model_name: str):
+        self.transport = transport
+        self.model_name = model_name
+        self._stats = {endpoint: LatencyStats() for endpoint in transport.endpoints}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    def _make_payload(self):
+        return {
+            "model": self.model_name,
+            "prompt": "ping",
+            "stream": False,
+            "keep_alive": config.LLM_KEEP_ALIVE,
+            "options": {"num_predict": 1, "num_ctx": config.LLM_NUM_CTX},
+        }
+
+    def observe(self, endpoint: str, total_sec: float, load_sec: float | None):
+        """
+        생성 1건의 응답 시간을 cold / warm 으로 나눠 기록한다.
+        :param load_sec: Ollama load_duration(초) - 없으면 warm 으로 본다.
+        :return: cold 여부
+        """
+        cold = bool(load_sec) and load_sec >= config.LLM_COLD_LOAD_THRESHOLD_SEC
+        with self._lock:
+            stats = self._stats.setdefault(endpoint, LatencyStats())
+            if cold:
+                stats.cold_count += 1
+                stats.cold_total_sec += total_sec
+                stats.cold_load_total_sec += load_sec
+            else:
+                stats.warm_count += 1
+                stats.warm_total_sec += total_sec
+        return cold
+
+    def warm_endpoint(self, endpoint: str):
+        """endpoint 하나에 최소 생성을 보내 모델을 로딩한다. 성공 시 True"""
+        start_time = time.time()
+        try:
+            response = self.transport.generate(self._make_payload(), endpoint)
+        except Exception as e:
+            llm_logger.warning(f"LLM warm-up 실패 - {endpoint}: {e}")
+            with self._lock:
+                self._stats[endpoint].ready = False
+            return False
+
+        elapsed = time.time() - start_time
+        load_sec = response.get("load_duration", 0) / 1e9
+        cold = self.observe(endpoint, elapsed, load_sec)
+        with self._lock:
+            stats = self._stats[endpoint]
+            was_ready = stats.ready
+            stats.ready = True
+            stats.last_warm_at = time.time()
+        if cold and was_ready:
+            llm_logger.warning(f"LLM 모델 eviction 감지, 다시 로딩함 - {endpoint}, 로딩 시간: {load_sec:.2f} seconds.")
+        else:
+            llm_logger.info(f"LLM warm-up 완료 - {endpoint}, {'cold' if cold else 'warm'}, "
+                            f"소요 시간: {elapsed:.2f} seconds. (로딩: {load_sec:.2f} seconds.)")
+        return True
+
+    def warm_up(self, timeout: float | None = None):
+        """
+        모든 endpoint 를 동시에 warm-up 하고, 실패한 endpoint 는 LLM_WARMUP_RETRY_SEC 간격으로 재시도한다.
+        하나 이상 준비되면 True, timeout(기본 LLM_WARMUP_TIMEOUT_SEC) 동안 하나도 준비되지 않으면 False
+        """
+        timeout = config.LLM_WARMUP_TIMEOUT_SEC if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        pending = list(self._stats)
+        llm_logger.info(f"LLM warm-up 시작 - model: {self.model_name}, endpoints: {pending}")
+        with ThreadPoolExecutor(max_workers=len(pending), thread_name_prefix="llm-warmup") as executor:
+            while pending:
+                results = list(executor.map(self.warm_endpoint, pending))
+                pending = [endpoint for endpoint, ready in zip(pending, results) if not ready]
+                if len(pending) < len(self._stats) or time.monotonic() + config.LLM_WARMUP_RETRY_SEC > deadline:
+                    break
+                time.sleep(config.LLM_WARMUP_RETRY_SEC)
+
+        ready = len(pending) < len(self._stats)
+        if pending:
+            # 준비되지 않은 endpoint 는 주기적 re-warm 에서 다시 시도
+            log = llm_logger.warning if ready else llm_logger.error
+            log(f"LLM warm-up 미완료 endpoint: {pending}")
+        return ready
+
+    def stats(self):
+        with self._lock:
+            return {endpoint: stats.to_dict() for endpoint, stats in self._stats.items()}
+
+    def start(self):
+        """주기적 re-warm 스레드를 시작한다."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._rewarm_loop, name="llm-rewarm", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _rewarm_loop(self):
+        while not self._stop_event.wait(config.LLM_REWARM_INTERVAL_SEC):
+            for endpoint in list(self._stats):
+                if self._stop_event.is_set():
+                    break
+                try:
+                    self.warm_endpoint(endpoint)
+                except Exception:
+                    llm_logger.exception(f"LLM re-warm 중 오류 발생 - {endpoint}")
+
+
+model_warmup = ModelWarmupManager(llm_transport, config.model_name)
@@ -1,3 +1,5 @@
+import asyncio
+
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 from pydantic import BaseModel, Field
@@ -5,11 +7,16 @@ from pydantic import BaseModel, Field
 from config import config
 
 # DB
-from llm_api.Models.database import get_db
-from llm_api.Services.get_db_host_instance_db_service import get_metrics_host_instance_db
-from llm_api.Services.get_db_service_service import get_metrics_service, get_metrics_names_service
-from llm_api.Services.get_redis_data_service import get_redis_metric_datas
-from llm_api.Utils.data_utils import is_anomaly_metric
+from llm_api.Models.database import get_db, async_session_scope
+from llm_api.Services.get_db_host_instance_db_service import get_metrics_host_instance_db, \
+    aget_metrics_host_instance_db, get_metrics_host_instance_db_bulk
+from llm_api.Services.get_db_service_service import get_metrics_with_desc_service, aget_metrics_with_desc_service
+from llm_api.Services.get_redis_data_service import get_redis_metric_datas_bulk, aget_redis_metric_datas_bulk
+from llm_api.Services.metric_metadata_service import metric_metadata_registry
+from llm_api.Services.prompt_renderer_service import PromptRenderer
+from llm_api.Services.fewshot_selector_service import few_shot_selector, normalize_inst_type
+from llm_api.Services.token_budget_service import token_budget_manager, PromptSection
+from llm_api.Utils.data_utils import select_anomaly_metrics
 
 # Prompt
 from llm_api.Prompts.model_prompt import gdn_explanation_prompt
@@ -24,6 +31,9 @@ from llm_api.Prompts.fewshot_prompt import few_shot_prompt
 # Logger
 from llm_api.Utils.logger import llm_logger
 
+# (inst_type, 대상) 별 직전에 조회된 지표 목록 - 비동기 프롬프트 생성 시 기준선 선조회에 사용
+_metric_hints: dict[tuple[str, str], tuple] = {}
+
 
 class PromptLoaderService:
     class OSnWASJson(BaseModel):
@@ -50,147 +60,308 @@ class PromptLoaderService:
         self._qwen_model_prompt = """\n\n{format_instructions}\n\n※ Data delivered to you\n{input_data}\n{few_shot_learning}"""
         self._else_model_prompt = """\n\n※ Output Format\n{{'inst_type': 'your answer',"target_id": "your answer","situation": "your answer","issues": "your answer","solutions": "your answer"}}\n\n※ Data delivered to you\n{input_data}"""
 
+    def _get_template(self):
+        """모델에 맞는 기본 템플릿 문자열과 고정 변수"""
+        if config.model_name == "qwen2.5:14b-instruct-q8_0":
+            llm_logger.info("Qwen 모델에 맞는 프롬프트 생성")
+            return self._tmp_prompt + self._qwen_model_prompt, \
+                {"format_instructions": self.parser.get_format_instructions()}
+        llm_logger.info("기타 모델용 프롬프트 생성")
+        return self._tmp_prompt + self._else_model_prompt, {}
+
     def load_base_prompt(self):
         try:
             llm_logger.info("기본 프롬프트 템플릿 로딩 시작")
-            if config.model_name == "qwen2.5:14b-instruct-q8_0":
-                llm_logger.info("Qwen 모델에 맞는 프롬프트 생성")
-                return PromptTemplate(
-                    template=self._tmp_prompt + self._qwen_model_prompt,
-                    input_variables=["metrics_definition", "input_data"],
-                    partial_variables={"format_instructions": self.parser.get_format_instructions()}
-                )
-            else:
-                llm_logger.info("기타 모델용 프롬프트 생성")
-                return PromptTemplate(
-                    template=self._tmp_prompt + self._else_model_prompt,
-                    input_variables=["metrics_definition", "input_data"]
-                )
+            template, partial_variables = self._get_template()
+            return PromptTemplate(
+                template=template,
+                input_variables=["metrics_definition", "input_data"],
+                partial_variables=partial_variables
+            )
         except (ImportError, AttributeError) as e:
             llm_logger.exception("기본 프롬프트 로딩 중 오류 발생")
             return None
 
+    def load_prompt_renderer(self):
+        """load_base_prompt 와 같은 템플릿을 한 번 컴파일한 PromptRenderer"""
+        try:
+            llm_logger.info("프롬프트 렌더러 컴파일 시작")
+            template, partial_variables = self._get_template()
+            renderer = PromptRenderer(template, partial_variables)
+            token_budget_manager.set_static_prompt(renderer.static_text)
+            llm_logger.info(f"프롬프트 렌더러 컴파일 완료 - 고정 영역 문자 수: {renderer.static_chars}, "
+                            f"변수: {renderer.input_variables}")
+            return renderer
+        except (ImportError, AttributeError) as e:
+            llm_logger.exception("프롬프트 렌더러 컴파일 중 오류 발생")
+            return None
+
+    @staticmethod
+    def _rank_candidates(candidates: list, label: str):
+        """
+        (metric, real_value, lower, upper, avg, std, anomaly_contribution, ...) 후보를 이상 점수로 선별해 점수 순으로 반환
+        """
+        if not config.ANOMALY_RANKING_ENABLED or not candidates:
+            return candidates
+        columns = list(zip(*candidates))
+        contributions = columns[6] if any(value is not None for value in columns[6]) else None
+        indexes, scores = select_anomaly_metrics(columns[1], columns[2], columns[3], columns[4], columns[5],
+                                                 contributions)
+        llm_logger.info(f"이상 지표 선별 {label} - {len(candidates)}개 중 {len(indexes)}개 선택, "
+                        f"점수: {[(candidates[idx][0], round(float(scores[idx]), 2)) for idx in indexes]}")
+        return [candidates[idx] for idx in indexes]
+
+    @staticmethod
+    def _fit_prompt_sections(label: str, render_input, anomaly_metrics: dict, metrics_definition: dict,
+                             few_shot_indexes: list):
+        """
+        이상 지표, 지표 정의, few-shot 예시를 토큰 예산에 맞춰 렌더링한다.
+        지표가 잘려 나가면 해당 지표의 정의도 함께 뺀다.
+        :return: (input_data, metrics_definition, few_shot_learning)
+        """
+        rendered, items = token_budget_manager.fit([
+            PromptSection("input_data", list(anomaly_metrics.items()), lambda metrics: render_input(dict(metrics)), 1),
+            PromptSection("metrics_definition", list(metrics_definition.items()),
+                          lambda definitions: generate_metrics_definition_prompt(dict(definitions)), 0),
+            PromptSection("few_shot_learning", few_shot_indexes, few_shot_selector.render, 0),
+        ], label)
+
+        if len(items["input_data"]) < len(anomaly_metrics):
+            kept_metrics = {metric for metric, _ in items["input_data"]}
+            rendered["metrics_definition"] = generate_metrics_definition_prompt(
+                {metric: definition for metric, definition in items["metrics_definition"] if metric in kept_metrics})
+        return rendered["input_data"], rendered["metrics_definition"], rendered["few_shot_learning"]
+
+    @staticmethod
+    def _parse_os_was_db_request(request_data: dict):
+        # time = request_data["time"]
+        time = request_data['summary']['time']
+        # inst_type = request_data["tiers"][0]["type"]
+        inst_type = request_data['summary']['tiers'][0]['type']
+        # target_id = request_data["tiers"][0]["instances"][0]["target_id"]
+        target_id = request_data['summary']['tiers'][0]['instances'][0]['target_id']
+        return time, inst_type, target_id
+
+    @staticmethod
+    def _build_os_was_db_prompt(time: str, target_id: str, inst_type: str, all_metrics_values: list, baselines: dict):
+        ### Redis에서 해당 시점의 Average +- 2Sigma를 벗어난 값들만 가져오기 (일단 제외)
+        ### Metrics Definition 가져오기
+        candidates = []
+        for metric, real_value, anomaly_contribution in all_metrics_values:
+            if metric not in baselines:
+                continue
+            lower, upper, avg, std = baselines[metric]
+            candidates.append((metric, real_value, lower, upper, avg, std, anomaly_contribution))
+
+        ### 이상 점수 상위 지표만 사용 (점수 순)
+        anomaly_metrics = {}
+        metrics_definition = {}
+        metadata_type = normalize_inst_type(inst_type)  # 지표 메타데이터 target_type (os -> host)
+        for metric, real_value, lower, upper, avg, std, _ in PromptLoaderService._rank_candidates(
+                candidates, f"[{inst_type}/{target_id}]"):
+            anomaly_metrics[metric] = [lower, upper, avg, real_value]
+            metrics_definition[metric] = metric_metadata_registry.get_definition(metadata_type, metric)
+
+        ### Prompt 생성 (토큰 예산 안으로)
+        input_data, metrics_definition, few_shot_learning = PromptLoaderService._fit_prompt_sections(
+            f"[{inst_type}/{target_id}]",
+            lambda metrics: generate_os_was_input_prompt(time, target_id, inst_type, metrics,
+                                                         config.PROMPT_FLOAT_PRECISION),
+            anomaly_metrics, metrics_definition, few_shot_selector.select(inst_type, anomaly_metrics))
+
+        llm_logger.debug(f"[OS/WAS/DB] 생성된 input_data: {input_data}")
+        return {"input_data": input_data,
+                "metrics_definition": metrics_definition,
+                "few_shot_learning": few_shot_learning,
+                # 답변 캐시 signature 계산용
+                "inst_type": inst_type,
+                "target_name": target_id,
+                "anomaly_metrics": anomaly_metrics}
+
     @staticmethod
     def _make_os_was_db_prompt(request_data: dict):
         try:
             llm_logger.info("[OS/WAS/DB] 입력 데이터 프롬프트 생성 시작")
             # Input Data 정리
-            # time = request_data["time"]
-            time = request_data['summary']['time']
-            # inst_type = request_data["tiers"][0]["type"]
-            inst_type = request_data['summary']['tiers'][0]['type']
-            # target_id = request_data["tiers"][0]["instances"][0]["target_id"]
-            target_id = request_data['summary']['tiers'][0]['instances'][0]['target_id']
+            time, inst_type, target_id = PromptLoaderService._parse_os_was_db_request(request_data)
 
             ### DB에서 사용된 지표 가져오기
             with get_db() as session:
                 all_metrics_values = get_metrics_host_instance_db(session, time, target_id, inst_type)
 
-            ### Redis에서 해당 시점의 Average +- 2Sigma를 벗어난 값들만 가져오기 (일단 제외)
-            ### Metrics Definition 가져오기
-            anomaly_metrics = {}
-            metrics_definition = {}
-            for metric, real_value in all_metrics_values:
-                lower, upper, avg, std = get_redis_metric_datas(time, metric, inst_type, target_id)
-                # if is_anomaly_metric(avg, std, real_value):
-                #     anomaly_metrics[metric] = [lower, upper, avg, real_value]
-                #     metrics_definition[metric] = metrics_definition_prompt[metric]
-                anomaly_metrics[metric] = [lower, upper, avg, real_value]
-                metrics_definition[metric] = metrics_definition_prompt[metric]
-
-            ### Prompt 생성
-            input_data = generate_os_was_input_prompt(time, target_id, inst_type, anomaly_metrics)
-            metrics_definition = generate_metrics_definition_prompt(metrics_definition)
-            few_shot_learning = """
-
-    ※ Please refer to the following when answering.
-    First Example
-    {
-        "inst_type": "host",
-        "target_id": "ebmciapos07",
-        "situation": "rx_errors_delta 지표가 급격히 증가하고 있으며, tx_errors_delta 지표 또한 상승하고 있습니다. 반면, 네트워크 트래픽 자체는 일정한 수준을 유지하고 있습니다. 
-        이러한 지표의 움직임으로 볼 때 현재 시스템의 네트워크 환경에서 패킷 오류가 증가하고 있으며, 데이터 손실이 발생할 가능성이 있습니다.",
-        "issue": "네트워크 패킷 오류가 증가하면서 서비스 응답 지연이나 데이터 유실이 발생할 위험이 높아지고 있습니다.",
-        "solution": "네트워크 인터페이스와 관련된 로그를 확인하고, 오류 발생 원인을 분석해야 합니다. 필요하다면 네트워크 장비 점검 및 설정 조정을 진행할 수 있습니다.",
-        "group": "MCI",
-        "etc": ""
-    }
+            baselines, _ = get_redis_metric_datas_bulk(time, [row[0] for row in all_metrics_values], inst_type, target_id)
+            return PromptLoaderService._build_os_was_db_prompt(time, target_id, inst_type, all_metrics_values, baselines)
 
-    Second Example
-    {
-        "inst_type": "host",
-        "target_id": "ebeaiapos01",
-        "situation": "rx_bytes_delta 지표가 급격히 증가하고 있으며, tx_bytes_delta 지표 또한 큰 폭으로 상승하고 있습니다. 반면, network 지표는 과거 대비 높은 수준에서 유지되고 있습니다. 
-        이러한 지표의 움직임으로 볼 때 현재 시스템은 네트워크 부하가 증가하고 있으며, 과부하가 발생할 가능성이 있습니다.",
-        "issue": "네트워크 트래픽이 증가하면서 향후 호스트의 네트워크 부하가 증가할 것으로 예상됩니다. 트래픽 폭주 시 패킷 손실이나 응답 지연이 발생할 수 있습니다.",
-        "solution": "네트워크 트래픽이 급증한 원인을 분석하고 불필요한 데이터 송수신이 있는지 점검해야 합니다. 필요 시 QoS 정책을 적용하여 네트워크 부하를 분산하는 방안을 고려할 수 있습니다.",
-        "group": "EAI",
-        "etc": ""
-    }
+        except Exception as e:
+            llm_logger.exception("[OS/WAS/DB] 입력 프롬프트 생성 중 오류 발생 ")
+            return {}
 
-    Third Example
-    {
-        "inst_type": "host",
-        "target_id": "ebfepapos06",
-        "situation": "cpu_usage 지표가 지속적으로 상승하고 있으며, cpu_system 지표 또한 점진적으로 증가하는 양상을 보이고 있습니다. 반면, cpu_idle 지표는 점차 감소하고 있습니다. 이러한 지표의 움직임으로 볼 때 현재 시스템은 CPU 사용률이 점점 증가하면서 부하가 높아지고 있는 상태입니다. 현재 수준에서는 즉각적인 조치가 필요하지 않지만, 지속적인 증가가 감지될 경우 추가적인 모니터링이 요구됩니다.",
-        "issue": "현재 CPU 사용량이 증가하고 있어, 향후 호스트의 CPU 부하가 증가할 가능성이 큽니다. 지속적인 부하가 발생하면 프로세스 처리 속도가 저하될 수 있습니다.",
-        "solution": "과부하를 유발하는 프로세스를 점검하고, 필요하다면 불필요한 작업을 종료하여 CPU 부하를 완화해야 합니다. 장기적으로는 CPU 리소스를 확장하는 방안을 고려할 수 있습니다.",
-        "group": "FEP",
-        "etc": ""
-    }
-    """
+    @staticmethod
+    def make_fan_out_input_prompts(sub_requests: list):
+        """
+        fan-out 으로 나눈 instance별 요청의 프롬프트를 만든다. 지표는 모든 대상을 한 번의 쿼리로 가져온다.
+        :return: 요청 순서대로 프롬프트 (생성에 실패한 요청은 {})
+        """
+        try:
+            llm_logger.info(f"[OS/WAS/DB] fan-out 입력 데이터 프롬프트 생성 시작 - 대상 수: {len(sub_requests)}")
+            parsed = [PromptLoaderService._parse_os_was_db_request(request_data) for request_data in sub_requests]
+            time = parsed[0][0]
 
-            llm_logger.debug(f"[OS/WAS/DB] 생성된 input_data: {input_data}")
-            return {"input_data": input_data,
-                    "metrics_definition": metrics_definition}  # , "few_shot_learning": few_shot_learning}
+            with get_db() as session:
+                metrics_by_target = get_metrics_host_instance_db_bulk(
+                    session, time, [(target_id, inst_type) for _, inst_type, target_id in parsed])
+        except Exception as e:
+            llm_logger.exception("[OS/WAS/DB] fan-out 지표 조회 중 오류 발생")
+            return [{} for _ in sub_requests]
+
+        input_prompts = []
+        for time, inst_type, target_id in parsed:
+            try:
+                all_metrics_values = metrics_by_target[(target_id, inst_type)].rows()
+                baselines, _ = get_redis_metric_datas_bulk(time, [row[0] for row in all_metrics_values], inst_type, target_id)
+                input_prompts.append(PromptLoaderService._build_os_was_db_prompt(
+                    time, target_id, inst_type, all_metrics_values, baselines))
+            except Exception as e:
+                llm_logger.exception(f"[OS/WAS/DB] fan-out 입력 프롬프트 생성 중 오류 발생 - 대상: {target_id}")
+                input_prompts.append({})
+        return input_prompts
+
+    @staticmethod
+    async def _amake_os_was_db_prompt(request_data: dict):
+        try:
+            llm_logger.info("[OS/WAS/DB] 입력 데이터 프롬프트 비동기 생성 시작")
+            time, inst_type, target_id = PromptLoaderService._parse_os_was_db_request(request_data)
+
+            async def query(session):
+                return await aget_metrics_host_instance_db(session, time, target_id, inst_type)
+
+            all_metrics_values, baselines = await PromptLoaderService._afetch_metrics_and_baselines(
+                time, inst_type, target_id, query)
+            return PromptLoaderService._build_os_was_db_prompt(time, target_id, inst_type, all_metrics_values, baselines)
 
         except Exception as e:
-            llm_logger.exception("[OS/WAS/DB] 입력 프롬프트 생성 중 오류 발생 ")
+            llm_logger.exception("[OS/WAS/DB] 입력 프롬프트 비동기 생성 중 오류 발생 ")
             return {}
 
+    @staticmethod
+    def _parse_service_request(request_data: dict):
+        time = request_data["time"]
+        tx_code = list(request_data["tx_codes"].keys())[0]
+        tx_code_name = request_data["tx_codes"][tx_code]["name"]
+        return time, tx_code, tx_code_name
+
+    @staticmethod
+    def _build_service_prompt(time: str, tx_code_name: str, all_metrics_values: list, baselines: dict):
+        inst_type = "service"
+
+        ### Redis에서 해당 시점의 Average +- 2Sigma를 벗어난 값들만 가져오기 (일단 제외)
+        ### Metrics Definition 가져오기
+        candidates = []
+        for metric, real_value, dbsln_lower, dbsln_upper, metric_desc in all_metrics_values:
+            if metric in baselines:
+                lower, upper, avg, std = baselines[metric]
+            elif dbsln_lower is not None and dbsln_upper is not None:
+                # Redis 기준선이 없으면 DB 결과의 기준선 범위를 사용 (평균/표준편차 없음)
+                lower, upper, avg, std = dbsln_lower, dbsln_upper, None, None
+            else:
+                continue
+            candidates.append((metric, real_value, lower, upper, avg, std, None, metric_desc))
+
+        ### 이상 점수 상위 지표만 사용 (점수 순)
+        anomaly_metrics = {}
+        metrics_definition = {}
+        metric_name_mapping = {}
+        metadata_type = normalize_inst_type(inst_type)
+        for metric, real_value, lower, upper, avg, std, _, metric_desc in PromptLoaderService._rank_candidates(
+                candidates, f"[{inst_type}/{tx_code_name}]"):
+            anomaly_metrics[metric] = [lower, upper, avg, real_value]
+            metrics_definition[metric] = metric_metadata_registry.get_definition(metadata_type, metric)
+            metric_name_mapping[metric] = metric_desc or metric_metadata_registry.get_desc(metadata_type, metric)
+
+        ### 지표 이름을 desc로 매핑 -> XaiopsMetaMetric
+        mapped_anomaly_metrics = {metric_name_mapping.get(k, k): v for k, v in anomaly_metrics.items()}
+        mapped_metrics_definition = {metric_name_mapping.get(k, k): v for k, v in metrics_definition.items()}
+
+        ### Prompt 생성 (토큰 예산 안으로)
+        input_prompt, metrics_definition, few_shot_learning = PromptLoaderService._fit_prompt_sections(
+            f"[{inst_type}/{tx_code_name}]",
+            lambda metrics: generate_service_input_prompt(time, tx_code_name, inst_type, metrics,
+                                                          config.PROMPT_FLOAT_PRECISION),
+            mapped_anomaly_metrics, mapped_metrics_definition, few_shot_selector.select(inst_type, anomaly_metrics))
+        llm_logger.debug(f"[Service] 생성된 input_data: {input_prompt}")
+
+        return {"input_data": input_prompt, "metrics_definition": metrics_definition,
+                "few_shot_learning": few_shot_learning,
+                # 답변 캐시 signature 계산용
+                "inst_type": inst_type,
+                "target_name": tx_code_name,
+                "anomaly_metrics": anomaly_metrics}
+
     @staticmethod
     def _make_service_prompt(request_data: dict):
         try:
             llm_logger.info("[Service] 입력 데이터 프롬프트 생성 시작")
             # Input Data 정리
-            time = request_data["time"]
-            inst_type = "service"
-            tx_code = list(request_data["tx_codes"].keys())[0]
-            tx_code_name = request_data["tx_codes"][tx_code]["name"]
+            time, tx_code, tx_code_name = PromptLoaderService._parse_service_request(request_data)
 
-            ### DB에서 사용된 지표 가져오기 -> DBSLNResultServicePerformance
-            with get_db() as session:
-                all_metrics_values = get_metrics_service(session, time, tx_code)
-
-            ### Redis에서 해당 시점의 Average +- 2Sigma를 벗어난 값들만 가져오기 (일단 제외)
-            ### Metrics Definition 가져오기
-            anomaly_metrics = {}
-            metrics_definition = {}
-            for metric, real_value in all_metrics_values:
-                lower, upper, avg, std = get_redis_metric_datas(time, metric, inst_type, tx_code)
-                # if is_anomaly_metric(avg, std, real_value):
-                #     anomaly_metrics[metric] = [lower, upper, avg, real_value]
-                #     metrics_definition[metric] = metrics_definition_prompt[metric]
-                anomaly_metrics[metric] = [lower, upper, avg, real_value]
-                metrics_definition[metric] = metrics_definition_prompt[metric]
-
-            ### 지표 이름을 desc로 매핑 -> XaiopsMetaMetric
+            ### DB에서 사용된 지표, 기준선, 지표 설명 한 번에 가져오기 -> DBSLNResultServicePerformance + XaiopsMetaMetric
             with get_db() as session:
-                metric_name_mapping = get_metrics_names_service(session, list(anomaly_metrics.keys()))
-            mapped_anomaly_metrics = {metric_name_mapping.get(k, k): v for k, v in anomaly_metrics.items()}
-            mapped_metrics_definition = {metric_name_mapping.get(k, k): v for k, v in metrics_definition.items()}
+                all_metrics_values = get_metrics_with_desc_service(session, time, [tx_code]).get(tx_code, [])
 
-            ### Prompt 생성
-            input_prompt = generate_service_input_prompt(time, tx_code_name, inst_type, mapped_anomaly_metrics)
-            metrics_definition = generate_metrics_definition_prompt(mapped_metrics_definition)
-            llm_logger.debug(f"[Service] 생성된 input_data: {input_prompt}")
-
-            return {"input_data": input_prompt, "metrics_definition": metrics_definition}
+            baselines, _ = get_redis_metric_datas_bulk(time, [row[0] for row in all_metrics_values], "service", tx_code)
+            return PromptLoaderService._build_service_prompt(time, tx_code_name, all_metrics_values, baselines)
 
         except Exception as e:
             llm_logger.exception("[Service] 입력 프롬프트 생성 중 오류 발생 ")
             return {}
 
+    @staticmethod
+    async def _amake_service_prompt(request_data: dict):
+        try:
+            llm_logger.info("[Service] 입력 데이터 프롬프트 비동기 생성 시작")
+            time, tx_code, tx_code_name = PromptLoaderService._parse_service_request(request_data)
+
+            async def query(session):
+                return (await aget_metrics_with_desc_service(session, time, [tx_code])).get(tx_code, [])
+
+            all_metrics_values, baselines = await PromptLoaderService._afetch_metrics_and_baselines(
+                time, "service", tx_code, query)
+            return PromptLoaderService._build_service_prompt(time, tx_code_name, all_metrics_values, baselines)
+
+        except Exception as e:
+            llm_logger.exception("[Service] 입력 프롬프트 비동기 생성 중 오류 발생 ")
+            return {}
+
+    @staticmethod
+    async def _afetch_metrics_and_baselines(time: str, inst_type: str, target: str, query):
+        """
+        Postgres 지표 조회와 Redis 기준선 조회를 동시에 실행한다.
+        기준선 key는 지표 목록이 있어야 만들 수 있으므로 같은 대상에서 직전에 조회된 지표 목록으로 미리 요청하고,
+        실제 지표 목록에 새로 생긴 지표만 조회 후 추가로 가져온다. (첫 요청은 순차 실행)
+        :param query: async (session) -> 지표 행 목록 (첫 번째 값이 metric)
+        :return: (지표 행 목록, {metric: [lower, upper, avg, std]})
+        """
+        async def fetch_rows():
+            async with async_session_scope() as session:
+                return await query(session)
+
+        hint = _metric_hints.get((inst_type, target), ())
+        if hint:
+            all_metrics_values, (baselines, _) = await asyncio.gather(
+                fetch_rows(), aget_redis_metric_datas_bulk(time, list(hint), inst_type, target))
+        else:
+            all_metrics_values, baselines = await fetch_rows(), {}
+
+        metrics = [row[0] for row in all_metrics_values]
+        _metric_hints[(inst_type, target)] = tuple(metrics)
+
+        hint_set = set(hint)
+        remaining = [metric for metric in metrics if metric not in hint_set]
+        if remaining:
+            extra_baselines, _ = await aget_redis_metric_datas_bulk(time, remaining, inst_type, target)
+            baselines.update(extra_baselines)
+        return all_metrics_values, baselines
+
     @staticmethod
     def make_input_prompt(request_data: dict):
         category_inst_type = request_data["category_inst_type"]
@@ -210,6 +381,24 @@ class PromptLoaderService:
             llm_logger.exception("프롬프트 분기 처리 중 오류 발생")
             return None
 
+    @staticmethod
+    async def amake_input_prompt(request_data: dict):
+        """make_input_prompt 의 비동기 버전 - Postgres 조회와 Redis 기준선 조회를 동시에 실행한다."""
+        category_inst_type = request_data["category_inst_type"]
+        llm_logger.info(f"프롬프트 타입 판단 - 인스턴스 유형: {category_inst_type}")
+
+        try:
+            if category_inst_type == "host_instance_db":
+                return await PromptLoaderService._amake_os_was_db_prompt(request_data)
+            elif category_inst_type == "service":
+                return await PromptLoaderService._amake_service_prompt(request_data)
+            else:
+                llm_logger.warning(f"지원하지 않는 인스턴스 유형: {category_inst_type}")
+                return None
+        except Exception as e:
+            llm_logger.exception("프롬프트 분기 처리 중 오류 발생")
+            return None
+
 
 if __name__ == "__main__":
     prompt_loader = PromptLoaderService()
@@ -0,0 +1,72 @@
+import string
+
+
+class PromptRenderer:
+    """
+    기본 프롬프트 템플릿을 로딩 시 한 번만 파싱해 두고, 요청마다 변수 부분만 채워 join 한 번으로 렌더링한다.
+    - 고정 값(partial_variables)은 컴파일 시 문자열에 미리 합쳐 둔다.
+    - 토큰 수는 token_budget_manager 가 section 단위로 이미 세므로 렌더링 시 다시 세지 않는다.
+    """
+
+    def __init__(self, template: str, partial_variables: dict | None = None):
+        partial_variables = partial_variables or {}
+        self._parts = []
+        self.input_variables = []
+        literal_buffer = []
+        for literal_text, field_name, _, _ in string.Formatter().parse(template):
+            literal_buffer.append(literal_text)
+            if field_name is None:
+                continue
+            if field_name in partial_variables:
+                literal_buffer.append(str(partial_variables[field_name]))
+                continue
+            self._parts.append("".join(literal_buffer))
+            self._parts.append(None)
+            self.input_variables.append(field_name)
+            literal_buffer = []
+        self._parts.append("".join(literal_buffer))
+        self.static_text = "".join(part for part in self._parts if part is not None)
+        self.static_chars = len(self.static_text)
+
+    def render(self, values: dict):
+        variables = iter(self.input_variables)
+        return "".join(part if part is not None else str(values.get(next(variables), "")) for part in self._parts)
+
+
+if __name__ == "__main__":
+    # 기존 PromptTemplate.format + 문자열 += 방식과 비교하는 micro-benchmark
+    import timeit
+
+    from llm_api.Prompts.make_input_data_prompt import generate_os_was_input_prompt, \
+        generate_metrics_definition_prompt
+    from llm_api.Services.prompt_loader_service import PromptLoaderService
+
+    prompt_loader = PromptLoaderService()
+    prompt_template = prompt_loader.load_base_prompt()
+    renderer = prompt_loader.load_prompt_renderer()
+
+    anomaly_metrics = {f"metric_{idx}": [0.0, 100.0, 50.0, 120.0 + idx] for idx in range(30)}
+    definitions = {metric: f"definition of {metric} (%)" for metric in anomaly_metrics}
+
+    def legacy_build():
+        metrics_str = ""
+        for idx, (metric_name, (lower, upper, avg, real_value)) in enumerate(anomaly_metrics.items(), start=1):
+            metrics_str += (
+                f" 4.{idx}. {metric_name}: The predicted allowable range is {lower} to {upper}, "
+                f"the average value is {avg}, and the current actual value is {real_value}.\n"
+            )
+        definition_str = ""
+        for metric_name, metric_definition in definitions.items():
+            definition_str += f"\t\t- {metric_name}: {metric_definition}\n"
+        return prompt_template.format(input_data=metrics_str, metrics_definition=definition_str, few_shot_learning="")
+
+    def compiled_build():
+        input_data = generate_os_was_input_prompt("2025-03-10 20:13:00", "target", "host", anomaly_metrics)
+        definition_str = generate_metrics_definition_prompt(definitions)
+        return renderer.render({"input_data": input_data, "metrics_definition": definition_str})
+
+    number = 20000
+    legacy_sec = timeit.timeit(legacy_build, number=number)
+    compiled_sec = timeit.timeit(compiled_build, number=number)
+    print(f"legacy  : {legacy_sec / number * 1e6:.1f} us/prompt")
+    print(f"compiled: {compiled_sec / number * 1e6:.1f} us/prompt ({legacy_sec / compiled_sec:.1f}x)")
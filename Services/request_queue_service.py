@@ -0,0 +1,564 @@
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+
+from collections import deque, namedtuple
+
+import redis
+
+import numpy as np
+
+from config import config
+
+from llm_api.Utils.logger import api_logger, consumer_logger
+
+
+CATEGORIES = ("host_instance_db", "service")
+CRITICAL_STATUSES = ("critical", "fatal")
+WARNING_STATUSES = ("warning",)
+
+
+def get_priority_levels():
+    """가중치가 큰 순서로 정렬된 우선순위 목록"""
+    return sorted(config.QUEUE_PRIORITY_WEIGHTS, key=config.QUEUE_PRIORITY_WEIGHTS.get, reverse=True)
+
+
+# 큐에서 꺼낸 요청 - message_id는 stream backend에서 ack할 때 사용 (list backend는 None)
+QueueMessage = namedtuple("QueueMessage", ["queue_key", "message_id", "payload"])
+
+
+def get_queue_key(category: str, priority: str):
+    if config.QUEUE_BACKEND == "stream":
+        return f"{config.QUEUE_KEY}:stream:{category}:{priority}"
+    return f"{config.QUEUE_KEY}:{category}:{priority}"
+
+
+def get_chunk_key(redis_key: str):
+    """토큰 스트리밍 chunk와 완료 이벤트가 기록되는 stream key"""
+    return f"{redis_key}:chunks"
+
+
+def make_fan_out_key(time: str, tiers: list):
+    """
+    fan-out 요청(summary 전체)의 집계 결과 key
+    같은 시점의 같은 (tier type, target_id) 구성이면 같은 key가 되도록 정렬 후 hash 한다.
+    """
+    targets = sorted(f"{tier['type']}:{instance['target_id']}" for tier in tiers for instance in tier["instances"])
+    return f"{time}_summary_{hashlib.sha1('|'.join(targets).encode('utf-8')).hexdigest()[:16]}"
+
+
+def get_fan_out_state_key(aggregate_key: str):
+    """다른 작업의 하위 결과를 기다리는 fan-out 집계의 원 요청/하위 key 목록 hash"""
+    return f"{aggregate_key}:fan_out"
+
+
+def get_fan_out_pending_key(aggregate_key: str):
+    """fan-out 집계가 아직 기다리는 하위 key set"""
+    return f"{aggregate_key}:fan_out:pending"
+
+
+def get_fan_out_waiters_key(child_key: str):
+    """하위 key 완료 시 갱신해야 하는 fan-out 집계 key set"""
+    return f"{child_key}:fan_out_waiters"
+
+
+def split_fan_out_request(request_data: dict):
+    """summary의 모든 tier/instance를 instance 하나씩 담은 요청으로 나눈다. (기존 단건 요청과 같은 형태)"""
+    summary = request_data["summary"]
+    sub_requests = []
+    for tier in summary["tiers"]:
+        for instance in tier["instances"]:
+            sub_request = {**request_data, "fan_out": False, "stream": False}
+            sub_request["summary"] = {**summary, "tiers": [{**tier, "instances": [instance]}]}
+            sub_requests.append(sub_request)
+    return sub_requests
+
+
+def get_all_queue_keys():
+    """(queue key, category, priority) 목록, 우선순위가 높은 순"""
+    return [
+        (get_queue_key(category, priority), category, priority)
+        for priority in get_priority_levels()
+        for category in CATEGORIES
+    ]
+
+
+def classify_priority(request_data: dict):
+    """
+    요청 데이터의 이상 신호로 우선순위(critical, warning, normal)를 판단한다.
+    - host_instance_db: Instance.status, Instance.normalityScore(낮을수록 비정상), Summary.anomalyCountMap
+      단건 요청은 분석 대상(첫 tier 의 첫 instance)과 그 tier 유형의 이상 건수만 보고,
+      fan_out 요청만 summary 전체 tier/instance 를 본다.
+    - service: Anomaly.failure 여부
+    """
+    if request_data["category_inst_type"] == "host_instance_db":
+        summary = request_data["summary"]
+        if request_data.get("fan_out"):
+            instances = [instance for tier in summary["tiers"] for instance in tier["instances"]]
+            anomaly_count = sum(summary["anomalyCountMap"].values())
+        else:
+            tier = summary["tiers"][0]
+            instances = tier["instances"][:1]
+            anomaly_count = summary["anomalyCountMap"].get(tier["type"], 0)
+        statuses = {str(instance["status"]).lower() for instance in instances}
+        min_score = min((instance["normalityScore"] for instance in instances), default=100.0)
+
+        if statuses & set(CRITICAL_STATUSES) or min_score <= config.CRITICAL_NORMALITY_SCORE:
+            return "critical"
+        if statuses & set(WARNING_STATUSES) or min_score <= config.WARNING_NORMALITY_SCORE \
+                or anomaly_count >= config.WARNING_ANOMALY_COUNT:
+            return "warning"
+        return "normal"
+
+    anomalies = [anomaly for tx_code in request_data["tx_codes"].values() for anomaly in tx_code["anomaly"]]
+    if any(anomaly["failure"] for anomaly in anomalies):
+        return "critical"
+    if anomalies:
+        return "warning"
+    return "normal"
+
+
+# 결과 hash 상태 확인 -> running 설정 -> queue 등록을 하나의 스크립트로 원자적으로 수행한다.
+# 여러 API replica가 동시에 같은 key를 요청해도 queue에는 한 번만 등록된다.
+# running 상태 key는 RUNNING_STALE_SEC * 2 후 만료되어, 유실된 작업의 key가 남지 않는다.
+# 새로 등록할 때는 이전 실행의 chunk stream을 지워 스트리밍 구독자가 지난 완료 이벤트를 받지 않게 한다.
+# KEYS[1]: 결과 hash key, KEYS[2]: 요청 queue key, KEYS[3]: chunk stream key
+# ARGV[1]: 요청 payload, ARGV[2]: 현재 시각(초), ARGV[3]: running 상태 유효 시간(초)
+ENQUEUE_IF_ABSENT_SCRIPT = """
+local status = redis.call('HGET', KEYS[1], 'status')
+if status == 'success' then
+    return {'success', redis.call('HGET', KEYS[1], 'response')}
+end
+if status == 'running' then
+    local started_at = tonumber(redis.call('HGET', KEYS[1], 'started_at'))
+    if started_at and tonumber(ARGV[2]) - started_at < tonumber(ARGV[3]) then
+        return {'running'}
+    end
+end
+redis.call('HSET', KEYS[1], 'status', 'running', 'response', 'null', 'started_at', ARGV[2])
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[3]) * 2)
+redis.call('DEL', KEYS[3])
+redis.call('RPUSH', KEYS[2], ARGV[1])
+return {'enqueued'}
+"""
+
+# Stream backend용 스크립트 - RPUSH 대신 XADD (MAXLEN ~ ARGV[4])
+STREAM_ENQUEUE_IF_ABSENT_SCRIPT = ENQUEUE_IF_ABSENT_SCRIPT.replace(
+    "redis.call('RPUSH', KEYS[2], ARGV[1])",
+    "redis.call('XADD', KEYS[2], 'MAXLEN', '~', ARGV[4], '*', 'payload', ARGV[1])"
+)
+
+# 같은 single-flight 규칙으로 running 상태만 선점하고 queue에는 넣지 않는다. (consumer가 직접 처리하는 fan-out 하위 요청용)
+# KEYS[1]: 결과 hash key, KEYS[2]: chunk stream key
+# ARGV[1]: 현재 시각(초), ARGV[2]: running 상태 유효 시간(초)
+CLAIM_IF_ABSENT_SCRIPT = """
+local status = redis.call('HGET', KEYS[1], 'status')
+if status == 'success' then
+    return {'success', redis.call('HGET', KEYS[1], 'response')}
+end
+if status == 'running' then
+    local started_at = tonumber(redis.call('HGET', KEYS[1], 'started_at'))
+    if started_at and tonumber(ARGV[1]) - started_at < tonumber(ARGV[2]) then
+        return {'running'}
+    end
+end
+redis.call('HSET', KEYS[1], 'status', 'running', 'response', 'null', 'started_at', ARGV[1])
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[2]) * 2)
+redis.call('DEL', KEYS[2])
+return {'claimed'}
+"""
+
+# fan-out 집계가 기다리는 하위 key 하나를 완료 처리한다. 마지막 key를 지운 호출만 1을 받아 집계를 한 번만 만든다.
+# KEYS[1]: 대기 중인 하위 key set, ARGV[1]: 완료된 하위 key
+FAN_OUT_CHILD_DONE_SCRIPT = """
+if redis.call('SREM', KEYS[1], ARGV[1]) == 1 and redis.call('SCARD', KEYS[1]) == 0 then
+    return 1
+end
+return 0
+"""
+
+_enqueue_scripts = {}
+_claim_scripts = {}
+_fan_out_done_scripts = {}
+
+
+async def enqueue_if_absent(redis_client, redis_key: str, request_data: dict):
+    """
+    redis_key에 대한 작업이 없을 때만 우선순위 queue에 등록한다. (single-flight)
+    :param redis_client: redis.asyncio 클라이언트
+    :param redis_key: 결과가 저장될 key
+    :param request_data: queue에 넣을 요청 데이터
+    :return: (상태, 응답) - 상태는 success(이미 완료), running(다른 요청이 처리 중), enqueued(새로 등록)
+    """
+    script = _enqueue_scripts.get(id(redis_client))
+    if script is None:
+        script = redis_client.register_script(
+            STREAM_ENQUEUE_IF_ABSENT_SCRIPT if config.QUEUE_BACKEND == "stream" else ENQUEUE_IF_ABSENT_SCRIPT
+        )
+        _enqueue_scripts[id(redis_client)] = script
+
+    now = time.time()
+    priority = classify_priority(request_data)
+    queue_key = get_queue_key(request_data["category_inst_type"], priority)
+    payload = {**request_data, "queue_meta": {"priority": priority, "enqueued_at": now}}
+
+    result = await script(
+        keys=[redis_key, queue_key, get_chunk_key(redis_key)],
+        args=[json.dumps(payload), int(now), config.RUNNING_STALE_SEC, config.STREAM_MAXLEN]
+    )
+    status = result[0]
+    response = result[1] if len(result) > 1 else None
+    api_logger.info(f"Single-flight 등록 결과: {redis_key} -> {status} (queue: {queue_key})")
+    return status, response
+
+
+def claim_if_absent(redis_client, redis_keys: list):
+    """
+    consumer가 직접 처리할 key들의 running 상태를 single-flight 규칙으로 선점한다. (sync 클라이언트)
+    :return: key별 (상태, 응답) 목록 - 상태는 success(이미 완료), running(다른 작업이 처리 중), claimed(선점 성공)
+    """
+    if not redis_keys:
+        return []
+    script = _claim_scripts.get(id(redis_client))
+    if script is None:
+        script = redis_client.register_script(CLAIM_IF_ABSENT_SCRIPT)
+        _claim_scripts[id(redis_client)] = script
+
+    now = int(time.time())
+    pipe = redis_client.pipeline(transaction=False)
+    for redis_key in redis_keys:
+        script(keys=[redis_key, get_chunk_key(redis_key)], args=[now, config.RUNNING_STALE_SEC], client=pipe)
+    results = [(result[0], result[1] if len(result) > 1 else None) for result in pipe.execute()]
+    consumer_logger.info(f"Single-flight 선점 결과: {dict(zip(redis_keys, (status for status, _ in results)))}")
+    return results
+
+
+def register_fan_out_wait(redis_client, aggregate_key: str, request_data: dict, child_keys: list, pending_keys: list):
+    """
+    다른 작업이 처리 중인 하위 key를 기다리는 fan-out 집계를 등록한다. (sync 클라이언트)
+    하위 key를 저장한 작업이 mark_fan_out_children_done 으로 완료 처리하고, 마지막 key를 완료한 쪽이 집계를 만든다.
+    등록 전에 끝난 key는 놓칠 수 있으므로 호출하는 쪽에서 등록 후 상태를 다시 확인해 완료 처리해야 한다.
+    """
+    ttl = config.RUNNING_STALE_SEC * 2
+    pipe = redis_client.pipeline(transaction=False)
+    state_key, pending_key = get_fan_out_state_key(aggregate_key), get_fan_out_pending_key(aggregate_key)
+    pipe.hset(state_key, mapping={"request": json.dumps(request_data), "child_keys": json.dumps(child_keys)})
+    pipe.expire(state_key, ttl)
+    pipe.sadd(pending_key, *pending_keys)
+    pipe.expire(pending_key, ttl)
+    for child_key in pending_keys:
+        pipe.sadd(get_fan_out_waiters_key(child_key), aggregate_key)
+        pipe.expire(get_fan_out_waiters_key(child_key), ttl)
+    pipe.execute()
+
+
+def mark_fan_out_children_done(redis_client, done_pairs: list):
+    """
+    (집계 key, 하위 key) 목록을 완료 처리한다. (sync 클라이언트)
+    :return: 기다리던 하위 key가 모두 끝나 이제 집계를 만들어야 하는 집계 key 목록
+    """
+    if not done_pairs:
+        return []
+    script = _fan_out_done_scripts.get(id(redis_client))
+    if script is None:
+        script = redis_client.register_script(FAN_OUT_CHILD_DONE_SCRIPT)
+        _fan_out_done_scripts[id(redis_client)] = script
+
+    pipe = redis_client.pipeline(transaction=False)
+    for aggregate_key, child_key in done_pairs:
+        script(keys=[get_fan_out_pending_key(aggregate_key)], args=[child_key], client=pipe)
+    return list(dict.fromkeys(aggregate_key for (aggregate_key, _), last in zip(done_pairs, pipe.execute()) if last))
+
+
+def _get_enqueued_at(payload: str | None):
+    if payload is None:
+        return None
+    try:
+        return json.loads(payload)["queue_meta"]["enqueued_at"]
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+async def get_queue_stats(redis_client):
+    """
+    queue별 현재 적재 건수, 가장 오래된 요청의 대기 시간, Consumer가 기록한 dequeue 대기 시간 통계를 조회
+    """
+    queue_keys = get_all_queue_keys()
+    pipe = redis_client.pipeline(transaction=False)
+    for queue_key, _, _ in queue_keys:
+        if config.QUEUE_BACKEND == "stream":
+            # ack된 메시지는 삭제되므로 stream 길이 = 미전달 + 처리 중
+            pipe.xlen(queue_key)
+            pipe.xrange(queue_key, count=1)
+        else:
+            pipe.llen(queue_key)
+            pipe.lindex(queue_key, 0)
+    pipe.hgetall(config.QUEUE_STATS_KEY)
+    results = await pipe.execute()
+
+    now = time.time()
+    wait_stats = results[-1]
+    stats = {}
+    for idx, (queue_key, category, priority) in enumerate(queue_keys):
+        depth, head = results[idx * 2], results[idx * 2 + 1]
+        if config.QUEUE_BACKEND == "stream":
+            head = head[0][1].get("payload") if head else None
+        enqueued_at = _get_enqueued_at(head)
+        stats[queue_key] = {
+            "category": category,
+            "priority": priority,
+            "depth": depth,
+            "oldest_wait_sec": round(now - enqueued_at, 3) if enqueued_at else 0.0,
+            "dequeue_wait_sec": json.loads(wait_stats[queue_key]) if queue_key in wait_stats else None,
+        }
+    return stats
+
+
+class PriorityQueueScheduler:
+    """
+    Consumer용 카테고리/우선순위 queue 스케줄러. (Redis List backend)
+    - 요청이 있는 queue 중 smooth weighted round-robin 으로 다음 queue를 고른다.
+    - QUEUE_MAX_WAIT_SEC 이상 기다린 요청이 맨 앞에 있는 queue는 가중치와 무관하게 먼저 꺼낸다.
+    - dequeue 시점의 대기 시간을 queue별로 모아 주기적으로 QUEUE_STATS_KEY에 기록한다.
+    """
+
+    def __init__(self, redis_client, window_size: int = 1000):
+        self.redis_client = redis_client
+        self.queue_keys = get_all_queue_keys()
+        self._weights = {queue_key: config.QUEUE_PRIORITY_WEIGHTS[priority] for queue_key, _, priority in self.queue_keys}
+        self._current_weights = {queue_key: 0 for queue_key, _, _ in self.queue_keys}
+        self._wait_times = {queue_key: deque(maxlen=window_size) for queue_key, _, _ in self.queue_keys}
+        self._last_stats_time = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _peek_heads(self):
+        """요청이 있는 queue별 맨 앞 요청의 등록 시각 {queue_key: enqueued_at}"""
+        pipe = self.redis_client.pipeline(transaction=False)
+        for queue_key, _, _ in self.queue_keys:
+            pipe.lindex(queue_key, 0)
+        heads = pipe.execute()
+        return {queue_key: _get_enqueued_at(head)
+                for (queue_key, _, _), head in zip(self.queue_keys, heads) if head is not None}
+
+    def _order_queues(self):
+        """이번 pop에서 확인할 queue 순서를 결정"""
+        head_times = self._peek_heads()
+        now = time.time()
+        empty_keys = [queue_key for queue_key, _, _ in self.queue_keys if queue_key not in head_times]
+
+        starved_keys = sorted(
+            (queue_key for queue_key, enqueued_at in head_times.items()
+             if enqueued_at is not None and now - enqueued_at >= config.QUEUE_MAX_WAIT_SEC),
+            key=head_times.get
+        )
+        if starved_keys:
+            consumer_logger.warning(f"대기 시간 초과 queue 우선 처리: {starved_keys}")
+            rest = [queue_key for queue_key in head_times if queue_key not in starved_keys]
+            return starved_keys + rest + empty_keys
+
+        if not head_times:
+            return empty_keys
+
+        with self._lock:
+            total_weight = sum(self._weights[queue_key] for queue_key in head_times)
+            for queue_key in head_times:
+                self._current_weights[queue_key] += self._weights[queue_key]
+            picked = max(head_times, key=self._current_weights.get)
+            self._current_weights[picked] -= total_weight
+
+        rest = [queue_key for queue_key in head_times if queue_key != picked]
+        return [picked] + rest + empty_keys
+
+    def _pop_ordered(self, queue_keys: list, timeout: float, max_count: int):
+        result = self.redis_client.blpop(queue_keys, timeout=timeout)
+        if result is None:
+            return []
+        queue_key, payload = result
+        return [QueueMessage(queue_key, None, payload)]
+
+    def pop(self, timeout: float, max_count: int = 1):
+        """
+        다음 요청을 꺼낸다. 모든 queue가 비어 있으면 timeout 초 동안 대기한다.
+        :param max_count: 한 번에 꺼낼 최대 건수 (stream backend의 미처리 메시지 회수 시 적용)
+        :return: QueueMessage 목록 (없으면 빈 목록)
+        """
+        messages = self._pop_ordered(self._order_queues(), timeout, max(max_count, 1))
+        now = time.time()
+        for message in messages:
+            enqueued_at = _get_enqueued_at(message.payload)
+            if enqueued_at is not None:
+                self._record_wait(message.queue_key, now - enqueued_at)
+        return messages
+
+    def ack(self, messages: list):
+        """결과 저장이 끝난 요청을 완료 처리한다. List backend는 pop 시점에 이미 제거되므로 할 일이 없다."""
+        return
+
+    def _record_wait(self, queue_key: str, wait_sec: float):
+        with self._lock:
+            self._wait_times[queue_key].append(wait_sec)
+            if time.monotonic() - self._last_stats_time < config.QUEUE_STATS_INTERVAL_SEC:
+                return
+            self._last_stats_time = time.monotonic()
+            snapshot = {queue_key: np.asarray(wait_times) for queue_key, wait_times in self._wait_times.items() if wait_times}
+
+        stats = {
+            queue_key: json.dumps({
+                "count": int(wait_times.size),
+                "avg": round(float(wait_times.mean()), 3),
+                "p50": round(float(np.percentile(wait_times, 50)), 3),
+                "p99": round(float(np.percentile(wait_times, 99)), 3),
+            })
+            for queue_key, wait_times in snapshot.items()
+        }
+        try:
+            self.redis_client.hset(config.QUEUE_STATS_KEY, mapping=stats)
+            consumer_logger.info(f"Queue 대기 시간 통계: {stats}")
+        except Exception:
+            consumer_logger.exception("Queue 대기 시간 통계 저장 중 오류 발생")
+
+
+class StreamQueueScheduler(PriorityQueueScheduler):
+    """
+    Redis Streams consumer group 기반 스케줄러.
+    - 결과 저장 후 ack 하므로 처리 중 consumer가 종료되어도 메시지가 유실되지 않는다.
+    - STREAM_CLAIM_IDLE_MS 이상 ack되지 않은 메시지는 XAUTOCLAIM 으로 회수해 다시 처리한다.
+      전달 횟수가 STREAM_MAX_DELIVERIES 를 넘은 메시지는 STREAM_DEAD_LETTER_KEY 로 옮기고 ack 한다.
+    - ack된 메시지는 XDEL로 지우고, 등록 시 MAXLEN ~ STREAM_MAXLEN 으로 길이를 제한한다.
+    """
+
+    def __init__(self, redis_client, window_size: int = 1000):
+        super().__init__(redis_client, window_size)
+        self.consumer_name = f"{socket.gethostname()}-{os.getpid()}"
+        self._last_claim_time = 0.0
+        self._claim_lock = threading.Lock()
+        for queue_key, _, _ in self.queue_keys:
+            try:
+                self.redis_client.xgroup_create(queue_key, config.STREAM_GROUP, id="0", mkstream=True)
+            except redis.ResponseError as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+        consumer_logger.info(f"Stream consumer group 준비 완료 - group: {config.STREAM_GROUP}, consumer: {self.consumer_name}")
+
+    def _peek_heads(self):
+        pipe = self.redis_client.pipeline(transaction=False)
+        for queue_key, _, _ in self.queue_keys:
+            pipe.xinfo_groups(queue_key)
+        groups_list = pipe.execute(raise_on_error=False)
+
+        pipe = self.redis_client.pipeline(transaction=False)
+        for (queue_key, _, _), groups in zip(self.queue_keys, groups_list):
+            last_id = "0-0"
+            if not isinstance(groups, Exception):
+                for group in groups:
+                    if group["name"] == config.STREAM_GROUP:
+                        last_id = group["last-delivered-id"]
+            pipe.xrange(queue_key, min=f"({last_id}", count=1)
+        heads = pipe.execute(raise_on_error=False)
+
+        return {queue_key: _get_enqueued_at(head[0][1].get("payload"))
+                for (queue_key, _, _), head in zip(self.queue_keys, heads)
+                if head and not isinstance(head, Exception)}
+
+    def _to_messages(self, entries):
+        messages = []
+        for queue_key, stream_entries in entries:
+            for message_id, fields in stream_entries:
+                messages.append(QueueMessage(queue_key, message_id, (fields or {}).get("payload")))
+        return messages
+
+    def _dead_letter(self, queue_key: str, claimed: list):
+        """
+        전달 횟수가 STREAM_MAX_DELIVERIES 를 넘은 메시지를 dead-letter stream 으로 옮기고 ack 한다.
+        (처리 중 consumer를 계속 종료시키는 메시지가 무한히 회수되지 않도록 한다.)
+        :return: 다시 처리할 메시지 목록
+        """
+        pending = self.redis_client.xpending_range(
+            queue_key, config.STREAM_GROUP, min=claimed[0][0], max=claimed[-1][0], count=len(claimed),
+            consumername=self.consumer_name
+        )
+        deliveries = {entry["message_id"]: entry["times_delivered"] for entry in pending}
+        retry, dead = [], []
+        for message_id, fields in claimed:
+            (dead if deliveries.get(message_id, 0) > config.STREAM_MAX_DELIVERIES else retry).append((message_id, fields))
+        if not dead:
+            return retry
+
+        pipe = self.redis_client.pipeline(transaction=False)
+        for message_id, fields in dead:
+            pipe.xadd(config.STREAM_DEAD_LETTER_KEY,
+                      {"queue_key": queue_key, "message_id": message_id,
+                       "deliveries": deliveries[message_id], "payload": (fields or {}).get("payload") or ""},
+                      maxlen=config.STREAM_MAXLEN, approximate=True)
+            pipe.xack(queue_key, config.STREAM_GROUP, message_id)
+            pipe.xdel(queue_key, message_id)
+        pipe.execute()
+        consumer_logger.error(f"Stream 재처리 한도 초과 메시지 dead-letter 이동: {queue_key} - "
+                              f"{[message_id for message_id, _ in dead]}")
+        return retry
+
+    def _reclaim(self, max_count: int):
+        """다른(종료된) consumer가 오래 잡고 있는 메시지를 최대 max_count 건 회수"""
+        with self._claim_lock:
+            if time.monotonic() - self._last_claim_time < config.STREAM_CLAIM_INTERVAL_SEC:
+                return []
+            self._last_claim_time = time.monotonic()
+
+        messages = []
+        for queue_key, _, _ in self.queue_keys:
+            remaining = max_count - len(messages)
+            if remaining <= 0:
+                break
+            try:
+                _, claimed, *_ = self.redis_client.xautoclaim(
+                    queue_key, config.STREAM_GROUP, self.consumer_name,
+                    min_idle_time=config.STREAM_CLAIM_IDLE_MS, start_id="0-0", count=remaining
+                )
+                if claimed:
+                    claimed = self._dead_letter(queue_key, claimed)
+            except Exception:
+                consumer_logger.exception(f"Stream 미처리 메시지 회수 중 오류 발생: {queue_key}")
+                continue
+            if claimed:
+                consumer_logger.warning(f"Stream 미처리 메시지 회수: {queue_key} - {len(claimed)}건")
+                messages.extend(self._to_messages([(queue_key, claimed)]))
+        return messages
+
+    def _pop_ordered(self, queue_keys: list, timeout: float, max_count: int):
+        claimed = self._reclaim(max_count)
+        if claimed:
+            return claimed
+
+        # 순서대로 즉시 읽기를 시도하고, 모두 비어 있으면 전체 stream에서 대기한다.
+        for queue_key in queue_keys:
+            entries = self.redis_client.xreadgroup(
+                config.STREAM_GROUP, self.consumer_name, {queue_key: ">"}, count=1
+            )
+            if entries:
+                return self._to_messages(entries)
+
+        entries = self.redis_client.xreadgroup(
+            config.STREAM_GROUP, self.consumer_name, {queue_key: ">" for queue_key in queue_keys},
+            count=1, block=max(int(timeout * 1000), 1)
+        )
+        return self._to_messages(entries or [])
+
+    def ack(self, messages: list):
+        """결과 저장이 끝난 메시지를 ack 후 stream에서 삭제"""
+        if not messages:
+            return
+        pipe = self.redis_client.pipeline(transaction=False)
+        for message in messages:
+            pipe.xack(message.queue_key, config.STREAM_GROUP, message.message_id)
+            pipe.xdel(message.queue_key, message.message_id)
+        pipe.execute()
+
+
+def create_queue_scheduler(redis_client):
+    """QUEUE_BACKEND 설정에 맞는 스케줄러 생성"""
+    if config.QUEUE_BACKEND == "stream":
+        return StreamQueueScheduler(redis_client)
+    return PriorityQueueScheduler(redis_client)
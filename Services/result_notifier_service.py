@@ -0,0 +1,110 @@
+import asyncio
+import json
+import redis.asyncio as redis
+
+from config import config
+
+from llm_api.Utils.logger import api_logger
+
+
+class ResultNotifier:
+    """
+    Consumer가 발행하는 결과 저장 완료 이벤트(RESULT_CHANNEL)를 하나의 구독으로 받아
+    해당 key를 기다리는 코루틴들의 future를 깨운다.
+    구독이 아직 연결되지 않았으면(subscribed 가 False) 대기하는 쪽이 상태를 직접 조회(polling)한다.
+    """
+
+    def __init__(self):
+        self.redis_client = redis.Redis(host=config.SAVE_REDIS_HOST, port=config.SAVE_REDIS_PORT, decode_responses=True)
+        self._waiters: dict[str, set[asyncio.Future]] = {}
+        self._listener_task: asyncio.Task | None = None
+        self._subscribed = asyncio.Event()
+
+    @property
+    def subscribed(self):
+        return self._subscribed.is_set()
+
+    def _ensure_listener(self):
+        if self._listener_task is None or self._listener_task.done():
+            self._subscribed = asyncio.Event()
+            self._listener_task = asyncio.create_task(self._listen())
+
+    async def start(self):
+        """
+        구독을 시작하고 TIMEOUT 동안 연결을 기다린다.
+        시간 안에 연결되지 않으면 백그라운드에서 계속 재연결을 시도하고, 그동안 대기 요청은 polling 으로 처리한다.
+        """
+        self._ensure_listener()
+        try:
+            await asyncio.wait_for(asyncio.shield(self._subscribed.wait()), config.TIMEOUT)
+        except TimeoutError:
+            api_logger.error(f"결과 이벤트 구독 연결 시간 초과({config.TIMEOUT} seconds.), "
+                             f"연결될 때까지 상태 조회(polling)로 대기합니다.")
+
+    async def stop(self):
+        if self._listener_task is not None:
+            self._listener_task.cancel()
+            try:
+                await self._listener_task
+            except asyncio.CancelledError:
+                pass
+            self._listener_task = None
+        await self.redis_client.aclose()
+
+    async def register(self, redis_key: str) -> asyncio.Future:
+        """
+        redis_key 완료 시 상태(success/failed)가 설정되는 future를 반환한다.
+        이벤트 유실을 막기 위해 상태 조회 전에 먼저 등록해야 한다.
+        """
+        self._ensure_listener()
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(redis_key, set()).add(future)
+        return future
+
+    def unregister(self, redis_key: str, future: asyncio.Future):
+        waiters = self._waiters.get(redis_key)
+        if waiters is None:
+            return
+        waiters.discard(future)
+        if not waiters:
+            self._waiters.pop(redis_key, None)
+
+    def _notify(self, redis_key: str, status: str):
+        for future in self._waiters.pop(redis_key, set()):
+            if not future.done():
+                future.set_result(status)
+
+    async def _resync(self):
+        """재구독 사이에 놓친 이벤트가 있을 수 있으므로 대기 중인 key의 상태를 직접 확인"""
+        for redis_key in list(self._waiters):
+            status = await self.redis_client.hget(redis_key, "status")
+            if status in ("success", "failed"):
+                self._notify(redis_key, status)
+
+    async def _listen(self):
+        while True:
+            pubsub = self.redis_client.pubsub()
+            try:
+                await pubsub.subscribe(config.RESULT_CHANNEL)
+                api_logger.info(f"결과 이벤트 구독 시작 - channel: {config.RESULT_CHANNEL}")
+                await self._resync()
+                self._subscribed.set()
+
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    try:
+                        event = json.loads(message["data"])
+                        self._notify(event["redis_key"], event["status"])
+                    except Exception:
+                        api_logger.exception(f"결과 이벤트 파싱 중 오류 발생: {message['data']}")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                api_logger.exception("결과 이벤트 구독 중 오류 발생, 재연결 시도")
+                await asyncio.sleep(config.CHECK_INTERVAL)
+            finally:
+                await pubsub.aclose()
+
+
+result_notifier = ResultNotifier()
@@ -0,0 +1,107 @@
+import time
+
+from config import config
+
+from llm_api.Utils.logger import api_logger
+
+
+def get_index_key(category: str):
+    return f"{config.RESULT_INDEX_KEY}:{category}"
+
+
+def get_result_ttl(category: str, status: str):
+    """카테고리/상태별 결과 보관 시간(초)"""
+    if status == "failed":
+        return config.RESULT_FAILED_TTL_SEC
+    return config.RESULT_TTL_SEC.get(category, max(config.RESULT_TTL_SEC.values()))
+
+
+def get_index_retention(category: str):
+    """인덱스 보관 시간 - 카테고리에서 가장 긴 결과 보관 시간보다 오래된 항목은 모두 만료된 것"""
+    return max(get_result_ttl(category, "success"), config.RESULT_FAILED_TTL_SEC)
+
+
+def add_trim_index(pipe, category: str, now: float):
+    """인덱스에서 보관 시간이 지난 항목과 RESULT_INDEX_MAX_SIZE 초과분(오래된 순)을 제거하는 명령을 추가"""
+    index_key = get_index_key(category)
+    pipe.zremrangebyscore(index_key, "-inf", now - get_index_retention(category))
+    pipe.zremrangebyrank(index_key, 0, -config.RESULT_INDEX_MAX_SIZE - 1)
+    return pipe
+
+
+def add_store_result(pipe, redis_key: str, category: str, mapping: dict):
+    """
+    결과 저장 명령을 pipeline에 추가한다. (hset + expire, 인덱스 사용 시 zadd + 만료/초과분 정리)
+    sync/async pipeline 모두 명령 등록은 동기이므로 실행(execute)은 호출하는 쪽에서 한다.
+    """
+    ttl = get_result_ttl(category, mapping["status"])
+    pipe.hset(redis_key, mapping=mapping)
+    pipe.expire(redis_key, ttl)
+
+    if config.RESULT_INDEX_ENABLED:
+        now = time.time()
+        pipe.zadd(get_index_key(category), {redis_key: now})  # score: 저장 시각
+        add_trim_index(pipe, category, now)
+    return pipe
+
+
+async def list_recent_results(redis_client, category: str, limit: int = 50):
+    """
+    인덱스에서 최근 저장된 순으로 결과 key를 조회한다. (SCAN 없이 조회)
+    보관 시간이 짧은 실패 결과처럼 이미 만료된 key는 결과에서 제외한다.
+    :return: [{"redis_key", "status", "stored_at"}]
+    """
+    if not config.RESULT_INDEX_ENABLED:
+        api_logger.warning("결과 인덱스가 비활성화되어 있습니다. (RESULT_INDEX_ENABLED)")
+        return []
+
+    entries = await redis_client.zrevrangebyscore(
+        get_index_key(category), "+inf", time.time() - get_index_retention(category), start=0, num=limit,
+        withscores=True
+    )
+    pipe = redis_client.pipeline(transaction=False)
+    for redis_key, _ in entries:
+        pipe.hget(redis_key, "status")
+    statuses = await pipe.execute()
+
+    return [
+        {"redis_key": redis_key, "status": status, "stored_at": stored_at}
+        for (redis_key, stored_at), status in zip(entries, statuses) if status is not None
+    ]
+
+
+async def get_result_store_stats(redis_client, sample_size: int = 20):
+    """
+    결과 저장소의 메모리 사용량을 조회한다.
+    카테고리별 인덱스 key 수와 최근 key 일부의 MEMORY USAGE 평균으로 결과 전체 크기를 추정한다.
+    """
+    memory_info = await redis_client.info("memory")
+    stats = {
+        "used_memory": memory_info.get("used_memory"),
+        "used_memory_human": memory_info.get("used_memory_human"),
+        "maxmemory": memory_info.get("maxmemory"),
+        "maxmemory_policy": memory_info.get("maxmemory_policy"),
+        "categories": {},
+    }
+    if not config.RESULT_INDEX_ENABLED:
+        return stats
+
+    for category in config.RESULT_TTL_SEC:
+        index_key = get_index_key(category)
+        await add_trim_index(redis_client.pipeline(transaction=False), category, time.time()).execute()
+        key_count = await redis_client.zcard(index_key)
+        sample_keys = await redis_client.zrevrange(index_key, 0, sample_size - 1)
+
+        pipe = redis_client.pipeline(transaction=False)
+        for redis_key in sample_keys:
+            pipe.memory_usage(redis_key)
+        sample_usages = [usage for usage in await pipe.execute() if usage is not None]
+        avg_bytes = sum(sample_usages) / len(sample_usages) if sample_usages else 0
+
+        stats["categories"][category] = {
+            "key_count": key_count,
+            "avg_key_bytes": round(avg_bytes, 1),
+            "estimated_bytes": int(avg_bytes * key_count),
+            "ttl_sec": get_result_ttl(category, "success"),
+        }
+    return stats
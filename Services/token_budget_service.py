@@ -0,0 +1,124 @@
+import threading
+
+from collections import namedtuple
+
+from config import config
+
+from llm_api.Utils.logger import llm_logger
+
+
+def estimate_tokens(text: str):
+    """
+    토크나이저 없이 토큰 수를 추정한다.
+    영문/숫자/기호는 약 4자당 1토큰, 한글 등 비 ASCII 문자는 1자당 1토큰으로 계산한다.
+    """
+    ascii_count = sum(1 for char in text if char.isascii())
+    return (ascii_count + 3) // 4 + (len(text) - ascii_count)
+
+
+class TokenCounter:
+    """
+    대상 모델의 토크나이저(transformers, TOKENIZER_PATH)로 토큰 수를 센다.
+    - 토크나이저는 처음 토큰 수를 셀 때 로컬 파일에서만 읽는다. (local_files_only, hub 네트워크 조회 없음)
+    - 경로가 없거나 transformers 가 없거나 읽지 못하면 estimate_tokens 로 추정한다.
+    """
+
+    def __init__(self, tokenizer_path: str | None):
+        self.tokenizer_path = tokenizer_path
+        self._tokenizer = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._loaded:
+                return
+            if self.tokenizer_path:
+                try:
+                    from transformers import AutoTokenizer
+
+                    self._tokenizer = AutoTokenizer.from_pretrained(self.tokenizer_path, local_files_only=True)
+                    llm_logger.info(f"토크나이저 로딩 완료 - {self.tokenizer_path}")
+                except Exception:
+                    llm_logger.warning(f"토크나이저 로딩 실패, 문자 수 기반 추정 사용 - {self.tokenizer_path}")
+            self._loaded = True
+
+    @property
+    def exact(self):
+        if not self._loaded:
+            self._load()
+        return self._tokenizer is not None
+
+    def count(self, text: str):
+        if not text:
+            return 0
+        if not self._loaded:
+            self._load()
+        if self._tokenizer is None:
+            return estimate_tokens(text)
+        return len(self._tokenizer.encode(text, add_special_tokens=False))
+
+
+token_counter = TokenCounter(config.TOKENIZER_PATH)
+
+# name: 템플릿 변수명, items: 중요도 순 항목, render: items -> 문자열, min_items: 잘라내도 남길 최소 항목 수
+PromptSection = namedtuple("PromptSection", ["name", "items", "render", "min_items"])
+
+
+class TokenBudgetManager:
+    """
+    프롬프트가 모델 context(LLM_NUM_CTX)를 넘지 않도록 section별 토큰을 배분한다.
+    - 사용 가능 토큰 = LLM_NUM_CTX - 답변용 max_length - 고정 템플릿(규칙/출력 형식) 토큰 - PROMPT_TOKEN_MARGIN
+    - 초과 시 PROMPT_TRIM_ORDER 순서(우선순위가 낮은 section 먼저)로 각 section의 뒤쪽(덜 중요한) 항목부터 제거한다.
+    """
+
+    def __init__(self, counter: TokenCounter):
+        self.counter = counter
+        self._static_text = ""
+        self._static_tokens = None
+
+    def set_static_prompt(self, static_text: str):
+        """컴파일된 템플릿의 고정 영역을 등록 (PromptRenderer 생성 시 호출, 토큰 수는 처음 사용할 때 센다)"""
+        self._static_text = static_text
+        self._static_tokens = None
+
+    @property
+    def static_tokens(self):
+        if self._static_tokens is None:
+            self._static_tokens = self.counter.count(self._static_text)
+        return self._static_tokens
+
+    @property
+    def available_tokens(self):
+        return config.LLM_NUM_CTX - config.max_length - self.static_tokens - config.PROMPT_TOKEN_MARGIN
+
+    def fit(self, sections: list, label: str = ""):
+        """
+        :param sections: PromptSection 목록
+        :return: ({section 이름: 렌더링된 문자열}, {section 이름: 남은 항목 목록})
+        """
+        budget = self.available_tokens
+        items = {section.name: list(section.items) for section in sections}
+        by_name = {section.name: section for section in sections}
+        rendered = {section.name: section.render(items[section.name]) for section in sections}
+        tokens = {name: self.counter.count(text) for name, text in rendered.items()}
+        trimmed = {}
+
+        trim_order = [name for name in config.PROMPT_TRIM_ORDER if name in by_name]
+        for name in trim_order:
+            section = by_name[name]
+            while sum(tokens.values()) > budget and len(items[name]) > section.min_items:
+                items[name].pop()
+                trimmed[name] = trimmed.get(name, 0) + 1
+                rendered[name] = section.render(items[name])
+                tokens[name] = self.counter.count(rendered[name])
+
+        used = self.static_tokens + sum(tokens.values())
+        log = llm_logger.warning if sum(tokens.values()) > budget else llm_logger.info
+        log(f"프롬프트 토큰 예산 {label} - 사용: {used} / {config.LLM_NUM_CTX - config.max_length} "
+            f"(고정: {self.static_tokens}, {', '.join(f'{name}: {count}' for name, count in tokens.items())}), "
+            f"제거 항목: {trimmed or '없음'}, 토크나이저: {'exact' if self.counter.exact else 'estimate'}")
+        return rendered, items
+
+
+token_budget_manager = TokenBudgetManager(token_counter)
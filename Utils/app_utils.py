@@ -1,6 +1,7 @@
 from fastapi import FastAPI
 
 from llm_api.Controllers.get_llm_response_controller import llm_router
+from llm_api.Services.result_notifier_service import result_notifier
 
 
 def create_app():
@@ -11,6 +12,8 @@ def create_app():
     )
 
     app.include_router(llm_router, prefix="/llm")
+    app.add_event_handler("startup", result_notifier.start)
+    app.add_event_handler("shutdown", result_notifier.stop)
     return app
 
 # @staticmethod
@@ -1,42 +1,57 @@
-from fastapi import FastAPI
-
-from llm_api.Controllers.get_llm_response_controller import llm_router
-
-
-def create_app():
-    app = FastAPI(
-        title="API Server Of LLM For Test",
-        description="해당 API Server는 XAIOps 내부 LLM 테스트를 위해 제작되었습니다.",
-        version="0.1.0"
-    )
-
-    app.include_router(llm_router, prefix="/llm")
-    return app
-
-# @staticmethod
-# def get_environment_variable():
-#     # AIMODULE_HOME
-#     home = os.environ.get(sc.AIMODULE_HOME)
-#     if home is None:
-#         print("plz export AIMODULE_HOME")
-#         home = os.path.dirname(os.path.abspath(__file__))
-#
-#     # MLOPS_LOG_PATH
-#     log_path = os.environ.get(sc.MLOPS_LOG_PATH)
-#     if log_path is None:
-#         print("plz export MLOPS_LOG_PATH")
-#         log_path = os.path.dirname(os.path.abspath(__file__))
-#
-#     # AIMODULE_PATH
-#     py_path = os.environ.get("AIMODULE_CHATBOT_PATH")
-#     if py_path is None:
-#         print("plz export AIMODULE_CHATBOT_PATH")
-#         py_path = os.path.dirname(os.path.abspath(__file__))
-#
-#     # AIMODULE_PATH
-#     server_env = os.environ.get(sc.AIMODULE_SERVER_ENV)
-#     if server_env is None:
-#         print("plz export AIMODULE_SERVER_ENV")
-#         py_path = os.path.dirname(os.path.abspath(__file__))
-#
-#     return home, log_path, py_path, server_env
\ No newline at end of file
+import numpy as np
+
+from datetime import datetime
+
+from config import config
+
+
+def to_datetime(value):
+    """
+    "%Y-%m-%d %H:%M:%S" 문자열을 datetime 으로 변환한다. (datetime 은 그대로 반환)
+    asyncpg 는 TIMESTAMP bind 값으로 문자열을 받지 않으므로 비동기 쿼리에 넘기기 전에 사용한다.
+    """
+    if isinstance(value, datetime):
+        return value
+    return datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+
+
+def score_anomaly_metrics(real_values, lowers, uppers, avgs, stds, contributions=None):
+    """
+    한 대상의 지표 전체를 배열로 받아 이상 점수를 계산한다. (None 은 NaN 으로 처리)
+    점수 = z-score + ANOMALY_BAND_WEIGHT * 정상 범위 이탈 정도 + ANOMALY_CONTRIBUTION_WEIGHT * 기여도 순위(0~1)
+    - z-score: |실제 값 - 평균| / 표준편차
+    - 정상 범위 이탈 정도: 범위를 벗어난 크기 / 범위 폭 (범위 안이면 0)
+    - 기여도 순위: GDN anomaly_contribution 의 백분위 순위 (없으면 0)
+    :return: 지표별 점수 배열
+    """
+    real_values = np.asarray(real_values, dtype=np.float64)
+    lowers = np.asarray(lowers, dtype=np.float64)
+    uppers = np.asarray(uppers, dtype=np.float64)
+    avgs = np.asarray(avgs, dtype=np.float64)
+    stds = np.asarray(stds, dtype=np.float64)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z_scores = np.abs(real_values - avgs) / np.maximum(stds, 1e-9)
+        band_width = np.maximum(uppers - lowers, 1e-9)
+        band_excess = np.maximum(np.maximum(real_values - uppers, lowers - real_values), 0.0) / band_width
+    scores = np.nan_to_num(z_scores, posinf=0.0) + config.ANOMALY_BAND_WEIGHT * np.nan_to_num(band_excess, posinf=0.0)
+
+    if contributions is not None and len(real_values) > 1:
+        contributions = np.nan_to_num(np.asarray(contributions, dtype=np.float64))
+        if contributions.any():
+            contribution_ranks = contributions.argsort(kind="stable").argsort() / (len(contributions) - 1)
+            scores += config.ANOMALY_CONTRIBUTION_WEIGHT * contribution_ranks
+    return scores
+
+
+def select_anomaly_metrics(real_values, lowers, uppers, avgs, stds, contributions=None):
+    """
+    이상 점수가 ANOMALY_SCORE_THRESHOLD 이상인 지표 중 상위 ANOMALY_TOP_N 개의 인덱스를 점수 순으로 반환한다.
+    임계값을 넘는 지표가 적으면 점수 순으로 ANOMALY_MIN_METRICS 개까지 채운다.
+    :return: (선택된 인덱스 목록, 지표별 점수 배열)
+    """
+    scores = score_anomaly_metrics(real_values, lowers, uppers, avgs, stds, contributions)
+    order = np.argsort(-scores, kind="stable")
+    above_count = int((scores >= config.ANOMALY_SCORE_THRESHOLD).sum())
+    keep_count = min(max(above_count, config.ANOMALY_MIN_METRICS), config.ANOMALY_TOP_N, len(order))
+    return order[:keep_count].tolist(), scores
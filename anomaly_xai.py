@@ -1,9 +1,10 @@
-import requests
 import time
 import traceback
 import psycopg2 as pg2
 from sentence_transformers import SentenceTransformer
 
+from llm_api.Services.llm_transport_service import rag_llm_transport
+
 
 def pre_base_prompt():
     prompt = f"""
@@ -202,9 +203,7 @@ def query_ollama():
         "stream": False
     }
 
-    response = requests.post(f"http://10.10.34.20:11435/api/generate", json=payload)
-    response.raise_for_status()
-    return response.json()["response"].strip()
+    return rag_llm_transport.generate(payload)["response"].strip()
 
 
 if __name__ == "__main__":
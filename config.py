@@ -9,7 +9,30 @@ class BaseConfig(BaseSettings):
     model_name: str = "qwen2.5:14b-instruct-q8_0"
     llm_base_url: str = "10.10.34.20:11434"
     temperature: float = 0
-    max_length: int = 512
+    max_length: int = 512  # 답변용으로 context에서 비워 두는 토큰 수
+    LLM_NUM_CTX: int = 8192  # Ollama num_ctx, 프롬프트 토큰 예산의 기준
+    TOKENIZER_PATH: str | None = None  # 토큰 수 계산용 로컬 토크나이저 경로 (네트워크 조회 안 함, 없으면 문자 수로 추정)
+    LLM_ASYNC_ENABLED: bool = False  # consumer 배치 생성을 비동기 경로(agenerate_response)로 실행
+    LLM_MAX_CONCURRENCY: int = 4  # 비동기 생성(agenerate_response) 최대 동시 실행 수 (event loop 당)
+    LLM_TIMEOUT_SEC: float = 120  # 비동기 생성 1건의 최대 소요 시간, 초과 시 HTTP 요청까지 취소
+    llm_base_urls: list[str] = []  # Ollama endpoint 목록 (비어 있으면 llm_base_url 하나만 사용)
+    RAG_LLM_BASE_URL: str = "10.10.34.20:11435"  # rag_pipeline / anomaly_xai 가 사용하는 Ollama endpoint
+    LLM_CONNECT_TIMEOUT_SEC: float = 5  # Ollama 연결 수립 timeout
+    LLM_READ_TIMEOUT_SEC: float = 300  # Ollama 응답 읽기 timeout (생성 시간 포함)
+    LLM_POOL_MAX_CONNECTIONS: int = 32  # endpoint 당 최대 HTTP 연결 수
+    LLM_POOL_MAX_KEEPALIVE: int = 16  # endpoint 당 유지할 keep-alive 연결 수
+    LLM_KEEPALIVE_EXPIRY_SEC: float = 300  # 유휴 keep-alive 연결 유지 시간
+    LLM_DEFAULT_TOKENS_PER_SEC: float = 20.0  # 생성 속도 관측 전 endpoint 가중치 (tokens/sec)
+    LLM_TPS_EWMA_ALPHA: float = 0.2  # endpoint 생성 속도 이동 평균 계수
+    LLM_HEALTH_CHECK_INTERVAL_SEC: float = 10  # Ollama endpoint health check(/api/tags) 주기
+    LLM_HEALTH_TIMEOUT_SEC: float = 3  # health check 요청 timeout
+    LLM_HEALTH_FAIL_THRESHOLD: int = 3  # 연속 실패 시 endpoint 를 제외하는 횟수
+    LLM_KEEP_ALIVE: str = "30m"  # 마지막 요청 후 Ollama 가 모델을 메모리에 유지하는 시간
+    LLM_WARMUP_ENABLED: bool = True  # consumer 시작 시 모델 warm-up 후 작업 시작
+    LLM_WARMUP_TIMEOUT_SEC: float = 300  # warm-up 최대 대기 시간
+    LLM_WARMUP_RETRY_SEC: float = 5  # warm-up 실패 시 재시도 간격
+    LLM_REWARM_INTERVAL_SEC: float = 600  # 주기적 re-warm 간격 (LLM_KEEP_ALIVE 보다 짧게)
+    LLM_COLD_LOAD_THRESHOLD_SEC: float = 1.0  # load_duration 이 이 값 이상이면 모델 로딩(cold)으로 판단
 
     # DataBase URL
     POSTGRES_USER: str
@@ -17,16 +40,98 @@ class BaseConfig(BaseSettings):
     POSTGRES_DB: str
     POSTGRES_HOST: str
     POSTGRES_PORT: int
+    # Connection Pool
+    DB_ECHO: bool = False  # SQL 로그 출력 여부 (True 이면 모든 SQL을 동기로 로그에 기록)
+    DB_POOL_SIZE: int = 8  # 상시 유지하는 연결 수 (consumer 처리 스레드 수 이상 권장)
+    DB_MAX_OVERFLOW: int = 4  # pool_size 초과 시 임시로 추가 생성 가능한 연결 수
+    DB_POOL_TIMEOUT: float = 10  # 연결을 빌리기 위해 기다리는 최대 시간 (초)
+    DB_POOL_RECYCLE_SEC: int = 1800  # 이 시간보다 오래된 연결은 재생성 (방화벽/서버 idle timeout 대비)
+    DB_POOL_PRE_PING: bool = True  # 연결을 빌릴 때 유효성 확인
 
     # Redis
     DATA_REDIS_HOST: str
     DATA_REDIS_PORT: int
     SAVE_REDIS_HOST: str
     SAVE_REDIS_PORT: int
-    QUEUE_KEY: str = "llm_request_queue"
+    QUEUE_KEY: str = "llm_request_queue"  # 카테고리/우선순위별 queue key의 prefix
+    # 우선순위 Queue 스케줄링
+    QUEUE_PRIORITY_WEIGHTS: dict[str, int] = {"critical": 6, "warning": 3, "normal": 1}  # 가중치 기반 공정 분배
+    QUEUE_MAX_WAIT_SEC: int = 30  # 이 시간 이상 대기한 요청은 우선순위와 무관하게 먼저 처리 (starvation 방지)
+    QUEUE_BACKEND: str = "list"  # list: Redis List(BLPOP), stream: Redis Streams consumer group
+    STREAM_GROUP: str = "llm_consumers"  # stream backend consumer group 이름
+    STREAM_MAXLEN: int = 10000  # stream별 최대 보관 건수 (근사 trim)
+    STREAM_CLAIM_IDLE_MS: int = 600000  # 이 시간 이상 ack되지 않은 메시지는 다른 consumer가 회수
+    STREAM_CLAIM_INTERVAL_SEC: int = 30  # 미처리 메시지 회수 주기
+    STREAM_MAX_DELIVERIES: int = 3  # 메시지 최대 전달 횟수, 넘으면 dead-letter stream 으로 이동
+    STREAM_DEAD_LETTER_KEY: str = "llm_request_dead_letter"  # 재처리 한도를 넘은 메시지 보관 stream
+    QUEUE_STATS_KEY: str = "llm_request_queue:stats"  # 우선순위별 대기 시간 통계 hash
+    QUEUE_STATS_INTERVAL_SEC: int = 10  # 대기 시간 통계 저장 주기
+    CRITICAL_NORMALITY_SCORE: float = 30.0  # normalityScore 가 이 값 이하이면 critical
+    WARNING_NORMALITY_SCORE: float = 60.0  # normalityScore 가 이 값 이하이면 warning
+    WARNING_ANOMALY_COUNT: int = 10  # anomalyCountMap 합계가 이 값 이상이면 warning
     # Redis 상태 확인 간격 및 타임아웃
     CHECK_INTERVAL: int = 1  # 1초 간격
     TIMEOUT: int = 120  # 10초 초과 시 실패 처리
+    RESULT_CHANNEL: str = "llm_result_events"  # 결과 저장 완료 이벤트 pub/sub 채널
+    # 결과 보관 정책
+    RESULT_TTL_SEC: dict[str, int] = {"host_instance_db": 86400, "service": 86400}  # 카테고리별 성공 결과 보관 시간
+    RESULT_FAILED_TTL_SEC: int = 300  # 실패 결과 보관 시간 (짧게 두어 재요청 시 다시 분석)
+    RESULT_INDEX_ENABLED: bool = True  # 최근 결과 key 보조 인덱스(sorted set) 사용 여부
+    RESULT_INDEX_KEY: str = "llm_result_index"  # 카테고리별 인덱스 key prefix
+    RESULT_INDEX_MAX_SIZE: int = 100000  # 카테고리별 인덱스 최대 key 수
+    # 이상 패턴 signature 기반 답변 캐시
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_KEY: str = "llm_answer_cache"  # 캐시 key prefix
+    ANSWER_CACHE_TTL_SEC: int = 3600  # 캐시 보관 시간
+    ANSWER_CACHE_SIMILARITY: float = 0.8  # 참고 답변으로 넣을 signature Jaccard 유사도 임계값 (1.0 이면 사용 안 함)
+    ANSWER_CACHE_HINT_MAX_TOKENS: int = 512  # 참고 답변 최대 토큰 수 (넘으면 넣지 않음)
+    ANSWER_CACHE_BUCKETS: list[float] = [0.5, 1.0, 2.0, 5.0]  # 정상 범위 폭 대비 이탈 정도 구간 경계
+    ANSWER_CACHE_MAX_CANDIDATES: int = 200  # 유사도 비교 대상 최대 signature 수
+    CHUNK_STREAM_TTL_SEC: int = 600  # 토큰 스트리밍 chunk stream 보관 시간
+    CHUNK_STREAM_MAXLEN: int = 5000  # 요청별 chunk stream 최대 길이
+    SSE_BLOCK_MS: int = 1000  # SSE relay의 XREAD 대기 시간 (대기 중에는 keep-alive 주석 전송)
+    RUNNING_STALE_SEC: int = 300  # running 상태가 이 시간을 넘기면 작업이 유실된 것으로 보고 재등록
+
+    # Consumer Worker Pool
+    CONSUMER_WORKER_COUNT: int = 4  # 큐를 소비하는 워커 스레드 수
+    CONSUMER_MAX_IN_FLIGHT: int = 2  # 워커당 동시에 처리 가능한 최대 요청 수
+    CONSUMER_POP_TIMEOUT: int = 5  # BLPOP 대기 시간 (초)
+    CONSUMER_BATCH_SIZE: int = 8  # 한 번에 묶어서 처리할 최대 요청 수
+    CONSUMER_BATCH_WAIT_MS: int = 50  # 배치를 채우기 위해 추가로 기다리는 최대 시간 (ms)
+    LLM_BATCH_MAX_CONCURRENCY: int = 4  # 배치 내 동시 LLM 호출 수
+    PROMPT_ASYNC_ENABLED: bool = False  # 배치 프롬프트를 asyncpg/redis.asyncio 로 동시에 생성 (asyncpg 필요)
+
+    # DBSLN 기준선 in-process 캐시
+    BASELINE_CACHE_ENABLED: bool = True
+    BASELINE_CACHE_MAX_MB: int = 256  # 캐시 최대 메모리, 초과 시 LRU 제거
+    BASELINE_CACHE_TTL_SEC: int = 3600  # 변경 알림을 받지 못한 경우를 대비한 최대 보관 시간
+    BASELINE_CACHE_MISSING_TTL_SEC: int = 60  # 문서가 없는(또는 읽을 수 없는) key를 다시 조회하지 않는 시간
+    BASELINE_CACHE_KEYSPACE_EVENTS: bool = True  # keyspace notification 으로 key 변경 시 무효화
+    BASELINE_CACHE_STATS_INTERVAL: int = 1000  # 조회 N건마다 적중률 로그
+
+    # 지표 메타데이터(xaiops_meta_metric) 레지스트리
+    METRIC_META_REFRESH_SEC: int = 600  # 변경 알림이 없어도 이 주기로 다시 로딩
+    METRIC_META_CHANNEL: str = "xaiops_meta_metric_changed"  # 변경 알림 Postgres LISTEN 채널
+
+    # few-shot 예시 동적 선택
+    FEWSHOT_ENABLED: bool = True
+    FEWSHOT_TOP_K: int = 2  # 프롬프트에 넣을 최대 예시 수
+    FEWSHOT_TOKEN_BUDGET: int = 1000  # 예시에 사용할 최대 토큰 수
+    FEWSHOT_MIN_SIMILARITY: float = 0.2  # 이 유사도 미만의 예시는 넣지 않음
+    FEWSHOT_OUT_OF_BAND_WEIGHT: float = 2.0  # 정상 범위를 벗어난 지표의 가중치
+
+    # 프롬프트 토큰 예산
+    PROMPT_TOKEN_MARGIN: int = 64  # 토큰 수 오차를 고려한 여유분
+    PROMPT_TRIM_ORDER: list[str] = ["few_shot_learning", "metrics_definition", "input_data"]  # 예산 초과 시 먼저 줄일 section
+    PROMPT_FLOAT_PRECISION: int = 3  # 프롬프트에 출력하는 실수 값의 소수점 자릿수
+
+    # 이상 지표 선별 (프롬프트에 넣을 지표 수 제한)
+    ANOMALY_RANKING_ENABLED: bool = True
+    ANOMALY_TOP_N: int = 10  # 프롬프트에 넣을 최대 지표 수
+    ANOMALY_MIN_METRICS: int = 3  # 임계값을 넘는 지표가 없어도 점수 순으로 넣을 최소 지표 수
+    ANOMALY_SCORE_THRESHOLD: float = 2.0  # 이 점수 이상인 지표만 선택 (z-score 2 수준)
+    ANOMALY_BAND_WEIGHT: float = 2.0  # 정상 범위 이탈 정도 가중치
+    ANOMALY_CONTRIBUTION_WEIGHT: float = 1.0  # GDN anomaly_contribution 순위 가중치
 
     # Logger Name
     BASE_DIR: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -45,6 +150,10 @@ class BaseConfig(BaseSettings):
     def database_url(self) -> str:
         return f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
 
+    @property
+    def async_database_url(self) -> str:
+        return f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
+
     class Config:
         env_file = '.env'
 
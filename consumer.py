@@ -1,89 +1,539 @@
 import redis
 import json
+import asyncio
 import time
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
 
 from config import config
 
+from llm_api.Models.database import get_pool_stats
+from llm_api.Services.llm_balancer_service import llm_balancer
+from llm_api.Services.llm_transport_service import llm_transport
 from llm_api.Services.model_loader_service import llm_model
+from llm_api.Services.model_warmup_service import model_warmup
 from llm_api.Services.prompt_loader_service import PromptLoaderService
+from llm_api.Services.request_queue_service import create_queue_scheduler, get_chunk_key, make_fan_out_key, \
+    split_fan_out_request, claim_if_absent, get_fan_out_state_key, get_fan_out_waiters_key, register_fan_out_wait, \
+    mark_fan_out_children_done
+from llm_api.Services.result_store_service import add_store_result
+from llm_api.Services.answer_cache_service import AnswerCache
+from llm_api.Services.metric_metadata_service import metric_metadata_registry
 
 from llm_api.Utils.logger import consumer_logger
 
 # Redis 설정
 redis_client = redis.Redis(host=config.SAVE_REDIS_HOST, port=config.SAVE_REDIS_PORT, decode_responses=True)
+queue_scheduler = create_queue_scheduler(redis_client)
+answer_cache = AnswerCache(redis_client)
+# 스트리밍 요청 전용 생성 스레드 풀
+stream_executor = ThreadPoolExecutor(max_workers=config.LLM_BATCH_MAX_CONCURRENCY, thread_name_prefix="llm-stream")
 
-# LLM Worker 실행
-def llm_worker():
-    consumer_logger.info("Consumer Start")
-    while True:
-        # 큐에서 데이터 가져오기 (FIFO 방식)
-        request = redis_client.blpop(config.QUEUE_KEY, timeout=5)
-        if request is None:
-            print("⏳ 큐가 비어 있습니다. 다음 루프를 실행합니다.")
-            continue
 
-        _, request_json = request
-        consumer_logger.info("요청 데이터 수신")
+def make_redis_key(request_data: dict):
+    """
+    (OS, WAS), (SERVICE) 에 따른 redis key값 생성
+    """
+    if request_data['category_inst_type'] == "host_instance_db" and request_data.get("fan_out"):
+        return make_fan_out_key(request_data['summary']['time'], request_data['summary']['tiers'])
+    elif request_data['category_inst_type'] == "host_instance_db":
+        return f"{request_data['summary']['time']}_tiers_{request_data['summary']['tiers'][0]['type']}_{request_data['summary']['tiers'][0]['instances'][0]['target_id']}"
+    elif request_data['category_inst_type'] == "service":
+        tmp_tx_code = list(request_data["tx_codes"].keys())[0]
+        return f"{request_data['time']}_tx_codes_{tmp_tx_code}"
+    else:
+        raise ValueError("지원되지 않는 형식의 데이터가 들어왔습니다.")
+
+
+def attach_request_info(response: dict, request_data: dict):
+    """
+    Instance_name, Group, request 정보 추가하기
+    """
+    if request_data["category_inst_type"] == "host_instance_db":
+        response["instance_name"] = request_data["summary"]["tiers"][0]["instances"][0]["instance_name"]
+        response["group"] = request_data["summary"]["tiers"][0]["name"]
+        response["obj"] = request_data["summary"]["tiers"][0]
+    elif request_data["category_inst_type"] == "service":
+        tmp_tx_code = list(request_data["tx_codes"].keys())[0]
+        response["instance_name"] = None
+        response["group"] = None
+        response["obj"] = request_data["tx_codes"][tmp_tx_code]
+    else:
+        response = None
+    return response
+
+
+_prompt_loop = None
+_prompt_loop_lock = threading.Lock()
+
+
+def get_prompt_loop():
+    """
+    비동기 프롬프트 생성 전용 event loop (백그라운드 스레드)
+    asyncpg 연결과 redis.asyncio 연결은 생성된 loop에 묶이므로 처리 스레드들이 하나의 loop를 공유한다.
+    """
+    global _prompt_loop
+    if _prompt_loop is None:
+        with _prompt_loop_lock:
+            if _prompt_loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="prompt-loop", daemon=True).start()
+                _prompt_loop = loop
+    return _prompt_loop
+
 
+async def amake_input_prompts(batch: list):
+    return await asyncio.gather(*(PromptLoaderService.amake_input_prompt(request_data) for request_data in batch))
+
+
+async def agenerate_responses(input_prompts: list):
+    """LLM_MAX_CONCURRENCY 안에서 비동기로 동시에 생성한다. 실패한 요청은 해당 위치에 Exception 객체가 담긴다."""
+    responses = await asyncio.gather(*(llm_model.agenerate_response(input_prompt) for input_prompt in input_prompts))
+    return [response if response is not None else RuntimeError("LLM 응답 생성에 실패했습니다.")
+            for response in responses]
+
+
+def build_batch_prompts(batch: list):
+    """
+    배치 내 요청별 Redis Key와 프롬프트를 생성한다.
+    Key 생성에 실패한 요청은 결과를 저장할 곳이 없으므로 제외하고, 프롬프트 생성에 실패한 요청은 실패로 기록한다.
+    PROMPT_ASYNC_ENABLED 이면 배치 내 프롬프트를 동시에 생성한다.
+    fan-out 요청은 instance별 요청으로 나눠 각각 job으로 만들고, 지표는 대상 전체를 한 번에 조회한다.
+    instance별 key는 단건 요청과 같은 single-flight 규칙으로 선점해, 이미 완료되었거나 다른 곳에서 처리 중인 key는
+    새로 생성하지 않고 저장된 결과를 사용한다.
+    :return: (정상 job 목록, 실패 job 목록, fan-out 그룹) - job은 (redis_key, request_data, input_prompt | error),
+             fan-out 그룹은 {집계 key: (원 요청, instance별 key 목록, 다른 작업의 결과를 사용할 key 목록)}
+    """
+    keyed, fan_out_groups = [], {}
+    fan_out_keyed = []
+    for request_data in batch:
         try:
-            request_data = json.loads(request_json)
-            consumer_logger.info(f"요청 데이터: {request_data}")
+            redis_key = make_redis_key(request_data)
+            consumer_logger.info(f"{request_data['category_inst_type']}의 Redis Key 생성 완료: {redis_key}")
+            if request_data.get("fan_out"):
+                sub_requests = split_fan_out_request(request_data)
+                child_keys = [make_redis_key(sub_request) for sub_request in sub_requests]
+                claims = claim_if_absent(redis_client, child_keys)
+                external_keys = [child_key for child_key, (status, _) in zip(child_keys, claims) if status != "claimed"]
+                fan_out_groups[redis_key] = (request_data, child_keys, external_keys)
+                fan_out_keyed.append([(child_key, sub_request) for child_key, sub_request, (status, _)
+                                      in zip(child_keys, sub_requests, claims) if status == "claimed"])
+                consumer_logger.info(f"fan-out 요청 분리: {redis_key} -> {len(child_keys)}건 "
+                                     f"(기존 결과 사용: {len(external_keys)}건)")
+                continue
         except Exception as e:
-            consumer_logger.exception(f"요청 데이터 파싱 오류 발생: {e}")
+            consumer_logger.exception(f"Redis Key 생성 실패: {e}")
             continue
+        keyed.append((redis_key, request_data))
+
+    # LLM 프롬프트 생성
+    prompt_start_time = time.time()
+    if config.PROMPT_ASYNC_ENABLED:
+        future = asyncio.run_coroutine_threadsafe(
+            amake_input_prompts([request_data for _, request_data in keyed]), get_prompt_loop())
+        input_prompts = future.result()
+    else:
+        input_prompts = [PromptLoaderService.make_input_prompt(request_data) for _, request_data in keyed]
+    for children in fan_out_keyed:
+        if not children:
+            continue
+        keyed.extend(children)
+        input_prompts.extend(PromptLoaderService.make_fan_out_input_prompts(
+            [sub_request for _, sub_request in children]))
+    prompt_end_time = time.time()
+    consumer_logger.info(f"Prompt 생성 완료 - {len(keyed)}건, 생성 소요 시간: {prompt_end_time - prompt_start_time:.2f} seconds.")
+
+    jobs, failed_jobs = [], []
+    for (redis_key, request_data), input_prompt in zip(keyed, input_prompts):
+        if not input_prompt:
+            consumer_logger.error(f"Prompt 생성 실패: {redis_key}")
+            failed_jobs.append((redis_key, request_data, ValueError("프롬프트 생성에 실패했습니다.")))
+            continue
+        consumer_logger.debug(f"Prompt 내용: {input_prompt}")
+        jobs.append((redis_key, request_data, input_prompt))
+
+    return jobs, failed_jobs, fan_out_groups
+
+
+def read_results(redis_keys: list):
+    """
+    저장된 결과를 조회한다.
+    :return: {redis_key: {"status", "response"} | None} - 아직 처리 중(running)인 key는 None, 결과가 없는 key는 failed
+    """
+    redis_keys = list(dict.fromkeys(redis_keys))
+    pipe = redis_client.pipeline(transaction=False)
+    for redis_key in redis_keys:
+        pipe.hgetall(redis_key)
+    mappings = {}
+    for redis_key, mapping in zip(redis_keys, pipe.execute()):
+        if mapping.get("status") == "running":
+            mappings[redis_key] = None
+        elif mapping:
+            mappings[redis_key] = mapping
+        else:
+            mappings[redis_key] = {"status": "failed", "response": "결과가 만료되었습니다."}
+    return mappings
+
+
+def make_fan_out_result(request_data: dict, child_keys: list, mapping_by_key: dict):
+    """
+    instance별 결과를 모아 fan-out 요청의 집계 결과를 만든다.
+    하나라도 성공하면 success 이고, 각 instance의 상태와 답변은 response 안에 담는다.
+    """
+    children = []
+    for child_key in child_keys:
+        mapping = mapping_by_key.get(child_key) or {"status": "failed", "response": "결과가 없습니다."}
+        response = json.loads(mapping["response"]) if mapping["status"] == "success" else mapping["response"]
+        children.append({"redis_key": child_key, "status": mapping["status"], "response": response})
+
+    success_count = sum(child["status"] == "success" for child in children)
+    aggregate = {
+        "time": request_data["summary"]["time"],
+        "total": len(children),
+        "success": success_count,
+        "results": children,
+    }
+    return {"status": "success" if success_count else "failed", "response": json.dumps(aggregate)}
+
+
+def build_fan_out_results(fan_out_groups: dict, results: list):
+    """
+    이번 배치에서 모든 instance 결과가 준비된 fan-out 요청의 집계 결과를 만든다.
+    다른 작업이 아직 처리 중인 instance가 남은 집계는 기다리지 않고 따로 반환해, 결과 저장 후 complete_fan_outs 에서
+    대기 등록한다. (처리 스레드가 다른 작업의 결과를 기다리며 멈추지 않도록)
+    :return: (집계 결과 목록, {집계 key: (원 요청, instance별 key 목록, 처리 중인 key 목록)})
+    """
+    mapping_by_key = {redis_key: mapping for redis_key, _, mapping in results}
+    external_keys = [key for _, _, keys in fan_out_groups.values() for key in keys]
+    if external_keys:
+        mapping_by_key.update(read_results(external_keys))
+
+    aggregate_results, deferred = [], {}
+    for redis_key, (request_data, child_keys, external_keys) in fan_out_groups.items():
+        running_keys = [child_key for child_key in external_keys if mapping_by_key.get(child_key) is None]
+        if running_keys:
+            deferred[redis_key] = (request_data, child_keys, running_keys)
+            continue
+        aggregate_results.append((redis_key, request_data, make_fan_out_result(request_data, child_keys, mapping_by_key)))
+    return aggregate_results, deferred
+
+
+def store_results(results: list):
+    """결과를 pipeline 한 번으로 저장하고 완료 이벤트를 발행한다."""
+    if not results:
+        return
+    pipe = redis_client.pipeline(transaction=False)
+    for redis_key, request_data, mapping in results:
+        add_store_result(pipe, redis_key, request_data["category_inst_type"], mapping)
+        pipe.publish(config.RESULT_CHANNEL, json.dumps({"redis_key": redis_key, "status": mapping["status"]}))
+        # 스트리밍 구독자에게 완료 이벤트 전달
+        pipe.xadd(get_chunk_key(redis_key), {"event": "done", "status": mapping["status"]},
+                  maxlen=config.CHUNK_STREAM_MAXLEN, approximate=True)
+        pipe.expire(get_chunk_key(redis_key), config.CHUNK_STREAM_TTL_SEC)
+    pipe.execute()
+    consumer_logger.info(f"LLM 응답을 Redis에 저장 완료: {[redis_key for redis_key, _, _ in results]}")
+
+
+def complete_fan_outs(stored_keys: list, deferred: dict):
+    """
+    결과 저장 후 fan-out 집계를 이어서 처리한다.
+    - deferred: 다른 작업의 instance 결과를 기다려야 하는 이번 배치의 집계를 등록하고, 등록 전에 끝난 key는 바로 완료 처리
+    - stored_keys: 방금 저장한 key를 기다리던 다른 배치의 집계를 완료 처리
+    마지막 instance를 완료 처리한 쪽이 집계 결과를 만들어 저장한다.
+    """
+    done_pairs = []
+    for aggregate_key, (request_data, child_keys, running_keys) in deferred.items():
+        register_fan_out_wait(redis_client, aggregate_key, request_data, child_keys, running_keys)
+        consumer_logger.info(f"fan-out 집계 대기 등록: {aggregate_key} - 다른 작업이 처리 중인 key: {running_keys}")
+    if deferred:
+        finished = read_results([key for _, _, keys in deferred.values() for key in keys])
+        done_pairs.extend((aggregate_key, child_key) for aggregate_key, (_, _, keys) in deferred.items()
+                          for child_key in keys if finished[child_key] is not None)
+
+    if stored_keys:
+        pipe = redis_client.pipeline(transaction=False)
+        for redis_key in stored_keys:
+            pipe.smembers(get_fan_out_waiters_key(redis_key))
+        for redis_key, aggregate_keys in zip(stored_keys, pipe.execute()):
+            done_pairs.extend((aggregate_key, redis_key) for aggregate_key in aggregate_keys)
+
+    ready_keys = mark_fan_out_children_done(redis_client, done_pairs)
+    if not ready_keys:
+        return
+
+    pipe = redis_client.pipeline(transaction=False)
+    for aggregate_key in ready_keys:
+        pipe.hgetall(get_fan_out_state_key(aggregate_key))
+    aggregate_results = []
+    for aggregate_key, state in zip(ready_keys, pipe.execute()):
+        if not state:
+            consumer_logger.error(f"fan-out 집계 정보가 만료되어 집계하지 못했습니다: {aggregate_key}")
+            continue
+        request_data, child_keys = json.loads(state["request"]), json.loads(state["child_keys"])
+        aggregate_results.append(
+            (aggregate_key, request_data, make_fan_out_result(request_data, child_keys, read_results(child_keys))))
+    store_results(aggregate_results)
+
+
+def generate_streaming(redis_key: str, input_prompt: dict):
+    """
+    LLM 응답을 스트리밍으로 생성하면서 chunk를 요청별 chunk stream에 기록한다.
+    :return: 전체 텍스트를 파싱한 응답
+    """
+    chunk_key = get_chunk_key(redis_key)
+    chunks = []
+    for chunk in llm_model.stream_response(input_prompt):
+        chunks.append(chunk)
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.xadd(chunk_key, {"event": "chunk", "data": chunk}, maxlen=config.CHUNK_STREAM_MAXLEN, approximate=True)
+        pipe.expire(chunk_key, config.CHUNK_STREAM_TTL_SEC)
+        pipe.execute()
+    return llm_model.parse_response("".join(chunks))
 
-        # (OS, WAS), (SERVICE) 에 따른 redis key값 생성
+
+def generate_batch_responses(jobs: list):
+    """
+    스트리밍 요청은 chunk를 기록하며 개별 생성하고, 나머지는 chain의 batch 경로로 한 번에 생성한다.
+    LLM_ASYNC_ENABLED 이면 나머지를 프롬프트 생성과 같은 event loop 에서 agenerate_response 로 생성해,
+    모든 처리 스레드의 동시 생성 수가 LLM_MAX_CONCURRENCY 로 제한된다.
+    :return: jobs 순서에 맞춘 응답 목록 (실패한 요청은 Exception 객체)
+    """
+    stream_indexes = [idx for idx, (_, request_data, _) in enumerate(jobs) if request_data.get("stream")]
+    batch_indexes = [idx for idx in range(len(jobs)) if idx not in stream_indexes]
+    responses = [None] * len(jobs)
+
+    stream_futures = {
+        idx: stream_executor.submit(generate_streaming, jobs[idx][0], jobs[idx][2]) for idx in stream_indexes
+    }
+
+    if batch_indexes:
         try:
-            if request_data['category_inst_type'] == "host_instance_db":
-                redis_key = f"{request_data['summary']['time']}_tiers_{request_data['summary']['tiers'][0]['type']}_{request_data['summary']['tiers'][0]['instances'][0]['target_id']}"
-            elif request_data['category_inst_type'] == "service":
-                tmp_tx_code = list(request_data["tx_codes"].keys())[0]
-                redis_key = f"{request_data['time']}_tx_codes_{tmp_tx_code}"
+            batch_prompts = [jobs[idx][2] for idx in batch_indexes]
+            if config.LLM_ASYNC_ENABLED:
+                batch_responses = asyncio.run_coroutine_threadsafe(
+                    agenerate_responses(batch_prompts), get_prompt_loop()).result()
             else:
-                redis_key = None
-                raise ValueError("지원되지 않는 형식의 데이터가 들어왔습니다.")
-            consumer_logger.info(f"{request_data['category_inst_type']}의 Redis Key 생성 완료: {redis_key}")
+                batch_responses = llm_model.generate_responses(batch_prompts)
         except Exception as e:
-            consumer_logger.exception(f"Redis Key 생성 실패: {e}")
+            consumer_logger.exception(f"LLM 배치 답변 생성 중 예외 발생: {e}")
+            batch_responses = [e] * len(batch_indexes)
+        for idx, response in zip(batch_indexes, batch_responses):
+            responses[idx] = response
+
+    for idx, future in stream_futures.items():
+        try:
+            responses[idx] = future.result()
+        except Exception as e:
+            responses[idx] = e
+    return responses
+
+
+def process_batch(messages: list, batch: list):
+    """
+    요청 묶음에 대해 프롬프트 생성 -> Ollama 배치 호출 -> Redis pipeline 저장 -> queue ack 를 수행
+    저장에 실패한 경우 ack 하지 않으므로 stream backend에서는 회수 후 다시 처리된다.
+    """
+    jobs, failed_jobs, fan_out_groups = build_batch_prompts(batch)
+
+    results = []
+
+    # 같은 이상 패턴의 캐시된 답변이 있으면 LLM 호출 없이 사용하고, 유사한 패턴의 답변은 참고 답변으로 넣어 생성
+    generate_jobs = []
+    for redis_key, request_data, input_prompt in jobs:
+        try:
+            cached_response, similar_response = answer_cache.lookup(input_prompt)
+        except Exception as e:
+            consumer_logger.exception(f"답변 캐시 조회 중 예외 발생: {e}")
+            cached_response, similar_response = None, None
+        if cached_response is None:
+            if similar_response is not None:
+                input_prompt = answer_cache.add_hint(input_prompt, similar_response)
+            generate_jobs.append((redis_key, request_data, input_prompt))
             continue
+        response = attach_request_info(cached_response, request_data)
+        results.append((redis_key, request_data, {"status": "success", "response": json.dumps(response)}))
+    jobs = generate_jobs
+
+    if jobs:
+        # Ollama 호출
+        response_start_time = time.time()
+        responses = generate_batch_responses(jobs)
+        response_end_time = time.time()
+        consumer_logger.info(f"※ LLM 배치 응답 생성 완료, 요청 수: {len(jobs)}, "
+                             f"생성 소요 시간 ※ : {response_end_time - response_start_time:.2f} seconds.")
+
+        for (redis_key, request_data, input_prompt), response in zip(jobs, responses):
+            if isinstance(response, Exception):
+                consumer_logger.error(f"LLM 답변 생성 중 예외 발생: {redis_key} - {response}")
+                results.append((redis_key, request_data, {"status": "failed", "response": str(response)}))
+                continue
+            consumer_logger.debug(f"LLM 응답: {redis_key}\n {response}")
+            try:
+                answer_cache.store(input_prompt, response)
+            except Exception as e:
+                consumer_logger.exception(f"답변 캐시 저장 중 예외 발생: {e}")
+            try:
+                response = attach_request_info(response, request_data)
+                results.append((redis_key, request_data, {"status": "success", "response": json.dumps(response)}))
+            except Exception as e:
+                consumer_logger.exception(f"LLM 응답 후처리 중 예외 발생: {e}")
+                results.append((redis_key, request_data, {"status": "failed", "response": str(e)}))
+
+    results.extend((redis_key, request_data, {"status": "failed", "response": str(error)})
+                   for redis_key, request_data, error in failed_jobs)
+    # instance 결과를 다른 작업이 만드는 fan-out 집계는 여기서 기다리지 않고, 마지막 instance를 저장하는 쪽이 만든다.
+    deferred = {}
+    if fan_out_groups:
+        aggregate_results, deferred = build_fan_out_results(fan_out_groups, results)
+        results.extend(aggregate_results)
+
+    # Redis에 결과 일괄 저장
+    try:
+        store_results(results)
+    except Exception as e:
+        consumer_logger.exception(f"LLM 응답 Redis 저장 중 예외 발생: {e}")
+        return
+
+    try:
+        # 단건 host_instance_db 결과만 다른 fan-out 집계의 instance가 될 수 있다.
+        complete_fan_outs([redis_key for redis_key, request_data, _ in results
+                           if request_data["category_inst_type"] == "host_instance_db"
+                           and not request_data.get("fan_out")], deferred)
+    except Exception as e:
+        consumer_logger.exception(f"fan-out 집계 처리 중 예외 발생: {e}")
+
+    try:
+        queue_scheduler.ack(messages)
+    except Exception as e:
+        consumer_logger.exception(f"Queue ack 중 예외 발생: {e}")
+
+
+def drain_batch(worker_id: int):
+    """
+    우선순위 queue에서 최대 CONSUMER_BATCH_SIZE 건을 가져온다.
+    첫 요청은 CONSUMER_POP_TIMEOUT 동안 대기하고, 이후에는 CONSUMER_BATCH_WAIT_MS 안에 들어온 요청만 묶는다.
+    """
+    messages = queue_scheduler.pop(timeout=config.CONSUMER_POP_TIMEOUT, max_count=config.CONSUMER_BATCH_SIZE)
+    if not messages:
+        return [], []
 
+    deadline = time.monotonic() + config.CONSUMER_BATCH_WAIT_MS / 1000
+    while len(messages) < config.CONSUMER_BATCH_SIZE:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        popped = queue_scheduler.pop(timeout=remaining, max_count=config.CONSUMER_BATCH_SIZE - len(messages))
+        if not popped:
+            break
+        messages.extend(popped)
+
+    consumer_logger.info(f"Worker-{worker_id} 요청 데이터 수신 - {len(messages)}건")
+
+    batch, invalid_messages = [], []
+    for message in messages:
         try:
-            # LLM 프롬프트 생성
-            prompt_start_time = time.time()
-            input_prompt = PromptLoaderService.make_input_prompt(request_data)
-            prompt_end_time = time.time()
-            consumer_logger.info(f"Prompt 생성 완료, 생성 소요 시간: {prompt_end_time - prompt_start_time:.2f} seconds.")
-            consumer_logger.debug(f"Prompt 내용: {input_prompt}")
-
-            # Ollama 호출
-            response_start_time = time.time()
-            response = llm_model.generate_response(input_prompt)
-            response_end_time = time.time()
-            consumer_logger.info(f"※ LLM 응답 생성 완료, 생성 소요 시간 ※ : {response_end_time - response_start_time:.2f} seconds."
-                                 f"\n {response}")
-
-            # Instance_name, Group, request 정보 추가하기
-            if request_data["category_inst_type"] == "host_instance_db":
-                response["instance_name"] = request_data["summary"]["tiers"][0]["instances"][0]["instance_name"]
-                response["group"] = request_data["summary"]["tiers"][0]["name"]
-                response["obj"] = request_data["summary"]["tiers"][0]
-            elif request_data["category_inst_type"] == "service":
-                response["instance_name"] = None
-                response["group"] = None
-                response["obj"] = request_data["tx_codes"][tmp_tx_code]
-            else:
-                response = None
+            request_data = json.loads(message.payload)
+            consumer_logger.info(f"요청 데이터: {request_data}")
+            batch.append(request_data)
+        except Exception as e:
+            consumer_logger.exception(f"요청 데이터 파싱 오류 발생: {e}")
+            invalid_messages.append(message)
 
-            # Redis에 결과 저장 (성공)
-            redis_client.hset(redis_key, mapping={"status": "success", "response": json.dumps(response)})
-            consumer_logger.info(f"LLM 응답을 Redis에 저장 완료: {redis_key}")
+    # 파싱할 수 없는 요청은 다시 처리해도 실패하므로 바로 ack
+    queue_scheduler.ack(invalid_messages)
+    return [message for message in messages if message not in invalid_messages], batch
+
+
+def on_batch_done(worker_id: int, future, in_flight: threading.BoundedSemaphore):
+    """
+    process_batch 가 처리하지 못한 예외를 로그로 남기고 in-flight 슬롯을 반환한다.
+    (결과를 저장하지 못한 key 는 running 상태로 남았다가 RUNNING_STALE_SEC 이후 다시 요청할 수 있다.)
+    """
+    try:
+        exception = future.exception()
+        if exception is not None:
+            consumer_logger.error(f"Worker-{worker_id} 배치 처리 중 처리되지 않은 예외 발생: {exception}",
+                                  exc_info=exception)
+    finally:
+        in_flight.release()
+
+
+# LLM Worker 실행
+def llm_worker(worker_id: int, executor: ThreadPoolExecutor):
+    """
+    큐에서 요청 묶음을 가져와 executor에 위임한다.
+    워커별 in-flight 배치 수가 CONSUMER_MAX_IN_FLIGHT에 도달하면 여유가 생길 때까지 큐에서 가져오지 않는다.
+    """
+    consumer_logger.info(f"Worker-{worker_id} Start")
+    in_flight = threading.BoundedSemaphore(config.CONSUMER_MAX_IN_FLIGHT)
+
+    while True:
+        in_flight.acquire()
+
+        try:
+            messages, batch = drain_batch(worker_id)
         except Exception as e:
-            consumer_logger.exception(f"LLM 답변 생성 중 예외 발생: {e}")
-            redis_client.hset(redis_key, mapping={"status": "failed", "response": str(e)})
+            in_flight.release()
+            consumer_logger.exception(f"Worker-{worker_id} 큐 조회 중 오류 발생: {e}")
+            time.sleep(config.CHECK_INTERVAL)
+            continue
+
+        if not batch:
+            in_flight.release()
+            consumer_logger.debug(f"Worker-{worker_id} ⏳ 큐가 비어 있습니다. 다음 루프를 실행합니다.")
+            continue
+
+        future = executor.submit(process_batch, messages, batch)
+        future.add_done_callback(lambda done: on_batch_done(worker_id, done, in_flight))
+
+
+def run_consumer():
+    """
+    CONSUMER_WORKER_COUNT 개의 워커 스레드를 실행한다.
+    처리 스레드 풀 크기는 워커 수 * 워커당 in-flight 제한으로 맞춰, 프롬프트 생성, Ollama 호출, Redis 저장이 서로 겹쳐 실행된다.
+    """
+    consumer_logger.info(f"Consumer Start - workers: {config.CONSUMER_WORKER_COUNT}, "
+                         f"max in-flight per worker: {config.CONSUMER_MAX_IN_FLIGHT}")
+    job_threads = config.CONSUMER_WORKER_COUNT * config.CONSUMER_MAX_IN_FLIGHT
+    # 처리 스레드마다 프롬프트 생성 시 DB 연결을 하나씩 빌리므로 pool 이 더 작으면 연결 대기가 생긴다.
+    if job_threads > config.DB_POOL_SIZE + config.DB_MAX_OVERFLOW:
+        consumer_logger.warning(f"처리 스레드 수({job_threads})가 DB pool 최대 연결 수"
+                                f"({config.DB_POOL_SIZE} + {config.DB_MAX_OVERFLOW})보다 많습니다. "
+                                f"DB_POOL_SIZE 또는 DB_MAX_OVERFLOW 조정이 필요합니다.")
+    # 프롬프트 생성 중 지표 설명 조회가 DB에 접근하지 않도록 미리 로딩
+    metric_metadata_registry.start()
+    llm_balancer.start()
+    # 첫 요청이 모델 로딩 시간을 부담하지 않도록 작업을 받기 전에 warm-up
+    if config.LLM_WARMUP_ENABLED:
+        if not model_warmup.warm_up():
+            consumer_logger.error("LLM warm-up 실패, 모델 준비를 확인하지 못한 채 작업을 시작합니다.")
+        model_warmup.start()
+    executor = ThreadPoolExecutor(max_workers=job_threads, thread_name_prefix="llm-job")
+    workers = [
+        threading.Thread(target=llm_worker, args=(worker_id, executor), name=f"llm-worker-{worker_id}", daemon=True)
+        for worker_id in range(config.CONSUMER_WORKER_COUNT)
+    ]
+    for worker in workers:
+        worker.start()
 
-        time.sleep(1)  # 부하 방지를 위해 1초 대기
-    consumer_logger.info("Consumer End")
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        consumer_logger.info("Consumer 종료 요청 수신")
+    finally:
+        executor.shutdown(wait=True)
+        metric_metadata_registry.stop()
+        llm_balancer.stop()
+        model_warmup.stop()
+        consumer_logger.info(f"LLM cold/warm 응답 시간 통계: {model_warmup.stats()}")
+        consumer_logger.info(f"Ollama endpoint 통계: {llm_balancer.stats()}")
+        llm_transport.close()
+        asyncio.run(llm_transport.aclose())
+        consumer_logger.info(f"DB pool 통계: {get_pool_stats()}")
+        consumer_logger.info("Consumer End")
 
 
 if __name__ == "__main__":
-    llm_worker()
+    run_consumer()
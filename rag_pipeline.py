@@ -8,6 +8,8 @@ from bs4 import BeautifulSoup
 from sentence_transformers import SentenceTransformer
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
+from llm_api.Services.llm_transport_service import rag_llm_transport
+
 
 def fetch_text_from_url(url):
     html = requests.get(url).text
@@ -97,9 +99,7 @@ def query_ollama(context, question, model="eeve"):
         "stream": False
     }
 
-    response = requests.post(f"http://10.10.34.20:11435/api/generate", json=payload)
-    response.raise_for_status()
-    return response.json()["response"].strip()
+    return rag_llm_transport.generate(payload)["response"].strip()
 
 
 def classify_question_type_with_llm(question: str, model="eeve") -> str:
@@ -115,9 +115,7 @@ def classify_question_type_with_llm(question: str, model="eeve") -> str:
         "stream": False
     }
 
-    response = requests.post(f"http://10.10.34.20:11435/api/generate", json=payload)
-    response.raise_for_status()
-    return response.json()["response"].strip()
+    return rag_llm_transport.generate(payload)["response"].strip()
 
 
 if __name__ == "__main__":
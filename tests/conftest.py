@@ -0,0 +1,16 @@
+import os
+import sys
+
+# 저장소 루트(config)와 그 상위 디렉터리(llm_api 패키지)를 import 경로에 추가
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.dirname(ROOT_DIR))
+
+# config 필수 값 - 테스트에서는 실제 DB/Redis 에 연결하지 않는다.
+for name, value in {
+    "POSTGRES_USER": "test", "POSTGRES_PASSWORD": "test", "POSTGRES_DB": "test",
+    "POSTGRES_HOST": "127.0.0.1", "POSTGRES_PORT": "5432",
+    "DATA_REDIS_HOST": "127.0.0.1", "DATA_REDIS_PORT": "6379",
+    "SAVE_REDIS_HOST": "127.0.0.1", "SAVE_REDIS_PORT": "6379",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,149 @@
+import json
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from config import config
+
+from llm_api.Services.llm_balancer_service import LLMLoadBalancer
+from llm_api.Services.llm_transport_service import LLMTransport
+
+MODEL_NAME = "test-model"
+
+
+class StandInOllama:
+    """/api/tags, /api/generate 만 흉내 내는 로컬 Ollama 대역 서버 (응답 지연, 상태 조절 가능)"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.healthy = True
+        self.generate_count = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def _make_handler(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _send(self, status: int, body: dict):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path != "/api/tags" or not stand_in.healthy:
+                    self._send(503, {"error": "unavailable"})
+                    return
+                self._send(200, {"models": [{"name": MODEL_NAME}]})
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                time.sleep(stand_in.latency)
+                with stand_in._lock:
+                    stand_in.generate_count += 1
+                self._send(200, {"response": "ok", "eval_count": 20,
+                                 "eval_duration": int(stand_in.latency * 1e9)})
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stand_ins(request):
+    servers = [StandInOllama(latency) for latency in request.param]
+    yield servers
+    for server in servers:
+        server.close()
+
+
+def make_balancer(servers):
+    transport = LLMTransport([server.url for server in servers])
+    return transport, LLMLoadBalancer(transport, MODEL_NAME)
+
+
+def generate(balancer: LLMLoadBalancer, transport: LLMTransport, record_eval: bool = True):
+    with balancer.lease() as lease:
+        response = transport.generate({"model": MODEL_NAME, "prompt": "ping"}, lease["endpoint"])
+        if record_eval:
+            lease["eval_tokens"] = response["eval_count"]
+            lease["eval_sec"] = response["eval_duration"] / 1e9
+    return lease["endpoint"]
+
+
+@pytest.mark.parametrize("stand_ins", [(0.02, 0.2)], indirect=True)
+def test_slow_endpoint_receives_less_traffic(stand_ins):
+    fast, slow = stand_ins
+    transport, balancer = make_balancer(stand_ins)
+    try:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda _: generate(balancer, transport), range(80)))
+    finally:
+        transport.close()
+
+    assert fast.generate_count + slow.generate_count == 80
+    assert fast.generate_count > 2 * slow.generate_count
+    stats = {state["endpoint"]: state for state in balancer.stats()}
+    assert stats[fast.url]["tokens_per_sec"] > stats[slow.url]["tokens_per_sec"]
+    assert all(state["in_flight"] == 0 for state in stats.values())
+
+
+@pytest.mark.parametrize("stand_ins", [(0.01, 0.01)], indirect=True)
+def test_unhealthy_endpoint_is_skipped_and_readmitted(stand_ins, monkeypatch):
+    monkeypatch.setattr(config, "LLM_HEALTH_FAIL_THRESHOLD", 2)
+    healthy, flaky = stand_ins
+    transport, balancer = make_balancer(stand_ins)
+    try:
+        flaky.healthy = False
+        balancer.check_all()
+        balancer.check_all()
+        assert {state["endpoint"]: state["healthy"] for state in balancer.stats()} == {
+            healthy.url: True, flaky.url: False}
+
+        endpoints = {generate(balancer, transport, record_eval=False) for _ in range(10)}
+        assert endpoints == {healthy.url}
+        assert flaky.generate_count == 0
+
+        flaky.healthy = True
+        balancer.check_all()
+        assert all(state["healthy"] for state in balancer.stats())
+
+        for _ in range(10):
+            generate(balancer, transport, record_eval=False)
+        assert flaky.generate_count > 0
+    finally:
+        transport.close()
+
+
+@pytest.mark.parametrize("stand_ins", [(0.01, 0.01)], indirect=True)
+def test_sporadic_health_check_failures_do_not_eject(stand_ins, monkeypatch):
+    monkeypatch.setattr(config, "LLM_HEALTH_FAIL_THRESHOLD", 2)
+    _, flaky = stand_ins
+    transport, balancer = make_balancer(stand_ins)
+    try:
+        for healthy in (False, True, False, True, False):
+            flaky.healthy = healthy
+            balancer.check_all()
+            assert all(state["healthy"] for state in balancer.stats())
+    finally:
+        transport.close()